@@ -8,6 +8,7 @@ class MinecraftConfig:
     version: str = "Python 3.13 - 1.21.x"
     versionProtocol: int = 771
     maxPlayers: int = 20
+    viewDistance: int = 10
     description: str = "A Python Minecraft Server"
     favicon: str = ""
 
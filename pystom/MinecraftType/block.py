@@ -0,0 +1,413 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from functools import cache
+
+try:
+    import numpy
+except ImportError:  # NumPy为可选依赖, 缺失时标记表为memoryview
+    numpy = None
+
+
+MAGIC = b"PSBLOCKS"
+VERSION = 1
+# 文件头: 魔数, 版本, 方块状态数, 方块数, 字符串表长度
+_HEADER = struct.Struct("<8sIIII12x")
+
+# 方块状态标记 (flags表中的位)
+FLAG_AIR = 1  # 空气 (air / cave_air / void_air)
+FLAG_SOLID = 2  # 阻挡移动的固体方块
+FLAG_FLUID = 4  # 含有流体 (水、熔岩)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "data", "block_states.bin")
+PATH_ENV = "PYSTOM_BLOCK_STATES"  # 设置后从该路径载入数据文件
+AIR_BLOCKS = ("minecraft:air", "minecraft:cave_air", "minecraft:void_air")
+# 数据文件中必须有的方块, 缺少时说明数据文件不是由完整的方块报告生成的
+REQUIRED_BLOCKS = AIR_BLOCKS + ("minecraft:stone", "minecraft:water", "minecraft:lava")
+
+# 数据文件中没有的方块状态 (如客户端版本更新) 按不透明的固体方块处理
+UNKNOWN_FLAGS = FLAG_SOLID
+UNKNOWN_OPACITY = 15
+
+# build() 默认使用的方块属性, 报告中没有物理与光照属性; overrides 中给出的属性优先
+_FLUID = {"solid": False, "fluid": True, "opacity": 1}
+_PASSABLE = {"solid": False, "opacity": 0}
+DEFAULT_OVERRIDES = {
+    "minecraft:water": _FLUID,
+    "minecraft:lava": {**_FLUID, "emission": 15},
+    "minecraft:bubble_column": _FLUID,
+    "minecraft:kelp": _FLUID,
+    "minecraft:kelp_plant": _FLUID,
+    "minecraft:seagrass": _FLUID,
+    "minecraft:tall_seagrass": _FLUID,
+    "minecraft:glass": {"opacity": 0},
+    "minecraft:ice": {"opacity": 1},
+    "minecraft:torch": {**_PASSABLE, "emission": 14},
+    "minecraft:wall_torch": {**_PASSABLE, "emission": 14},
+    "minecraft:soul_torch": {**_PASSABLE, "emission": 10},
+    "minecraft:soul_wall_torch": {**_PASSABLE, "emission": 10},
+    "minecraft:redstone_torch": {**_PASSABLE, "emission": {"lit=true": 7}},
+    "minecraft:redstone_wall_torch": {**_PASSABLE, "emission": {"lit=true": 7}},
+    "minecraft:fire": {**_PASSABLE, "emission": 15},
+    "minecraft:soul_fire": {**_PASSABLE, "emission": 10},
+    "minecraft:nether_portal": {**_PASSABLE, "emission": 11},
+    "minecraft:end_portal": {**_PASSABLE, "emission": 15},
+    "minecraft:end_gateway": {**_PASSABLE, "emission": 15},
+    "minecraft:light": {**_PASSABLE, "emission": {f"level={level}": level for level in range(16)}},
+    "minecraft:glow_lichen": {**_PASSABLE, "emission": 7},
+    "minecraft:cave_vines": {**_PASSABLE, "emission": {"berries=true": 14}},
+    "minecraft:cave_vines_plant": {**_PASSABLE, "emission": {"berries=true": 14}},
+    "minecraft:brown_mushroom": {**_PASSABLE, "emission": 1},
+    "minecraft:glowstone": {"emission": 15},
+    "minecraft:sea_lantern": {"emission": 15},
+    "minecraft:jack_o_lantern": {"emission": 15},
+    "minecraft:shroomlight": {"emission": 15},
+    "minecraft:beacon": {"opacity": 0, "emission": 15},
+    "minecraft:conduit": {"opacity": 0, "emission": 15},
+    "minecraft:lantern": {"opacity": 0, "emission": 15},
+    "minecraft:soul_lantern": {"opacity": 0, "emission": 10},
+    "minecraft:end_rod": {"opacity": 0, "emission": 14},
+    "minecraft:ochre_froglight": {"emission": 15},
+    "minecraft:verdant_froglight": {"emission": 15},
+    "minecraft:pearlescent_froglight": {"emission": 15},
+    "minecraft:crying_obsidian": {"emission": 10},
+    "minecraft:magma_block": {"emission": 3},
+    "minecraft:redstone_lamp": {"emission": {"lit=true": 15}},
+    "minecraft:redstone_ore": {"emission": {"lit=true": 9}},
+    "minecraft:deepslate_redstone_ore": {"emission": {"lit=true": 9}},
+    "minecraft:furnace": {"emission": {"lit=true": 13}},
+    "minecraft:blast_furnace": {"emission": {"lit=true": 13}},
+    "minecraft:smoker": {"emission": {"lit=true": 13}},
+    "minecraft:campfire": {"opacity": 0, "emission": {"lit=true": 15}},
+    "minecraft:soul_campfire": {"opacity": 0, "emission": {"lit=true": 10}},
+    "minecraft:respawn_anchor": {"emission": {f"charges={charges}": charges * 4 - 1 for charges in range(1, 5)}},
+    "minecraft:enchanting_table": {"opacity": 0, "emission": 7},
+    "minecraft:ender_chest": {"opacity": 0, "emission": 7},
+    "minecraft:amethyst_cluster": {"opacity": 0, "emission": 5},
+    "minecraft:large_amethyst_bud": {"opacity": 0, "emission": 4},
+    "minecraft:medium_amethyst_bud": {"opacity": 0, "emission": 2},
+    "minecraft:small_amethyst_bud": {"opacity": 0, "emission": 1},
+}
+
+
+def _align(offset: int) -> int:
+    return offset + -offset % 4
+
+
+def _layout(states: int, blocks: int) -> dict[str, tuple[str, int, int]]:
+    """各个表在文件中的 (类型码, 偏移, 元素数), 每个表按4字节对齐"""
+    tables = {}
+    offset = _HEADER.size
+    for name, typecode, count in (("flags", "B", states), ("emission", "B", states), ("opacity", "B", states),
+                                  ("state_block", "H", states), ("state_properties", "I", states + 1),
+                                  ("block_first", "I", blocks + 1), ("block_default", "I", blocks),
+                                  ("block_name", "I", blocks + 1)):
+        tables[name] = (typecode, offset, count)
+        offset = _align(offset + count * array(typecode).itemsize)
+    tables["strings"] = ("B", offset, None)
+    return tables
+
+
+class BlockRegistry:
+    """
+    方块状态注册表, 从打包的二进制数据文件 (由原版的 blocks.json 报告生成, 见 build()) 载入。
+
+    文件以只读mmap方式打开, 所有表都是文件上的零拷贝视图, 打开时不做任何解析:
+    - flags / emission / opacity: 每个方块状态一字节的标记、发光等级与不透明度 (0-15),
+      有NumPy时为ndarray, 可以直接用方块状态数组做向量化查询, 否则为memoryview
+    - state_block / state_properties: 方块状态 -> 方块、属性字符串 ("snowy=false")
+    - block_first / block_default / block_name: 方块 -> 第一个方块状态、默认方块状态、方块名
+    同一方块的方块状态ID连续, 方块名到方块的索引在第一次按名称查询时才建立。
+    数据文件中没有的方块状态按不透明的固体方块处理 (is_air() 为False, light_opacity() 为15),
+    查询名称与属性时抛出KeyError。
+
+    Attributes:
+        path (str): 数据文件路径。
+        state_count (int): 方块状态总数。
+        block_count (int): 方块总数。
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        with open(path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.state_count, self.block_count, strings = _HEADER.unpack_from(self._data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的方块状态数据文件: {path}")
+        layout = _layout(self.state_count, self.block_count)
+        for name, (typecode, offset, count) in layout.items():
+            setattr(self, name, self._table(typecode, offset, strings if count is None else count,
+                                            vector=name in ("flags", "emission", "opacity")))
+        self._names: dict[str, int] | None = None
+
+    def _table(self, typecode: str, offset: int, count: int, vector: bool = False):
+        if vector and numpy is not None:
+            return numpy.frombuffer(self._data, dtype=numpy.uint8, count=count, offset=offset)
+        view = memoryview(self._data)[offset:offset + count * array(typecode).itemsize]
+        if typecode == "B" or sys.byteorder == "little":
+            return view.cast(typecode)
+        table = array(typecode, view.tobytes())
+        table.byteswap()
+        return table
+
+    def _string(self, table, index: int) -> str:
+        return bytes(self.strings[table[index]:table[index + 1]]).decode("utf-8")
+
+    # 方块状态 -> 名称与属性
+
+    def known(self, state: int) -> bool:
+        """数据文件中是否有该方块状态"""
+        return 0 <= state < self.state_count
+
+    def _check(self, state: int) -> int:
+        if not 0 <= state < self.state_count:
+            raise KeyError(f"未知的方块状态: {state}")
+        return state
+
+    def block_of(self, state: int) -> int:
+        return self.state_block[self._check(state)]
+
+    def name(self, state: int) -> str:
+        """方块状态所属方块的名称, 如 minecraft:grass_block"""
+        return self._string(self.block_name, self.block_of(state))
+
+    def properties(self, state: int) -> dict[str, str]:
+        """方块状态的属性, 如 {"snowy": "false"}"""
+        text = self._string(self.state_properties, self._check(state))
+        return dict(item.split("=", 1) for item in text.split(",")) if text else {}
+
+    def describe(self, state: int) -> str:
+        """方块状态的字符串形式, 如 minecraft:grass_block[snowy=false]"""
+        text = self._string(self.state_properties, self._check(state))
+        return f"{self.name(state)}[{text}]" if text else self.name(state)
+
+    # 名称与属性 -> 方块状态
+
+    def _block(self, name: str) -> int:
+        if self._names is None:
+            self._names = {self._string(self.block_name, block): block for block in range(self.block_count)}
+        if ":" not in name:
+            name = "minecraft:" + name
+        block = self._names.get(name)
+        if block is None:
+            raise KeyError(f"未知的方块: {name}")
+        return block
+
+    def default_state(self, name: str) -> int:
+        """方块的默认方块状态"""
+        return self.block_default[self._block(name)]
+
+    def state_id(self, name: str, properties: dict[str, str] = None) -> int:
+        """
+        由方块名与属性得到方块状态, 未给出的属性取默认方块状态的值。
+
+        Args:
+            name (str): 方块名, 可以省略 minecraft: 前缀。
+            properties (dict[str, str]): 属性。
+        """
+        block = self._block(name)
+        default = self.block_default[block]
+        if not properties:
+            return default
+        wanted = self.properties(default)
+        unknown = properties.keys() - wanted.keys()
+        if unknown:
+            raise KeyError(f"{name} 没有属性 {', '.join(sorted(unknown))}")
+        wanted.update((key, str(value).lower()) for key, value in properties.items())
+        for state in range(self.block_first[block], self.block_first[block + 1]):
+            if self.properties(state) == wanted:
+                return state
+        raise KeyError(f"{name} 没有方块状态 {wanted}")
+
+    def parse(self, text: str) -> int:
+        """由字符串形式 (如 minecraft:grass_block[snowy=false]) 得到方块状态"""
+        name, _, rest = text.partition("[")
+        properties = dict(item.split("=", 1) for item in rest.rstrip("]").split(",")) if rest.strip("]") else None
+        return self.state_id(name, properties)
+
+    # 标记
+
+    def _flags(self, state: int) -> int:
+        return self.flags[state] if 0 <= state < self.state_count else UNKNOWN_FLAGS
+
+    def is_air(self, state: int) -> bool:
+        return bool(self._flags(state) & FLAG_AIR)
+
+    def is_solid(self, state: int) -> bool:
+        return bool(self._flags(state) & FLAG_SOLID)
+
+    def is_fluid(self, state: int) -> bool:
+        return bool(self._flags(state) & FLAG_FLUID)
+
+    def light_emission(self, state: int) -> int:
+        return int(self.emission[state]) if 0 <= state < self.state_count else 0
+
+    def light_opacity(self, state: int) -> int:
+        return int(self.opacity[state]) if 0 <= state < self.state_count else UNKNOWN_OPACITY
+
+    @staticmethod
+    def _select(table, predicate) -> frozenset:
+        """predicate对表中的值成立的方块状态, 有NumPy时predicate作用于整个表"""
+        if numpy is not None:
+            return frozenset(numpy.flatnonzero(predicate(table)).tolist())
+        return frozenset(state for state, value in enumerate(table) if predicate(value))
+
+    @cache
+    def air_states(self) -> frozenset:
+        """所有空气方块状态"""
+        return self._select(self.flags, lambda flags: flags & FLAG_AIR)
+
+    @cache
+    def non_motion_blocking_states(self) -> frozenset:
+        """不阻挡移动且不含流体的方块状态, 即 MOTION_BLOCKING 高度图忽略的方块"""
+        return self._select(self.flags, lambda flags: (flags & (FLAG_SOLID | FLAG_FLUID)) == 0)
+
+    @cache
+    def transparent_states(self) -> frozenset:
+        """光照可以通过的方块状态 (不透明度小于15); 光照引擎目前只区分透明与不透明"""
+        return self._select(self.opacity, lambda opacity: opacity < 15)
+
+    @cache
+    def emission_map(self) -> dict[int, int]:
+        """发光的方块状态 -> 发光等级"""
+        if numpy is not None:
+            return {state: int(self.emission[state]) for state in numpy.flatnonzero(self.emission).tolist()}
+        return {state: level for state, level in enumerate(self.emission) if level}
+
+    def close(self):
+        for name in _layout(0, 0):
+            self.__dict__.pop(name, None)
+        self._data.close()
+
+
+@cache
+def registry() -> BlockRegistry:
+    """
+    方块状态注册表, 第一次调用时才打开数据文件 (环境变量 PYSTOM_BLOCK_STATES 给出的路径, 默认为 DEFAULT_PATH)。
+
+    数据文件不随源码提供, 需要先由原版数据生成器的方块报告生成:
+    python -m pystom.MinecraftType.block reports/blocks.json
+
+    Raises:
+        FileNotFoundError: 数据文件不存在。
+        ValueError: 数据文件无效或不完整 (缺少 REQUIRED_BLOCKS 中的方块)。
+    """
+    path = os.environ.get(PATH_ENV) or DEFAULT_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"方块状态数据文件不存在: {path}; "
+                                f"请用原版数据生成器的方块报告生成: python -m pystom.MinecraftType.block reports/blocks.json")
+    blocks = BlockRegistry(path)
+    missing = []
+    for name in REQUIRED_BLOCKS:
+        try:
+            blocks.default_state(name)
+        except KeyError:
+            missing.append(name)
+    if missing:
+        blocks.close()
+        raise ValueError(f"方块状态数据文件不完整 (缺少 {', '.join(missing)}): {path}; "
+                         f"请用完整的方块报告重新生成")
+    return blocks
+
+
+def build(report: dict, overrides: dict[str, dict] = None) -> bytes:
+    """
+    由原版数据生成器的方块报告 (reports/blocks.json) 生成数据文件。
+
+    报告中没有方块的物理与光照属性, 由overrides按方块名给出:
+    {"air": bool, "solid": bool, "fluid": bool, "opacity": int, "emission": int | {属性字符串: int}};
+    emission为dict时, 方块状态的属性包含某个键 (如 "lit=true") 中的全部属性即取其发光等级。
+    overrides 中没有的属性取 DEFAULT_OVERRIDES (流体、常见的发光与透光方块),
+    仍未给出时空气方块为非固体、不透明度0, 其余方块为固体、不透明度15、不发光;
+    含水 (waterlogged=true) 的方块状态总是标记为含有流体。
+
+    Args:
+        report (dict): 方块名 -> {"states": [{"id", "default", "properties"}], ...}。
+        overrides (dict[str, dict]): 方块名 -> 属性。
+
+    Raises:
+        ValueError: 方块状态ID不连续或同一方块的方块状态ID不相邻。
+    """
+    overrides = overrides or {}
+    blocks = sorted(report.items(), key=lambda item: min(state["id"] for state in item[1]["states"]))
+    states = sum(len(block["states"]) for _, block in blocks)
+    flags, emission, opacity = bytearray(states), bytearray(states), bytearray(states)
+    state_block, state_properties = array("H", bytes(2 * states)), array("I", bytes(4 * (states + 1)))
+    block_first, block_default, block_name = array("I"), array("I"), array("I")
+    # 先存放所有方块名, 再存放所有属性字符串, 相邻两个偏移即为一个字符串的范围
+    strings = bytearray()
+    for name, _ in blocks:
+        block_name.append(len(strings))
+        strings += name.encode("utf-8")
+    block_name.append(len(strings))
+    next_id = 0
+    for index, (name, block) in enumerate(blocks):
+        is_air = block.get("definition", {}).get("type") == "minecraft:air" or name in AIR_BLOCKS
+        options = {"air": is_air, "solid": not is_air, "fluid": False, "opacity": 0 if is_air else 15,
+                   "emission": 0, **DEFAULT_OVERRIDES.get(name, {}), **overrides.get(name, {})}
+        block_first.append(next_id)
+        for state in sorted(block["states"], key=lambda state: state["id"]):
+            if state["id"] != next_id:
+                raise ValueError(f"{name} 的方块状态ID {state['id']} 不连续 (应为 {next_id})")
+            properties = state.get("properties", {})
+            text = ",".join(f"{key}={value}" for key, value in properties.items())
+            if state.get("default"):
+                block_default.append(next_id)
+            level = options["emission"]
+            if isinstance(level, dict):
+                assigned = set(text.split(","))
+                level = max((value for key, value in level.items() if assigned.issuperset(key.split(","))),
+                            default=0)
+            fluid = options["fluid"] or properties.get("waterlogged") == "true"
+            flags[next_id] = (FLAG_AIR * options["air"]) | (FLAG_SOLID * options["solid"]) | (FLAG_FLUID * fluid)
+            emission[next_id] = level
+            opacity[next_id] = options["opacity"]
+            state_block[next_id] = index
+            state_properties[next_id] = len(strings)
+            strings += text.encode("utf-8")
+            next_id += 1
+        if len(block_default) != index + 1:
+            raise ValueError(f"{name} 没有默认方块状态")
+    state_properties[states] = len(strings)
+    block_first.append(states)
+
+    layout = _layout(states, len(blocks))
+    data = bytearray(layout["strings"][1] + len(strings))
+    _HEADER.pack_into(data, 0, MAGIC, VERSION, states, len(blocks), len(strings))
+    tables = {"flags": flags, "emission": emission, "opacity": opacity, "state_block": state_block,
+              "state_properties": state_properties, "block_first": block_first, "block_default": block_default,
+              "block_name": block_name, "strings": strings}
+    for name, (typecode, offset, count) in layout.items():
+        table = tables[name]
+        if isinstance(table, array) and sys.byteorder != "little":
+            table = table[:]
+            table.byteswap()
+        raw = bytes(table)
+        data[offset:offset + len(raw)] = raw
+    return bytes(data)
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="由原版方块报告 (blocks.json) 生成方块状态数据文件")
+    parser.add_argument("report", help="数据生成器输出的 reports/blocks.json")
+    parser.add_argument("--overrides", help="方块属性 (固体、流体、不透明度、发光等级) 的JSON文件")
+    parser.add_argument("-o", "--output", default=DEFAULT_PATH, help="输出路径, 默认为打包的数据文件")
+    args = parser.parse_args(argv)
+
+    with open(args.report, encoding="utf-8") as file:
+        report = json.load(file)
+    overrides = None
+    if args.overrides:
+        with open(args.overrides, encoding="utf-8") as file:
+            overrides = json.load(file)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "wb") as file:
+        file.write(build(report, overrides))
+
+
+if __name__ == "__main__":
+    main()
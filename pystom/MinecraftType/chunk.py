@@ -0,0 +1,443 @@
+import sys
+from array import array
+
+from pystom.MinecraftType.block import registry
+from pystom.PacketType import encode_varint
+
+try:
+    import numpy
+except ImportError:  # NumPy为可选依赖, 缺失时逐个元素打包/解包
+    numpy = None
+
+
+AIR = 0  # 空气的方块状态ID
+BLOCK_STATE_BITS = 15  # 直接调色板下方块状态的位数, 取决于方块状态总数
+BIOME_BITS = 7  # 直接调色板下生物群系的位数, 取决于生物群系注册表的大小
+
+
+def air_states() -> frozenset:
+    """统计非空气方块数量时视为空气的方块状态, 第一次调用时才载入方块注册表"""
+    return registry().air_states()
+
+
+def __getattr__(name: str):
+    # AIR_STATES 按需取自方块注册表, 导入本模块时不打开数据文件
+    if name == "AIR_STATES":
+        return air_states()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _read_varint(data, offset: int) -> tuple[int, int]:
+    """从offset处读取一个VarInt, 返回 (值, 结束偏移)"""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _pack(ids, bits: int, size: int) -> array:
+    """将size个调色板索引按每个long容纳 64 // bits 个 (不跨long) 的方式打包"""
+    per_long = 64 // bits
+    length = -(-size // per_long)
+    if numpy is not None:
+        padded = numpy.zeros(length * per_long, dtype=numpy.uint64)
+        padded[:size] = ids
+        shifts = numpy.arange(per_long, dtype=numpy.uint64) * numpy.uint64(bits)
+        packed = numpy.bitwise_or.reduce(padded.reshape(length, per_long) << shifts, axis=1)
+        data = array('Q')
+        data.frombytes(packed.tobytes())
+        return data
+    data = array('Q', bytes(8 * length))
+    for i, value in enumerate(ids):
+        data[i // per_long] |= value << (i % per_long * bits)
+    return data
+
+
+def _unpack(data: array, bits: int, size: int):
+    """_pack的逆过程, 有NumPy时返回uint64数组, 否则返回列表"""
+    per_long = 64 // bits
+    mask = (1 << bits) - 1
+    if numpy is not None:
+        longs = numpy.frombuffer(data, dtype=numpy.uint64)
+        shifts = numpy.arange(per_long, dtype=numpy.uint64) * numpy.uint64(bits)
+        return ((longs[:, None] >> shifts) & numpy.uint64(mask)).reshape(-1)[:size]
+    shifts = range(0, per_long * bits, bits)
+    return [(long >> shift) & mask for long in data for shift in shifts][:size]
+
+
+class PalettedContainer:
+    """
+    协议中的调色板容器 (Paletted Container), 用于存储区块段中的方块状态和生物群系。
+
+    根据不同值的数量自动选择调色板:
+    - 单值: 所有位置都是同一个值, bits为0, 不存储数据数组
+    - 间接: 调色板 + 调色板索引, bits在 [min_bits, max_bits] 之间
+    - 直接: 数据数组中直接存放全局ID, bits为direct_bits
+
+    数据数组为 array('Q'), 每个long存放 64 // bits 个值, 值不跨越long。
+    调色板装不下新值时整体重新打包 (resize), 调色板按值排序以保证编码结果稳定。
+
+    Attributes:
+        size (int): 值的数量, 方块为4096, 生物群系为64。
+        bits (int): 每个值占用的位数。
+        palette (list[int] | None): 调色板, 直接调色板时为None。
+        data (array): 打包后的数据数组。
+    """
+    __slots__ = ("size", "min_bits", "max_bits", "direct_bits", "bits", "palette", "_index", "data")
+
+    def __init__(self, size: int, min_bits: int, max_bits: int, direct_bits: int, value: int = 0):
+        self.size = size
+        self.min_bits = min_bits
+        self.max_bits = max_bits
+        self.direct_bits = direct_bits
+        self.fill(value)
+
+    def fill(self, value: int):
+        """将所有位置设为同一个值"""
+        self.bits = 0
+        self.palette = [value]
+        self._index = {value: 0}
+        self.data = array('Q')
+
+    def get(self, index: int) -> int:
+        if self.bits == 0:
+            return self.palette[0]
+        per_long = 64 // self.bits
+        value = self.data[index // per_long] >> (index % per_long * self.bits) & ((1 << self.bits) - 1)
+        return value if self.palette is None else self.palette[value]
+
+    def set(self, index: int, value: int) -> int:
+        """设置一个位置的值, 返回原来的值"""
+        if self.palette is None:
+            key = value
+        else:
+            key = self._index.get(value)
+            if key is None:
+                if len(self.palette) < 1 << self.bits:
+                    key = len(self.palette)
+                    self.palette.append(value)
+                    self._index[value] = key
+                else:
+                    # 调色板已满, 重新打包
+                    values = self.values()
+                    old = int(values[index])
+                    values[index] = value
+                    self.load(values)
+                    return old
+            elif self.bits == 0:
+                return value
+        per_long = 64 // self.bits
+        position, shift = index // per_long, index % per_long * self.bits
+        mask = (1 << self.bits) - 1
+        long = self.data[position]
+        old = long >> shift & mask
+        self.data[position] = long & ~(mask << shift) | key << shift
+        return old if self.palette is None else self.palette[old]
+
+    def values(self):
+        """所有位置的值, 有NumPy时为int64数组, 否则为列表"""
+        if self.bits == 0:
+            if numpy is not None:
+                return numpy.full(self.size, self.palette[0], dtype=numpy.int64)
+            return [self.palette[0]] * self.size
+        ids = _unpack(self.data, self.bits, self.size)
+        if numpy is not None:
+            ids = ids.astype(numpy.int64)
+            return ids if self.palette is None else numpy.array(self.palette, dtype=numpy.int64)[ids]
+        return ids if self.palette is None else [self.palette[i] for i in ids]
+
+    def load(self, values):
+        """用size个值整体替换容器内容, 并按不同值的数量选择调色板"""
+        if numpy is not None:
+            palette, ids = numpy.unique(numpy.asarray(values, dtype=numpy.int64), return_inverse=True)
+            palette = palette.tolist()
+        else:
+            palette = sorted(set(values))
+            index = {value: i for i, value in enumerate(palette)}
+            ids = [index[value] for value in values]
+        if len(palette) == 1:
+            self.fill(palette[0])
+            return
+        bits = max(self.min_bits, (len(palette) - 1).bit_length())
+        if bits > self.max_bits:
+            self.bits = self.direct_bits
+            self.palette = None
+            self._index = None
+            self.data = _pack(values, self.bits, self.size)
+            return
+        self.bits = bits
+        self.palette = palette
+        self._index = {value: i for i, value in enumerate(palette)}
+        self.data = _pack(ids, bits, self.size)
+
+    def count(self, excluded: frozenset) -> int:
+        """值不在excluded中的位置数量"""
+        if self.bits == 0:
+            return 0 if self.palette[0] in excluded else self.size
+        values = self.values()
+        if numpy is not None:
+            return self.size - int(numpy.isin(values, list(excluded)).sum())
+        return sum(value not in excluded for value in values)
+
+    def write(self, out: bytearray):
+        """按协议格式 (1.21.5+, 数据数组不带长度前缀) 写入out"""
+        out.append(self.bits)
+        if self.bits == 0:
+            out += encode_varint(self.palette[0])
+            return
+        if self.palette is not None:
+            out += encode_varint(len(self.palette))
+            for value in self.palette:
+                out += encode_varint(value)
+        data = self.data
+        if sys.byteorder == "little":
+            data = array('Q', data)
+            data.byteswap()
+        out += data.tobytes()
+
+    def read(self, data, offset: int) -> int:
+        """从write()写出的数据中读取容器内容, 返回结束偏移"""
+        bits = data[offset]
+        offset += 1
+        if bits == 0:
+            value, offset = _read_varint(data, offset)
+            self.fill(value)
+            return offset
+        if bits <= self.max_bits:
+            length, offset = _read_varint(data, offset)
+            palette = []
+            for _ in range(length):
+                value, offset = _read_varint(data, offset)
+                palette.append(value)
+            self.palette = palette
+            self._index = {value: i for i, value in enumerate(palette)}
+        else:
+            self.palette = self._index = None
+        self.bits = bits
+        end = offset + -(-self.size // (64 // bits)) * 8
+        self.data = array('Q')
+        self.data.frombytes(data[offset:end])
+        if sys.byteorder == "little":
+            self.data.byteswap()
+        return end
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) * 8 + (len(self.palette) * 8 if self.palette is not None else 0)
+
+
+class ChunkSection:
+    """
+    16×16×16的区块段, 方块状态与4×4×4的生物群系各存放在一个调色板容器中。
+
+    坐标均为段内坐标, 方块为0-15, 生物群系为0-3; 索引顺序为 (y * 16 + z) * 16 + x。
+
+    编码结果会被缓存, 通过本类的方法修改方块或生物群系时清空缓存并通知所属的区块;
+    直接修改 blocks / biomes 容器后需要调用 mark_dirty()。
+
+    Attributes:
+        blocks (PalettedContainer): 方块状态。
+        biomes (PalettedContainer): 生物群系。
+        block_count (int): 非空气方块的数量。
+    """
+    __slots__ = ("blocks", "biomes", "block_count", "_bytes", "_parent")
+
+    def __init__(self, block: int = AIR, biome: int = 0, biome_bits: int = BIOME_BITS):
+        self.blocks = PalettedContainer(4096, 4, 8, BLOCK_STATE_BITS, block)
+        self.biomes = PalettedContainer(64, 1, 3, biome_bits, biome)
+        self.block_count = 0 if block in air_states() else 4096
+        self._bytes = None  # 编码结果的缓存
+        self._parent = None  # 所属的区块
+
+    def mark_dirty(self):
+        """清空本段与所属区块的编码缓存"""
+        self._bytes = None
+        if self._parent is not None:
+            self._parent.mark_dirty()
+
+    def get_block(self, x: int, y: int, z: int) -> int:
+        return self.blocks.get(y << 8 | z << 4 | x)
+
+    def set_block(self, x: int, y: int, z: int, state: int) -> int:
+        """设置方块状态, 返回原来的方块状态"""
+        old = self.blocks.set(y << 8 | z << 4 | x, state)
+        if old != state:
+            air = air_states()
+            self.block_count += (old in air) - (state in air)
+            self.mark_dirty()
+        return old
+
+    def fill(self, state: int, x0: int = 0, y0: int = 0, z0: int = 0, x1: int = 16, y1: int = 16, z1: int = 16):
+        """将 [x0, x1) × [y0, y1) × [z0, z1) 范围内的方块设为state"""
+        if x1 <= x0 or y1 <= y0 or z1 <= z0:
+            return
+        self.mark_dirty()
+        if (x0, y0, z0, x1, y1, z1) == (0, 0, 0, 16, 16, 16):
+            self.blocks.fill(state)
+            self.block_count = 0 if state in air_states() else 4096
+            return
+        values = self.blocks.values()
+        if numpy is not None:
+            values.reshape(16, 16, 16)[y0:y1, z0:z1, x0:x1] = state
+        else:
+            for y in range(y0, y1):
+                for z in range(z0, z1):
+                    start = y << 8 | z << 4
+                    values[start + x0:start + x1] = [state] * (x1 - x0)
+        self.blocks.load(values)
+        self.block_count = self.blocks.count(air_states())
+
+    def get_biome(self, x: int, y: int, z: int) -> int:
+        return self.biomes.get(y << 4 | z << 2 | x)
+
+    def set_biome(self, x: int, y: int, z: int, biome: int) -> int:
+        old = self.biomes.set(y << 4 | z << 2 | x, biome)
+        if old != biome:
+            self.mark_dirty()
+        return old
+
+    def fill_biome(self, biome: int):
+        self.biomes.fill(biome)
+        self.mark_dirty()
+
+    @property
+    def empty(self) -> bool:
+        return self.block_count == 0
+
+    def write(self, out: bytearray):
+        """按协议格式写入: 非空气方块数 (short) + 方块状态容器 + 生物群系容器"""
+        out += self.to_bytes()
+
+    @classmethod
+    def read(cls, data, offset: int, biome_bits: int = BIOME_BITS) -> tuple['ChunkSection', int]:
+        """从to_bytes()的编码结果中读取区块段, 返回 (区块段, 结束偏移), 编码结果同时作为缓存"""
+        section = cls(biome_bits=biome_bits)
+        start = offset
+        section.block_count = int.from_bytes(data[offset:offset + 2], "big", signed=True)
+        offset = section.blocks.read(data, offset + 2)
+        offset = section.biomes.read(data, offset)
+        section._bytes = bytes(data[start:offset])
+        return section, offset
+
+    def to_bytes(self) -> bytes:
+        if self._bytes is None:
+            out = bytearray(self.block_count.to_bytes(2, "big", signed=True))
+            self.blocks.write(out)
+            self.biomes.write(out)
+            self._bytes = bytes(out)
+        return self._bytes
+
+    @property
+    def nbytes(self) -> int:
+        return self.blocks.nbytes + self.biomes.nbytes
+
+
+class Chunk:
+    """
+    一个区块 (竖直方向的一列区块段)。
+
+    x与z为区块内坐标 (只取低4位), y为世界坐标。
+
+    chunk_data以及由它派生的编码结果 (区块数据包、压缩后的帧) 通过 cached() 缓存,
+    任一区块段被修改时全部清空; 每个区块段另有自己的编码缓存, 未修改的段不会重新编码。
+
+    Attributes:
+        chunk_x (int): 区块X坐标。
+        chunk_z (int): 区块Z坐标。
+        min_y (int): 世界最低高度。
+        height (int): 世界高度, 必须是16的倍数。
+        sections (list[ChunkSection]): 从下到上的区块段。
+        heightmaps (Heightmaps): 挂在区块上的高度图, 修改方块时随之更新, 没有时为None。
+        light (ChunkLight): 由 world.light.LightEngine 计算的光照, 没有时为None。
+    """
+
+    def __init__(self, chunk_x: int, chunk_z: int, min_y: int = -64, height: int = 384,
+                 biome: int = 0, biome_bits: int = BIOME_BITS):
+        if height % 16:
+            raise ValueError("世界高度必须是16的倍数")
+        self.chunk_x = chunk_x
+        self.chunk_z = chunk_z
+        self.min_y = min_y
+        self.height = height
+        self.sections = [ChunkSection(biome=biome, biome_bits=biome_bits) for _ in range(height >> 4)]
+        for section in self.sections:
+            section._parent = self
+        self.heightmaps = None
+        self.light = None
+        self._cache = {}
+
+    def mark_dirty(self):
+        """清空区块的编码缓存"""
+        self._cache.clear()
+
+    def cached(self, key, build):
+        """
+        返回以key缓存的编码结果, 没有缓存时调用build()生成并缓存, 区块被修改时缓存失效。
+
+        Args:
+            key: 缓存的键, 如 "data" 或 ("frame", 压缩阈值)。
+            build (Callable[[], bytes]): 生成编码结果的函数。
+        """
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = build()
+        return value
+
+    @classmethod
+    def from_bytes(cls, chunk_x: int, chunk_z: int, data, min_y: int = -64, height: int = 384,
+                   biome_bits: int = BIOME_BITS) -> 'Chunk':
+        """由to_bytes()的编码结果 (即chunk_data) 重建区块, 用于在进程之间紧凑地传递区块"""
+        chunk = cls(chunk_x, chunk_z, min_y, height, biome_bits=biome_bits)
+        offset = 0
+        for index in range(len(chunk.sections)):
+            section, offset = ChunkSection.read(data, offset, biome_bits)
+            section._parent = chunk
+            chunk.sections[index] = section
+        return chunk
+
+    def section(self, y: int) -> ChunkSection:
+        """世界高度y所在的区块段"""
+        index = (y - self.min_y) >> 4
+        if not 0 <= index < len(self.sections):
+            raise IndexError(f"高度 {y} 超出世界范围")
+        return self.sections[index]
+
+    def get_block(self, x: int, y: int, z: int) -> int:
+        return self.section(y).get_block(x & 15, (y - self.min_y) & 15, z & 15)
+
+    def set_block(self, x: int, y: int, z: int, state: int) -> int:
+        """设置方块状态, 返回原来的方块状态"""
+        old = self.section(y).set_block(x & 15, (y - self.min_y) & 15, z & 15, state)
+        if self.heightmaps is not None and old != state:
+            self.heightmaps.update(x & 15, y, z & 15, state)
+        return old
+
+    def fill(self, state: int, x0: int = 0, y0: int = None, z0: int = 0,
+             x1: int = 16, y1: int = None, z1: int = 16):
+        """将 [x0, x1) × [y0, y1) × [z0, z1) 范围内的方块设为state, y默认为整个世界高度"""
+        y0 = self.min_y if y0 is None else max(y0, self.min_y)
+        y1 = self.min_y + self.height if y1 is None else min(y1, self.min_y + self.height)
+        for index in range((y0 - self.min_y) >> 4, -(-(y1 - self.min_y) // 16)):
+            bottom = self.min_y + index * 16
+            self.sections[index].fill(state, x0, max(y0 - bottom, 0), z0, x1, min(y1 - bottom, 16), z1)
+        if self.heightmaps is not None:
+            self.heightmaps.compute()
+
+    def get_biome(self, x: int, y: int, z: int) -> int:
+        """x/z为区块内坐标, y为世界坐标, 均按4格取整"""
+        return self.section(y).get_biome((x & 15) >> 2, ((y - self.min_y) & 15) >> 2, (z & 15) >> 2)
+
+    def set_biome(self, x: int, y: int, z: int, biome: int) -> int:
+        return self.section(y).set_biome((x & 15) >> 2, ((y - self.min_y) & 15) >> 2, (z & 15) >> 2, biome)
+
+    def to_bytes(self) -> bytes:
+        """编码为 ServerChunkDataPacket 的 chunk_data"""
+        return self.cached("data", lambda: b"".join(section.to_bytes() for section in self.sections))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(section.nbytes for section in self.sections)
@@ -0,0 +1,152 @@
+from array import array
+from functools import cache
+
+from pystom.MinecraftType import nbt
+from pystom.MinecraftType.block import registry
+from pystom.MinecraftType.chunk import Chunk, _pack, air_states, numpy
+
+
+@cache
+def heightmap_types() -> dict[str, frozenset]:
+    """高度图类型 -> 不计入该高度图的方块状态, 第一次调用时才载入方块注册表"""
+    return {
+        "MOTION_BLOCKING": registry().non_motion_blocking_states(),
+        "WORLD_SURFACE": air_states(),
+    }
+
+
+def __getattr__(name: str):
+    # HEIGHTMAP_TYPES 按需取自方块注册表, 导入本模块时不打开数据文件
+    if name == "HEIGHTMAP_TYPES":
+        return heightmap_types()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def pack_heightmap(heights, height: int) -> array:
+    """
+    将256个高度值打包为LongArray的数据。
+
+    每个值占 ceil(log2(height + 1)) 位 (384格高的世界为9位), 每个long存放 64 // bits 个值且不跨越long,
+    256个值共需 ceil(256 / (64 // bits)) 个long (9位时为37个)。
+    """
+    packed = _pack(heights, height.bit_length(), 256)
+    return array('q', packed.tobytes())
+
+
+def column_heights(chunk: Chunk, transparent: frozenset) -> array:
+    """
+    对区块做列扫描, 返回256个高度值 (索引为 z * 16 + x):
+    每列最高的不透明方块的Y坐标 + 1 - min_y, 整列都透明时为0。
+    """
+    sections = chunk.sections
+    if numpy is not None:
+        heights = numpy.zeros(256, dtype=numpy.uint16)
+        unresolved = numpy.ones(256, dtype=bool)
+        excluded = list(transparent)
+        for index in range(len(sections) - 1, -1, -1):
+            blocks = sections[index].blocks
+            if blocks.bits == 0:
+                if blocks.palette[0] in transparent:
+                    continue
+                heights[unresolved] = index * 16 + 16
+                break
+            # [y, z * 16 + x]
+            solid = ~numpy.isin(blocks.values().reshape(16, 256), excluded)
+            found = unresolved & solid.any(axis=0)
+            top = 15 - numpy.argmax(solid[::-1], axis=0)
+            heights[found] = index * 16 + top[found] + 1
+            unresolved &= ~found
+            if not unresolved.any():
+                break
+        return array('H', heights.tobytes())
+
+    heights = array('H', bytes(512))
+    unresolved = set(range(256))
+    for index in range(len(sections) - 1, -1, -1):
+        blocks = sections[index].blocks
+        if blocks.bits == 0:
+            if blocks.palette[0] in transparent:
+                continue
+            for column in unresolved:
+                heights[column] = index * 16 + 16
+            break
+        values = blocks.values()
+        for column in list(unresolved):
+            for y in range(15, -1, -1):
+                if values[y << 8 | column] not in transparent:
+                    heights[column] = index * 16 + y + 1
+                    unresolved.discard(column)
+                    break
+        if not unresolved:
+            break
+    return heights
+
+
+class Heightmaps:
+    """
+    区块的高度图。
+
+    高度值为某一列中最高的、不属于该类型透明方块集合的方块的Y坐标 + 1 - min_y, 整列都透明时为0。
+    创建时对整个区块做一次列扫描 (有NumPy时按区块段向量化, 全是同一种方块的段直接跳过或命中),
+    之后挂在区块上, Chunk.set_block() 只更新受影响的一列, fill() 时重新计算。
+
+    Attributes:
+        chunk (Chunk): 所属的区块。
+        types (dict[str, frozenset]): 高度图类型 -> 透明方块状态集合。
+        heights (dict[str, array]): 高度图类型 -> 256个高度值, 索引为 z * 16 + x。
+    """
+
+    def __init__(self, chunk: Chunk, types: dict[str, frozenset] = None):
+        self.chunk = chunk
+        self.types = heightmap_types() if types is None else types
+        self.heights = {}
+        self.compute()
+        chunk.heightmaps = self
+
+    def compute(self):
+        """重新计算所有高度图"""
+        for name, transparent in self.types.items():
+            self.heights[name] = column_heights(self.chunk, transparent)
+
+    def update(self, x: int, y: int, z: int, state: int):
+        """
+        方块 (x, y, z) 被设为state后更新对应的一列。
+
+        Args:
+            x (int): 区块内X坐标 (0-15)。
+            y (int): 世界Y坐标。
+            z (int): 区块内Z坐标 (0-15)。
+            state (int): 新的方块状态。
+        """
+        column = z << 4 | x
+        top = y - self.chunk.min_y + 1
+        for name, transparent in self.types.items():
+            heights = self.heights[name]
+            if state not in transparent:
+                if top > heights[column]:
+                    heights[column] = top
+            elif top == heights[column]:
+                # 移除了最高的方块, 向下找到下一个
+                heights[column] = self._scan(x, top - 1, z, transparent)
+
+    def _scan(self, x: int, top: int, z: int, transparent: frozenset) -> int:
+        """从相对高度top (不含) 向下扫描一列, 返回新的高度值"""
+        sections = self.chunk.sections
+        while top > 0:
+            blocks = sections[(top - 1) >> 4].blocks
+            if blocks.bits == 0 and blocks.palette[0] in transparent:
+                top = (top - 1) & ~15
+                continue
+            if blocks.get(((top - 1) & 15) << 8 | z << 4 | x) not in transparent:
+                return top
+            top -= 1
+        return 0
+
+    def get(self, name: str, x: int, z: int) -> int:
+        """高度图name在 (x, z) 列的高度值"""
+        return self.heights[name][(z & 15) << 4 | (x & 15)]
+
+    def to_nbt(self) -> nbt.Compound:
+        """编码为区块数据包与区块存储使用的高度图Compound"""
+        return nbt.Compound("", *(nbt.LongArray(name, pack_heightmap(heights, self.chunk.height))
+                                  for name, heights in self.heights.items()))
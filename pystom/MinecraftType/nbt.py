@@ -1,8 +1,37 @@
+import os
 import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
 from enum import Enum, unique
+from itertools import repeat
 from typing import Tuple
 import gzip
 
+try:
+    import numpy
+except ImportError:  # NumPy为可选依赖, 缺失时数组标签退回array.array
+    numpy = None
+
+
+# 负载达到该字节数的Compound/List即使属于容器也缓存序列化结果, 修改其他部分时直接拼接
+MEMOIZE_THRESHOLD = 4096
+# 解码时驻留 (sys.intern) 的字符串最大字节数: 标签名和方块/生物群系ID等短字符串在大量区块中重复出现
+_INTERN_MAX_LENGTH = 64
+
+
+def _read_name(data, offset: int) -> Tuple[str, int]:
+    """读取带2字节长度前缀的UTF-8字符串 (标签名或String的值), 返回 (字符串, 结束偏移), 短字符串会被驻留"""
+    length = struct.unpack_from('>H', data, offset)[0]
+    offset += 2
+    text = bytes(data[offset:offset + length]).decode("utf-8")
+    if length <= _INTERN_MAX_LENGTH:
+        text = sys.intern(text)
+    return text, offset + length
+
 
 def IdToNbt(tag_id: int) -> 'NBTObject':
     match tag_id:
@@ -37,15 +66,95 @@ def IdToNbt(tag_id: int) -> 'NBTObject':
 
 
 class NBTObject(object):
-    """NBT类型对象"""
+    """
+    NBT类型对象
+
+    根节点 (不属于任何容器)、memoize() 标记过的节点以及负载达到 MEMOIZE_THRESHOLD 字节的Compound/List
+    会缓存负载的序列化结果, 其余的小节点每次随父节点重新编码, 因此只有较大的子树各保留一份字节,
+    内存不会随树的深度成倍增长。节点被修改时缓存沿父节点链向上失效,
+    再序列化时只重新编码到根的路径, 其余有缓存的子树直接拼接缓存。
+    dirty 表示节点自上次序列化以来被修改过 (从未序列化过的节点也是dirty), 与是否缓存无关。
+    Compound/List 的 value 是只读视图, 子标签只能通过 put()/pop_tag()/append() 或重新赋值修改,
+    因此缓存不会因为绕过 mark_dirty() 的修改而过期。
+    一个节点只属于一个Compound/List, 加入新的容器后由新容器跟踪其修改。
+    """
     TAG_ID = None
+    _frozen = False  # 被共享的冻结节点不允许修改
+    _memoized = False  # 不是根节点时是否也缓存序列化结果
+    _modified = True  # 自上次序列化以来是否被修改过
+    _CONTAINER = False  # 负载较大时是否自动缓存序列化结果 (Compound/List)
 
     def __init__(self, name: str, value):
         self._value = None
         self._name = ""
+        self._cache = None  # 负载的序列化缓存
+        self._parent = None  # 所属的Compound/List
+
+    def serialize(self) -> bytes:
+        """序列化 (只包含负载), 根节点、memoize() 标记过的节点与较大的Compound/List会缓存结果"""
+        if self._cache is not None:
+            return self._cache
+        data = bytes(self._encode())
+        if self._parent is None or self._keeps_cache(data):
+            self._cache = data
+        self._modified = False
+        return data
+
+    def _keeps_cache(self, data: bytes) -> bool:
+        """属于容器时是否仍缓存序列化结果"""
+        return self._memoized or self._CONTAINER and len(data) >= MEMOIZE_THRESHOLD
+
+    def memoize(self) -> 'NBTObject':
+        """即使加入了容器也缓存序列化结果, 用于很少修改、父节点却经常重新序列化的子树; 返回自身"""
+        self._memoized = True
+        return self
+
+    def _encode(self) -> bytearray:
+        """编码负载"""
+
+    @property
+    def dirty(self) -> bool:
+        """自上次序列化以来是否被修改过, 从未序列化过的节点也是dirty"""
+        return self._modified
 
-    def serialize(self) -> bytearray:
-        """序列化"""
+    @property
+    def cached(self) -> bool:
+        """是否持有有效的序列化缓存"""
+        return self._cache is not None
+
+    def mark_dirty(self):
+        """使自身及所有祖先节点的序列化缓存失效, 原地修改数组内容后需要手动调用"""
+        if self._frozen:
+            raise TypeError(f"{self.__class__.__name__} is frozen and shared, it cannot be modified")
+        self._cache = None
+        self._modified = True
+        node = self._parent
+        # 被修改过的节点的祖先都已失效 (序列化会重新编码所有被修改过的节点), 遇到时即可停止
+        while node is not None and not (node._modified and node._cache is None):
+            node._cache = None
+            node._modified = True
+            node = node._parent
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self) -> 'NBTObject':
+        """
+        冻结自身及全部子标签, 之后的任何修改都会抛出TypeError; 返回自身。
+
+        冻结的节点可以被多个容器共享, 加入容器时不会记录父节点, 序列化结果只缓存在冻结的根上。
+        """
+        self._parent = None
+        stack = [self]
+        while stack:
+            tag = stack.pop()
+            tag._frozen = True
+            if numpy is not None and isinstance(tag._value, numpy.ndarray):
+                tag._value.flags.writeable = False
+            stack.extend(_children(tag))
+        self.serialize()
+        return self
 
     @classmethod
     def fromValue(cls, value: bytearray, return_size: bool = False) -> 'NBTObject':
@@ -61,6 +170,7 @@ class NBTObject(object):
 
     @value.setter
     def value(self, value):
+        self.mark_dirty()
         self._value = value
 
     @property
@@ -70,7 +180,11 @@ class NBTObject(object):
     @name.setter
     def name(self, value):
         if not isinstance(value, (str, bytearray, bytes)): raise TypeError("name must be string or bytes")
+        if self._frozen:
+            raise TypeError(f"{self.__class__.__name__} is frozen and shared, it cannot be modified")
         self._name = value
+        if self._parent is not None:
+            self._parent.mark_dirty()
 
     def __repr__(self):
         return f"{self.__class__.__name__}(name=\"{self.name}\", value={self.value})" if self.name != "" else f"{self.__class__.__name__}({self.value})"
@@ -78,6 +192,82 @@ class NBTObject(object):
     __str__ = __repr__
 
 
+def _adopt(parent: NBTObject, child: NBTObject):
+    """
+    child加入容器parent: 记录父节点, 属于容器后不再缓存的小节点的缓存交给祖先节点保存。
+    冻结的节点可能同时属于多个容器, 不记录父节点, 也保留其缓存。
+    """
+    if child._frozen:
+        return
+    child._parent = parent
+    if child._cache is not None and not child._keeps_cache(child._cache):
+        child._cache = None
+
+
+class _ReadOnlyDict(Mapping):
+    """Compound子标签的只读视图"""
+    __slots__ = ("_data",)
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def keys(self):
+        return self._data.keys()
+
+    def values(self):
+        return self._data.values()
+
+    def items(self):
+        return self._data.items()
+
+    def __or__(self, other) -> dict:
+        return self._data | dict(other)
+
+    def __eq__(self, other):
+        return self._data == (other._data if isinstance(other, _ReadOnlyDict) else other)
+
+    def __repr__(self):
+        return repr(self._data)
+
+
+class _ReadOnlyList(Sequence):
+    """List元素的只读视图"""
+    __slots__ = ("_data",)
+
+    def __init__(self, data: list):
+        self._data = data
+
+    def __getitem__(self, index):
+        return self._data[index]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, item):
+        return item in self._data
+
+    def __eq__(self, other):
+        return self._data == (other._data if isinstance(other, _ReadOnlyList) else other)
+
+    def __repr__(self):
+        return repr(self._data)
+
+
 class End(NBTObject):
     TAG_ID = 0x00
 
@@ -111,7 +301,7 @@ class Byte(NBTObject):
             raise ValueError("NBT Byte value must be between -128 and 127")
         NBTObject.value.fset(self, value)
 
-    def serialize(self) -> bytearray:
+    def _encode(self) -> bytearray:
         return bytearray(struct.pack(">b", self.value))
 
     @classmethod
@@ -121,10 +311,7 @@ class Byte(NBTObject):
             raise ValueError("Invalid data for NBT Byte")
         offset += 1
 
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         value = struct.unpack_from(">b", data, offset)[0]
         offset += 1
@@ -163,7 +350,7 @@ class Short(NBTObject):
             raise ValueError("NBT Short value must be between -32,768 and 32,767")
         NBTObject.value.fset(self, value)
 
-    def serialize(self) -> bytearray:
+    def _encode(self) -> bytearray:
         return bytearray(struct.pack(">h", self.value))
 
     @classmethod
@@ -173,10 +360,7 @@ class Short(NBTObject):
             raise ValueError("Invalid data for NBT Short")
         offset += 1
 
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         value = struct.unpack_from(">h", data, offset)[0]
         offset += 2
@@ -214,7 +398,7 @@ class Int(NBTObject):
             "NBT Int value must be between -2,147,483,648 and 2,147,483,647")
         NBTObject.value.fset(self, value)
 
-    def serialize(self) -> bytearray:
+    def _encode(self) -> bytearray:
         return bytearray(struct.pack(">i", self.value))
 
     @classmethod
@@ -224,10 +408,7 @@ class Int(NBTObject):
             raise ValueError("NBT Int value must be bytes")
         offset += 1
 
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         value = struct.unpack_from(">i", data, offset)[0]
         offset += 4
@@ -267,7 +448,7 @@ class Long(NBTObject):
             raise ValueError("NBT Long value exceeds the range of a 64-bit signed integer")
         NBTObject.value.fset(self, value)
 
-    def serialize(self) -> bytearray:
+    def _encode(self) -> bytearray:
         return bytearray(struct.pack(">q", self.value))
 
     @classmethod
@@ -277,10 +458,7 @@ class Long(NBTObject):
             raise ValueError("Invalid data for NBT Long")
         offset += 1
 
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         value = struct.unpack_from(">q", data, offset)[0]
         offset += 8
@@ -321,7 +499,7 @@ class Float(NBTObject):
             raise ValueError("NBT Float value exceeds the range of a 32-bit single-precision float")
         NBTObject.value.fset(self, value_float)
 
-    def serialize(self) -> bytearray:
+    def _encode(self) -> bytearray:
         return bytearray(struct.pack(">f", self.value))
 
     @classmethod
@@ -331,10 +509,7 @@ class Float(NBTObject):
             raise ValueError("Invalid data for NBT Float")
         offset += 1
 
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         value = struct.unpack_from(">f", data, offset)[0]
         offset += 4
@@ -373,7 +548,7 @@ class Double(NBTObject):
         value_float = float(value)
         NBTObject.value.fset(self, value_float)
 
-    def serialize(self) -> bytearray:
+    def _encode(self) -> bytearray:
         return bytearray(struct.pack(">d", self.value))
 
     @classmethod
@@ -383,10 +558,7 @@ class Double(NBTObject):
             raise ValueError("Invalid data for NBT Double")
         offset += 1
 
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         value = struct.unpack_from(">d", data, offset)[0]
         offset += 8
@@ -419,14 +591,21 @@ class ByteArray(NBTObject):
 
     @value.setter
     def value(self, value):
-        if not isinstance(value, (bytes, bytearray)):
-            raise TypeError('value must be bytes or bytearray')
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            raise TypeError('value must be bytes, bytearray or memoryview')
         # 长度检查 (根据JVM实现，最大值可能在2,147,483,639到2,147,483,647之间)
         if len(value) > 2147483647:
             raise ValueError("ByteArray length exceeds maximum limit")
+        self.mark_dirty()
         self._value = bytes(value)  # 确保是不可变的bytes
 
-    def serialize(self) -> bytearray:
+    def view(self):
+        """返回字节数据的零拷贝视图: 有NumPy时为int8 ndarray, 否则为有符号字节的memoryview"""
+        if numpy is not None:
+            return numpy.frombuffer(self._value, dtype="i1")
+        return memoryview(self._value).cast("b")
+
+    def _encode(self) -> bytearray:
         # 序列化: 长度 (4字节, 大端序) + 字节数据
         data = bytearray()
         data.extend(struct.pack(">i", len(self.value)))  # 长度
@@ -441,10 +620,7 @@ class ByteArray(NBTObject):
         offset += 1
 
         # 读取名称
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         # 读取数组长度
         array_length = struct.unpack_from(">i", data, offset)[0]
@@ -483,12 +659,13 @@ class String(NBTObject):
     def value(self, value):
         if not isinstance(value, (str, bytearray, bytes)):
             raise TypeError('value must be a string')
+        self.mark_dirty()
         if isinstance(value, (bytes, bytearray)):
             self._value = bytes(value).decode("utf-8")
-            return
-        self._value = str(value)
+        else:
+            self._value = str(value)
 
-    def serialize(self) -> bytearray:
+    def _encode(self) -> bytearray:
         data = bytearray()
         # 将字符串编码为UTF-8字节
         encoded_str = self.value.encode('utf-8')
@@ -505,17 +682,10 @@ class String(NBTObject):
         offset += 1
 
         # 读取标签名称
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
-        # 读取字符串长度 (无符号短整型)
-        str_length = struct.unpack_from(">H", data, offset)[0]
-        offset += 2
-        # 读取字符串字节数据并解码
-        value = data[offset:offset + str_length].decode("utf-8")
-        offset += str_length
+        # 读取字符串 (无符号短整型长度 + UTF-8字节数据)
+        value, offset = _read_name(data, offset)
 
         if return_offset:
             return cls(name, value), offset
@@ -523,14 +693,14 @@ class String(NBTObject):
 
     @classmethod
     def fromValue(cls, value: bytearray, return_size: bool = False) -> 'NBTObject':
-        length = struct.unpack_from(">H", value, 0)[0]
-        offset = 2
+        text, size = _read_name(value, 0)
         if return_size:
-            return cls("", value[offset:offset + length]), 2 + length
-        return cls("", value[offset:offset + length])
+            return cls("", text), size
+        return cls("", text)
 
 
 class List(NBTObject):
+    _CONTAINER = True
     """表示NBT的List类型。列表中的所有元素必须是同一类型的NBTObject。"""
     TAG_ID = 0x09
 
@@ -542,31 +712,36 @@ class List(NBTObject):
         self.name = name
 
     @property
-    def value(self):
-        return self._value
+    def value(self) -> Sequence[NBTObject]:
+        """元素的只读视图, 修改请使用 append() 或重新赋值"""
+        return _ReadOnlyList(self._value)
 
     @value.setter
     def value(self, value: list[NBTObject]):
-        if not isinstance(value, list):
+        if not isinstance(value, (list, tuple, _ReadOnlyList)):
             raise TypeError('value must be a list')
-        if value and not all(isinstance(item, IdToNbt(item.TAG_ID)) for item in value):
+        value = list(value)
+        if value and not all(isinstance(item, IdToNbt(value[0].TAG_ID)) for item in value):
             raise TypeError('All elements in a NBT List must be of the same type')
+        self.mark_dirty()
+        for item in value:
+            _adopt(self, item)
         self._value = value
 
-    def serialize(self) -> bytearray:
+    def _encode(self) -> bytearray:
         data = bytearray()
-        if not self.value:
+        if not self._value:
             # 空列表的元素类型可以视为TAG_End
             data.append(0x00)  # 元素类型ID
             data.extend(struct.pack(">i", 0))  # 长度为0
             return data
 
         # 添加元素类型ID
-        data.append(self.value[0].TAG_ID)
+        data.append(self._value[0].TAG_ID)
         # 添加列表长度
-        data.extend(struct.pack(">i", len(self.value)))
+        data.extend(struct.pack(">i", len(self._value)))
         # 序列化每个元素（只序列化其负载payload，即serialize()返回的数据）
-        for item in self.value:
+        for item in self._value:
             data.extend(item.serialize())  # 注意：列表中的元素没有名称！
         return data
 
@@ -578,10 +753,7 @@ class List(NBTObject):
         offset += 1
 
         # 读取标签名称
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         # 读取元素类型ID
         element_type_id = data[offset]
@@ -597,6 +769,13 @@ class List(NBTObject):
         element_class = IdToNbt(element_type_id)
         if element_class is None and element_type_id != 0x00:  # TAG_End
             raise ValueError(f"Unsupported element type ID in List: 0x{element_type_id:02x}")
+        # 数值类元素整块解码为TypedList
+        if element_type_id in TypedList.TYPECODES:
+            obj, offset = TypedList._read(element_type_id, list_length, data, offset)
+            obj.name = name
+            if return_offset:
+                return obj, offset
+            return obj
 
         # 反序列化每个元素
         for _ in range(list_length):
@@ -614,6 +793,11 @@ class List(NBTObject):
         element_id = value[0]
         list_length = struct.unpack_from(">i", value, 1)[0]
         offset = 5
+        if element_id in TypedList.TYPECODES:
+            obj, offset = TypedList._read(element_id, list_length, value, offset)
+            if return_size:
+                return obj, offset
+            return obj
         element_class = IdToNbt(element_id)
         elements = []
         for _ in range(list_length):
@@ -627,15 +811,109 @@ class List(NBTObject):
 
     def append(self, other: NBTObject):
         if not isinstance(other, NBTObject): raise TypeError('other must be a NBTObject')
-        self.value.append(other)
+        self.mark_dirty()
+        _adopt(self, other)
+        self._value.append(other)
 
     def __add__(self, other: NBTObject):
         self.append(other)
         return self
 
 
+class TypedList(List):
+    """
+    元素类型固定的数值List。
+
+    元素类型只在创建时记录一次, 负载以array.array紧凑存储 (如Double列表为 array('d')),
+    追加为O(1), 序列化与反序列化都是整块处理。解码时元素为Byte/Short/Int/Long/Float/Double的List都会得到TypedList。
+
+    为了与List保持兼容, value返回的是元素展开后的NBTObject (只读, 修改这些标签会抛出TypeError);
+    索引、迭代与 array 直接访问数值, 不会为每个数值创建对象。原地修改 array 后需要调用 mark_dirty()。
+    """
+    TYPECODES = {0x01: "b", 0x02: "h", 0x03: "i", 0x04: "q", 0x05: "f", 0x06: "d"}
+
+    def __init__(self, name: str = "", element_type: type[NBTObject] = None, value=None):
+        if element_type is None or element_type.TAG_ID not in self.TYPECODES:
+            raise TypeError("TypedList element type must be Byte, Short, Int, Long, Float or Double")
+        self.element_type = element_type
+        self._typecode = self.TYPECODES[element_type.TAG_ID]
+        super().__init__(name, array(self._typecode) if value is None else value)
+
+    @property
+    def value(self) -> tuple[NBTObject, ...]:
+        tags = self.tags()
+        for tag in tags:
+            tag._frozen = True
+        return tuple(tags)
+
+    @value.setter
+    def value(self, value):
+        if isinstance(value, array) and value.typecode == self._typecode:
+            self.mark_dirty()
+            self._value = value
+            return
+        self._value = array(self._typecode)
+        for item in value:
+            self.append(item)
+
+    @property
+    def array(self) -> array:
+        """元素的数值数组, 冻结后为只读的memoryview"""
+        if self._frozen:
+            return memoryview(self._value).toreadonly()
+        return self._value
+
+    def _unwrap(self, item):
+        if isinstance(item, NBTObject):
+            if item.TAG_ID != self.element_type.TAG_ID:
+                raise TypeError(f'All elements in a TypedList must be {self.element_type.__name__}')
+            return item.value
+        return item
+
+    def append(self, other):
+        self.mark_dirty()
+        try:
+            self._value.append(self._unwrap(other))
+        except OverflowError:
+            raise ValueError(f"value exceeds the range of NBT {self.element_type.__name__}") from None
+
+    def tags(self) -> list[NBTObject]:
+        """将元素展开为NBTObject列表"""
+        return [self.element_type("", item) for item in self._value]
+
+    def __len__(self):
+        return len(self._value)
+
+    def __getitem__(self, index):
+        return self._value[index]
+
+    def __iter__(self):
+        return iter(self._value)
+
+    def _encode(self) -> bytearray:
+        data = bytearray([self.element_type.TAG_ID])
+        data += struct.pack(">i", len(self._value))
+        values = self._value
+        if sys.byteorder == "little":
+            values = values[:]
+            values.byteswap()
+        data += values.tobytes()
+        return data
+
+    @classmethod
+    def _read(cls, element_id: int, list_length: int, data, offset: int) -> Tuple['TypedList', int]:
+        """从offset处整块读取list_length个元素, 返回 (对象, 负载结束偏移)"""
+        values = array(cls.TYPECODES[element_id])
+        end = offset + list_length * values.itemsize
+        values.frombytes(data[offset:end])
+        if sys.byteorder == "little":
+            values.byteswap()
+        return cls("", IdToNbt(element_id), values), end
+
+
 class Compound(NBTObject):
     TAG_ID = 0x0A
+    _CONTAINER = True
 
     def __init__(self, name: str = "", *value: NBTObject):
         super().__init__(value, name)
@@ -644,23 +922,32 @@ class Compound(NBTObject):
         self.value = value
 
     @property
-    def value(self) -> dict[str, NBTObject]:
-        return NBTObject.value.fget(self)
+    def value(self) -> Mapping[str, NBTObject]:
+        """子标签的只读视图, 修改请使用 put() / pop_tag()"""
+        return _ReadOnlyDict(self._value)
 
     @value.setter
     def value(self, value):
+        self.mark_dirty()
         for nbt in value:
             if not isinstance(nbt, NBTObject): raise TypeError("value must be an NBTObject")
+            _adopt(self, nbt)
             self._value[nbt.name] = nbt
 
     def pop_tag(self, name: str):
         if not isinstance(name, str): raise TypeError("name must be string")
+        self.mark_dirty()
         self._value.pop(name, None)
 
-    def serialize(self) -> bytearray:
+    def put(self, *tags: NBTObject) -> 'Compound':
+        """原地加入子标签 (同名覆盖), 返回自身以便链式调用"""
+        self.value = tags
+        return self
+
+    def _encode(self) -> bytearray:
         data = bytearray()
 
-        data += serialize(*self.value.values(), compress=False)
+        data += serialize(*self._value.values(), compress=False)
 
         data.append(0x00)
         return data
@@ -672,10 +959,7 @@ class Compound(NBTObject):
             raise ValueError("NBT Int value must be bytes")
         offset += 1
 
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
+        name, offset = _read_name(data, offset)
 
         tags = []
 
@@ -708,185 +992,351 @@ class Compound(NBTObject):
 
     def __getitem__(self, name: str) -> NBTObject:
         if not isinstance(name, str): raise TypeError("name must be string")
-        return self.value[name]
+        return self._value[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._value
 
     def __add__(self, other: 'NBTObject') -> 'NBTObject':
         if not isinstance(other, NBTObject): raise TypeError("other must be an NBTObject")
-        return Compound(self.name, *(self.value | {other.name: other}).values())
+        return Compound(self.name, *(self._value | {other.name: other}).values())
 
 
-class IntArray(NBTObject):
-    """表示NBT的IntArray类型"""
-    TAG_ID = 0x0B
+class LazyCompound(Compound):
+    """
+    延迟解码的Compound。
 
-    def __init__(self, name: str = "", value: list[int] = None):
-        if value is None:
-            value = []
-        super().__init__(value, name)
-        self.value = value
-        self.name = name
+    子标签在首次访问前只记录为原始数据中的字节区间 (start, end), 访问时才解码;
+    未被访问过的子标签序列化时直接复制原始字节, 整个Compound未被改动时只需一次内存拷贝。
+    嵌套的Compound子标签同样以LazyCompound解码, 并与父节点共享同一块原始数据。
+    """
+
+    def __init__(self, name: str = "", *value: NBTObject):
+        self._view = memoryview(b"")
+        self._span = None  # 自身负载在原始数据中的区间, 仅在未改动时有效
+        super().__init__(name, *value)
 
     @property
-    def value(self):
-        return self._value
+    def value(self) -> Mapping[str, NBTObject]:
+        for name, tag in self._value.items():
+            if type(tag) is tuple:
+                self._decode(name)
+        return _ReadOnlyDict(self._value)
 
     @value.setter
     def value(self, value):
-        if not isinstance(value, list):
-            raise TypeError('value must be a list of integers')
-        if not all(isinstance(item, int) for item in value):
-            raise TypeError('All items in IntArray must be integers')
-        # 长度检查
-        if len(value) > 2147483647:
-            raise ValueError("IntArray length exceeds maximum limit")
-        self._value = value
+        self._span = None
+        Compound.value.fset(self, value)
+
+    def _decode(self, name: str) -> NBTObject:
+        """解码单个子标签并替换掉其字节区间"""
+        start, end = self._value[name]
+        tag_id = self._view[start]
+        if tag_id == Compound.TAG_ID:
+            payload = start + 3 + struct.unpack_from(">H", self._view, start + 1)[0]
+            tag, _ = LazyCompound._scan(self._view, payload, name)
+        else:
+            tag = IdToNbt(tag_id).deserialize(bytes(self._view[start:end]))
+        _adopt(self, tag)
+        self._value[name] = tag
+        self._span = None
+        return tag
 
-    def serialize(self) -> bytearray:
+    @classmethod
+    def _scan(cls, view: memoryview, offset: int, name: str = "") -> Tuple['LazyCompound', int]:
+        """从负载起始偏移扫描子标签区间, 返回 (对象, 负载结束偏移)"""
+        obj = cls(name)
+        obj._view = view
+        start = offset
+        while (tag_id := view[offset]) != End.TAG_ID:
+            tag_name, payload = _read_name(view, offset + 1)
+            end = _skip_payload(tag_id, view, payload)
+            obj._value[tag_name] = (offset, end)
+            offset = end
+        obj._span = (start, offset + 1)
+        return obj, offset + 1
+
+    def _encode(self) -> bytearray:
+        if self._span is not None:
+            return bytes(self._view[self._span[0]:self._span[1]])
         data = bytearray()
-        data.extend(struct.pack(">i", len(self.value)))  # 长度
-        # 打包所有整数值
-        for num in self.value:
-            data.extend(struct.pack(">i", num))
+        for tag in self._value.values():
+            if type(tag) is tuple:
+                data += self._view[tag[0]:tag[1]]
+            else:
+                data += serialize(tag, compress=False)
+        data.append(0x00)
         return data
 
     @classmethod
     def deserialize(cls, data: bytearray, return_offset: bool = False) -> 'NBTObject' | Tuple['NBTObject', int]:
-        offset = 0
-        if data[offset] != cls.TAG_ID:
-            raise ValueError("Invalid data for NBT IntArray")
-        offset += 1
-
-        # 读取名称
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
-
-        # 读取数组长度
-        array_length = struct.unpack_from(">i", data, offset)[0]
-        offset += 4
-
-        value = []
-        # 读取array_length个整型值
-        for _ in range(array_length):
-            int_val = struct.unpack_from(">i", data, offset)[0]
-            value.append(int_val)
-            offset += 4
-
-        if return_offset:
-            return cls(name, value), offset
-        return cls(name, value)
+        if data[0] != cls.TAG_ID:
+            raise ValueError("Invalid data for NBT Compound")
+        view = memoryview(bytes(data) if isinstance(data, bytearray) else data)
+        name, offset = _read_name(view, 1)
+        obj, offset = cls._scan(view, offset, name)
+        if return_offset: return obj, offset
+        return obj
 
     @classmethod
     def fromValue(cls, value: bytearray, return_size: bool = False) -> 'NBTObject':
-        offset, size = 0, 0
-        if len(value) < 4:
-            raise ValueError("Insufficient data for IntArray length.")
-        array_length = struct.unpack_from(">i", value, offset)[0]
-        offset += 4
-        size += 4
+        view = memoryview(bytes(value) if isinstance(value, bytearray) else value)
+        obj, size = cls._scan(view, 0)
+        if return_size: return obj, size
+        return obj
 
-        if len(value) < offset + array_length * 4:
-            raise ValueError("Insufficient data for IntArray elements.")
+    def __getitem__(self, name: str) -> NBTObject:
+        if not isinstance(name, str): raise TypeError("name must be string")
+        tag = self._value[name]
+        return self._decode(name) if type(tag) is tuple else tag
 
-        # 3. 读取array_length个整型值
-        value = []
-        for _ in range(array_length):
-            int_val = struct.unpack_from(">i", value, offset)[0]
-            value.append(int_val)
-            offset += 4
-            size += 4
+    def pop_tag(self, name: str):
+        self._span = None
+        super().pop_tag(name)
 
-        if return_size:
-            return cls("", value), size
-        return cls("", value)
+    def __add__(self, other: 'NBTObject') -> 'NBTObject':
+        if not isinstance(other, NBTObject): raise TypeError("other must be an NBTObject")
+        obj = LazyCompound(self.name)
+        obj._view = self._view
+        obj._value = self._value | {other.name: other}
+        return obj
 
 
-class LongArray(NBTObject):
-    """表示NBT的LongArray类型"""
-    TAG_ID = 0x0C
+class _NumericArray(NBTObject):
+    """
+    IntArray/LongArray的公共实现。
+
+    数据以整块方式解码: 有NumPy时为大端序的 numpy.ndarray (从bytes解码时是指向原始数据的只读零拷贝视图),
+    否则为本机字节序的 array.array。两者都支持 len/索引/迭代, 序列化均为一次整块拷贝。
+    """
+    _TYPECODE = None  # array.array 类型码
+    _DTYPE = None  # NumPy 大端序类型
 
-    def __init__(self, name: str = "", value: list[int] = None):
+    def __init__(self, name: str = "", value=None):
         if value is None:
-            value = []
+            value = array(self._TYPECODE)
         super().__init__(value, name)
         self.value = value
         self.name = name
 
     @property
     def value(self):
+        """数组数据; 冻结后ndarray不可写, array.array以只读的memoryview返回"""
+        if self._frozen and isinstance(self._value, array):
+            return memoryview(self._value).toreadonly()
         return self._value
 
     @value.setter
     def value(self, value):
-        if not isinstance(value, list):
-            raise TypeError('value must be a list of integers')
-        if not all(isinstance(item, int) for item in value):
-            raise TypeError('All items in LongArray must be integers')
-        # 长度检查[1](@ref)
+        if numpy is not None and isinstance(value, numpy.ndarray):
+            if value.ndim != 1 or value.dtype.kind not in "iu":
+                raise TypeError(f'{self.__class__.__name__} value must be a 1-D integer array')
+            value = value.astype(self._DTYPE, copy=False)
+        elif isinstance(value, array):
+            if value.typecode != self._TYPECODE:
+                value = self._to_array(value)
+        elif isinstance(value, (list, tuple)):
+            if not all(isinstance(item, int) for item in value):
+                raise TypeError(f'All items in {self.__class__.__name__} must be integers')
+            value = self._to_array(value)
+        else:
+            raise TypeError('value must be a list, array.array or numpy.ndarray of integers')
+        # 长度检查
         if len(value) > 2147483647:
-            raise ValueError("LongArray length exceeds maximum limit")
+            raise ValueError(f"{self.__class__.__name__} length exceeds maximum limit")
+        self.mark_dirty()
         self._value = value
 
-    def serialize(self) -> bytearray:
-        data = bytearray()
-        data.extend(struct.pack(">i", len(self.value)))  # 长度
-        # 打包所有长整数值
-        for num in self.value:
-            data.extend(struct.pack(">q", num))
+    @classmethod
+    def _to_array(cls, value) -> array:
+        try:
+            return array(cls._TYPECODE, value)
+        except OverflowError:
+            raise ValueError(f"{cls.__name__} item exceeds the range of its element type") from None
+
+    def view(self):
+        """返回数组数据的视图: 有NumPy时为大端序ndarray, 否则为本机字节序的memoryview"""
+        if numpy is not None:
+            if isinstance(self._value, numpy.ndarray):
+                return self._value
+            return numpy.frombuffer(self._pack(self._value), dtype=self._DTYPE)
+        return memoryview(self._value)
+
+    @classmethod
+    def _unpack(cls, data, offset: int, length: int):
+        """
+        从offset处批量解码length个大端序元素。
+        只有数据是不可变的bytes时才返回零拷贝的 (只读) 视图, bytearray等可变缓冲区则复制一份,
+        否则标签的值会与调用方的缓冲区 (以及同一缓冲区解码出的其他标签) 共用内存。
+        """
+        if numpy is not None:
+            values = numpy.frombuffer(data, dtype=cls._DTYPE, count=length, offset=offset)
+            if isinstance(data, bytes) or isinstance(data, memoryview) and isinstance(data.obj, bytes):
+                return values
+            return values.copy()
+        values = array(cls._TYPECODE)
+        values.frombytes(data[offset:offset + length * values.itemsize])
+        if sys.byteorder == "little":
+            values.byteswap()
+        return values
+
+    def _pack(self, values) -> bytes:
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            return values.astype(self._DTYPE, copy=False).tobytes()
+        if sys.byteorder == "little":
+            values = values[:]
+            values.byteswap()
+        return values.tobytes()
+
+    def _encode(self) -> bytearray:
+        data = bytearray(struct.pack(">i", len(self._value)))  # 长度
+        data += self._pack(self._value)
         return data
 
     @classmethod
     def deserialize(cls, data: bytearray, return_offset: bool = False) -> 'NBTObject' | Tuple['NBTObject', int]:
         offset = 0
         if data[offset] != cls.TAG_ID:
-            raise ValueError("Invalid data for NBT LongArray")
+            raise ValueError(f"Invalid data for NBT {cls.__name__}")
         offset += 1
 
         # 读取名称
-        name_length = struct.unpack_from('>H', data, offset)[0]
-        offset += 2
-        name = data[offset:offset + name_length].decode("utf-8")
-        offset += name_length
-
-        # 读取数组长度
-        array_length = struct.unpack_from(">i", data, offset)[0]
-        offset += 4
+        name, offset = _read_name(data, offset)
 
-        value = []
-        # 读取array_length个长整型值
-        for _ in range(array_length):
-            long_val = struct.unpack_from(">q", data, offset)[0]
-            value.append(long_val)
-            offset += 8
+        obj, offset = cls._read(data, offset)
+        obj.name = name
 
         if return_offset:
-            return cls(name, value), offset
-        return cls(name, value)
+            return obj, offset
+        return obj
 
     @classmethod
     def fromValue(cls, value: bytearray, return_size: bool = False) -> 'NBTObject':
-        offset, size = 0, 0
-        if len(value) < 4:
-            raise ValueError("Insufficient data for IntArray length.")
-        array_length = struct.unpack_from(">i", value, offset)[0]
+        obj, size = cls._read(value, 0)
+        if return_size:
+            return obj, size
+        return obj
+
+    @classmethod
+    def _read(cls, data, offset: int) -> Tuple['NBTObject', int]:
+        """从offset处读取数组负载, 返回 (对象, 负载结束偏移)"""
+        if len(data) < offset + 4:
+            raise ValueError(f"Insufficient data for {cls.__name__} length.")
+        array_length = struct.unpack_from(">i", data, offset)[0]
         offset += 4
-        size += 4
+        end = offset + array_length * array(cls._TYPECODE).itemsize
+        if len(data) < end:
+            raise ValueError(f"Insufficient data for {cls.__name__} elements.")
+        return cls("", cls._unpack(data, offset, array_length)), end
 
-        if len(value) < offset + array_length * 8:
-            raise ValueError("Insufficient data for LongArray elements.")
 
-        # 3. 读取array_length个整型值
-        value = []
-        for _ in range(array_length):
-            int_val = struct.unpack_from(">q", value, offset)[0]
-            value.append(int_val)
-            offset += 8
-            size += 8
+class IntArray(_NumericArray):
+    """表示NBT的IntArray类型"""
+    TAG_ID = 0x0B
+    _TYPECODE = "i"
+    _DTYPE = ">i4"
 
-        if return_size:
-            return cls("", value), size
-        return cls("", value)
+
+class LongArray(_NumericArray):
+    """表示NBT的LongArray类型"""
+    TAG_ID = 0x0C
+    _TYPECODE = "q"
+    _DTYPE = ">i8"
+
+
+def _children(tag: NBTObject) -> list[NBTObject]:
+    """返回容器标签的直接子标签, 非容器返回空列表"""
+    if isinstance(tag, Compound):
+        return list(tag.value.values())
+    if isinstance(tag, List) and not isinstance(tag, TypedList):
+        return list(tag._value)
+    return []
+
+
+class SubtreePool:
+    """
+    不可变子树的共享池 (hash-consing)。
+
+    share() 会在一棵树中找到名称属于 names 的容器 (默认为方块/生物群系的 "palette"),
+    把其中序列化结果与名称都相同的元素替换为同一个冻结实例。容器本身保持可修改,
+    池可以在多个区块的解码之间复用, 大量区块重复的调色板条目在内存中只保留一份。
+    """
+    DEFAULT_NAMES = frozenset({"palette"})
+
+    def __init__(self, names=DEFAULT_NAMES):
+        self.names = frozenset(names)
+        self._pool: dict[tuple, NBTObject] = {}
+        self.hits = 0  # 被替换为共享实例的子树数量
+
+    def __len__(self):
+        return len(self._pool)
+
+    def intern(self, tag: NBTObject) -> NBTObject:
+        """返回与tag等价的共享冻结实例, 池中没有时冻结tag本身并放入池中"""
+        key = (tag.TAG_ID, tag.name, tag.serialize())
+        shared = self._pool.get(key)
+        if shared is None:
+            self._pool[key] = shared = tag.freeze()
+        elif shared is not tag:
+            self.hits += 1
+        return shared
+
+    def share(self, root: NBTObject) -> NBTObject:
+        """对root中所有名称属于names的容器的元素进行共享, 原地修改并返回root"""
+        stack = [root]
+        while stack:
+            tag = stack.pop()
+            if tag.frozen:
+                continue
+            if tag.name in self.names and isinstance(tag, (Compound, List)) and not isinstance(tag, TypedList):
+                self._share_elements(tag)
+                continue
+            stack.extend(_children(tag))
+        return root
+
+    def _share_elements(self, container: NBTObject):
+        # 直接替换容器内部存储: 等价的共享实例不改变序列化结果, 因此容器缓存依然有效
+        if isinstance(container, Compound):
+            for name, tag in container.value.items():
+                container._value[name] = self.intern(tag)
+        else:
+            container._value[:] = [self.intern(tag) for tag in container.value]
+
+
+_FIXED_PAYLOAD_SIZE = {0x01: 1, 0x02: 2, 0x03: 4, 0x04: 8, 0x05: 4, 0x06: 8}
+
+
+def _skip_payload(tag_id: int, data, offset: int) -> int:
+    """跳过一个标签的负载而不解码, 返回负载之后的偏移量"""
+    size = _FIXED_PAYLOAD_SIZE.get(tag_id)
+    if size is not None:
+        return offset + size
+    match tag_id:
+        case 0x07:
+            return offset + 4 + struct.unpack_from(">i", data, offset)[0]
+        case 0x08:
+            return offset + 2 + struct.unpack_from(">H", data, offset)[0]
+        case 0x09:
+            element_id = data[offset]
+            list_length = struct.unpack_from(">i", data, offset + 1)[0]
+            offset += 5
+            size = _FIXED_PAYLOAD_SIZE.get(element_id)
+            if size is not None:
+                return offset + size * list_length
+            for _ in range(list_length):
+                offset = _skip_payload(element_id, data, offset)
+            return offset
+        case 0x0A:
+            while (element_id := data[offset]) != 0x00:
+                name_length = struct.unpack_from(">H", data, offset + 1)[0]
+                offset = _skip_payload(element_id, data, offset + 3 + name_length)
+            return offset + 1
+        case 0x0B:
+            return offset + 4 + 4 * struct.unpack_from(">i", data, offset)[0]
+        case 0x0C:
+            return offset + 4 + 8 * struct.unpack_from(">i", data, offset)[0]
+        case _:
+            raise ValueError(f"Unsupported tag ID: 0x{tag_id:02x}")
 
 
 def serialize(*data: NBTObject, compress: bool = True, compression_level: int = None) -> bytearray:
@@ -904,26 +1354,145 @@ def serialize(*data: NBTObject, compress: bool = True, compression_level: int =
     if not compress:
         return bytedata
 
+    return gzip.compress(bytedata, compresslevel=_compression_level(len(bytedata), compression_level))
+
+
+def _compression_level(size: int, compression_level: int = None) -> int:
+    """未指定压缩等级时按数据大小选择"""
     if compression_level is not None:
-        compression_level = compression_level
-    elif len(bytedata) < 100 * 1024:  # data < 100KB
-        compression_level = 1
-    elif len(bytedata) < 10 * 1024 * 1024:  # 100KB < data < 10MB
-        compression_level = 5
+        return compression_level
+    elif size < 100 * 1024:  # data < 100KB
+        return 1
+    elif size < 10 * 1024 * 1024:  # 100KB < data < 10MB
+        return 5
     else:
-        compression_level = 6
+        return 6
+
 
-    return gzip.compress(bytedata, compresslevel=compression_level)
+def serialize_network(obj: NBTObject) -> bytes:
+    """按网络协议格式 (1.20.2+) 序列化: 根标签不带名称, 负载使用缓存"""
+    return bytes([obj.TAG_ID]) + obj.serialize()
 
 
-def deserialize(data: bytearray, compress: bool = True):
+def deserialize(data: bytearray, compress: bool = True, lazy: bool = False, pool: SubtreePool = None):
+    """
+    反序列化NBT数据。
+
+    Args:
+        data: NBT二进制数据。
+        compress: 数据是否经过gzip压缩。
+        lazy: 根标签为Compound时以LazyCompound解码, 子标签在访问时才解码。
+        pool: 传入时对解码结果做子树共享 (见SubtreePool), 会完整解码整棵树。
+    """
     if compress:
         data = gzip.decompress(data)
     _class = IdToNbt(data[0])
+    if lazy and _class is Compound:
+        _class = LazyCompound
     obj = _class.deserialize(data)
+    if pool is not None:
+        pool.share(obj)
     return obj
 
 
+# 文件读写时每次处理的数据块大小
+_IO_CHUNK_SIZE = 1024 * 1024
+# zlib.decompressobj / compressobj 的 wbits 参数
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "zlib": zlib.MAX_WBITS}
+
+
+def _detect_compression(head: bytes) -> str | None:
+    """根据魔数判断压缩格式: "gzip", "zlib", 未压缩返回None"""
+    if head[:2] == b"\x1f\x8b":
+        return "gzip"
+    if len(head) >= 2 and head[0] & 0x0F == 8 and (head[0] << 8 | head[1]) % 31 == 0:
+        return "zlib"
+    return None
+
+
+def load(file, lazy: bool = False, pool: SubtreePool = None) -> NBTObject:
+    """
+    从文件读取NBT, 自动识别gzip/zlib压缩或未压缩格式。
+
+    压缩数据按块从文件中读取并增量解压, 内存中不会同时保留完整的压缩数据与解压数据,
+    解压结果直接交给按偏移解码的解码器。
+
+    Args:
+        file: 文件路径或以二进制模式打开的文件对象。
+        lazy: 同 deserialize, 根Compound以LazyCompound解码。
+        pool: 同 deserialize, 对解码结果做子树共享。
+    """
+    if isinstance(file, (str, bytes, os.PathLike)):
+        with open(file, "rb") as f:
+            return load(f, lazy, pool)
+
+    head = file.read(2)
+    compression = _detect_compression(head)
+    if compression is None:
+        data = head + file.read()
+    else:
+        data = bytearray()
+        decompressor = zlib.decompressobj(_WBITS[compression])
+        chunk = head
+        while chunk:
+            data += decompressor.decompress(chunk)
+            # gzip允许多个成员首尾相连
+            while decompressor.eof and decompressor.unused_data:
+                unused = decompressor.unused_data
+                decompressor = zlib.decompressobj(_WBITS[compression])
+                data += decompressor.decompress(unused)
+            chunk = file.read(_IO_CHUNK_SIZE)
+        data += decompressor.flush()
+        if not decompressor.eof:
+            raise ValueError(f"Truncated {compression} NBT data")
+        # 解码器只读取数据, 以memoryview传入避免再复制一份bytes
+        data = memoryview(data)
+    return deserialize(data, compress=False, lazy=lazy, pool=pool)
+
+
+def save(path, *data: NBTObject, compression: str | None = "gzip", compression_level: int = None):
+    """
+    将NBT写入文件。
+
+    数据先按块压缩写入同目录下的临时文件, 落盘后再原子地重命名为目标文件,
+    写入中途出错或进程退出都不会留下损坏的目标文件。
+
+    Args:
+        path: 目标文件路径。
+        data: 要写入的NBT标签。
+        compression: "gzip", "zlib" 或 None (不压缩)。
+        compression_level: 压缩等级, 默认按数据大小选择。
+    """
+    if compression is not None and compression not in _WBITS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    raw = memoryview(serialize(*data, compress=False))
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        f = os.fdopen(fd, "wb")
+    except BaseException:
+        # 文件对象没有创建成功, 描述符仍需手动关闭
+        os.close(fd)
+        os.unlink(temp_path)
+        raise
+    try:
+        with f:
+            if compression is None:
+                f.write(raw)
+            else:
+                compressor = zlib.compressobj(_compression_level(len(raw), compression_level),
+                                              zlib.DEFLATED, _WBITS[compression])
+                for start in range(0, len(raw), _IO_CHUNK_SIZE):
+                    f.write(compressor.compress(raw[start:start + _IO_CHUNK_SIZE]))
+                f.write(compressor.flush())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
 def print_nbt(nbt_obj, indent: int = 0, indent_str: str = "\t"):
     """
     格式化打印一个 NBTObject，展示其层次结构。
@@ -945,6 +1514,8 @@ def print_nbt(nbt_obj, indent: int = 0, indent_str: str = "\t"):
             print_nbt(tag, indent + 1)
         # 打印 Compound 的结束
         print(f"{indent_str * indent}}}")
+    elif isinstance(nbt_obj, TypedList):
+        print(f"List [{nbt_obj.element_type.__name__}]: {list(nbt_obj.array)}")
     elif isinstance(nbt_obj, List):
         # 确定列表元素的类型名称
         element_type = type(nbt_obj.value[0]).__name__ if nbt_obj.value else "Empty"
@@ -975,38 +1546,124 @@ def print_nbt(nbt_obj, indent: int = 0, indent_str: str = "\t"):
         print(f"{type_name}({nbt_obj.value})")
 
 
-def json_to_nbt(nbt_obj: dict[str, NBTObject] | list) -> NBTObject:
-    if isinstance(nbt_obj, dict):
-        nbt = Compound("")
-        for name, tag in nbt_obj.items():
-            if type(tag) is dict or type(tag) is list:
-                _n = json_to_nbt(tag)
-                _n.name = name
-                nbt += _n
-            elif type(tag) is bool:
-                nbt += Byte(name, tag + 0)
-            elif type(tag) is float:
-                nbt += Float(name, tag)
-            elif type(tag) is int:
-                nbt += Int(name, tag)
-            elif type(tag) is str:
-                nbt += String(name, tag)
-    elif isinstance(nbt_obj, list):
-        nbt = List("")
-        for tag in nbt_obj:
-            if type(tag) is dict or type(tag) is list:
-                nbt += json_to_nbt(tag)
-            elif type(tag) is bool:
-                nbt += Byte("", tag + 0)
-            elif type(tag) is float:
-                nbt += Float("", tag)
-            elif type(tag) is int:
-                nbt += Int("", tag)
-            elif type(tag) is str:
-                nbt += String("", tag)
-    else:
+_INT_RANGES = {Byte: (-0x80, 0x7F), Short: (-0x8000, 0x7FFF),
+               Int: (-0x80000000, 0x7FFFFFFF), Long: (-0x8000000000000000, 0x7FFFFFFFFFFFFFFF)}
+
+
+def _make(cls: type[NBTObject], name: str, value) -> NBTObject:
+    """跳过setter校验直接构造标量标签, 仅用于已校验过的值"""
+    obj = cls.__new__(cls)
+    obj._name = name
+    obj._value = value
+    obj._cache = None
+    obj._parent = None
+    return obj
+
+
+@dataclass
+class JsonNbtRules:
+    """
+    json_to_nbt 的类型推断规则。
+
+    Attributes:
+        int_type: 整数的最小NBT类型 (Byte/Short/Int/Long), 超出范围时自动升级为更宽的类型。
+        float_type: 浮点数的NBT类型 (Float/Double)。
+        bool_type: 布尔值的NBT类型, 以 0/1 存储。
+        typed_lists: 数值同构列表转为TypedList。
+        int_arrays: 整数同构列表转为IntArray/LongArray (NBT类型不再是List)。
+    """
+    int_type: type[NBTObject] = Int
+    float_type: type[NBTObject] = Float
+    bool_type: type[NBTObject] = Byte
+    typed_lists: bool = True
+    int_arrays: bool = False
+
+    def fit_int(self, low: int, high: int) -> type[NBTObject]:
+        """返回能容纳 [low, high] 的最窄整数类型"""
+        for _type, (minimum, maximum) in _INT_RANGES.items():
+            if minimum <= low and high <= maximum and _type.TAG_ID >= self.int_type.TAG_ID:
+                return _type
+        raise ValueError(f"integer {high if high > _INT_RANGES[Long][1] else low} exceeds the range of NBT Long")
+
+    def scalar(self, name: str, value) -> NBTObject | None:
+        # 整数与字符串已在这里完成类型与范围检查, 跳过setter直接构造
+        if type(value) is bool:
+            return _make(self.bool_type, name, int(value))
+        if type(value) is int:
+            return _make(self.fit_int(value, value), name, value)
+        if type(value) is float:
+            return self.float_type(name, value)
+        if type(value) is str:
+            return _make(String, name, value)
+        if value is None:
+            return None
+        raise TypeError(f"unsupported type for NBT conversion: {type(value).__name__}")
+
+    def array(self, name: str, values: list) -> NBTObject | None:
+        """数值同构列表直接转为紧凑存储的标签, 其他列表返回None"""
+        if not values or not (self.typed_lists or self.int_arrays):
+            return None
+        kinds = {type(item) for item in values}
+        if kinds == {int}:
+            _type = self.fit_int(min(values), max(values))
+            if self.int_arrays:
+                return LongArray(name, values) if _type is Long else IntArray(name, values)
+            return TypedList(name, _type, values) if self.typed_lists else None
+        if self.typed_lists and kinds <= {int, float} and float in kinds:
+            return TypedList(name, self.float_type, values)
+        if self.typed_lists and kinds == {bool}:
+            return TypedList(name, self.bool_type, [int(item) for item in values])
+        return None
+
+
+def json_to_nbt(nbt_obj: dict | list, rules: JsonNbtRules = None) -> NBTObject:
+    """
+    将dict/list转换为NBT。
+
+    每个Compound/List只创建一次并原地填充, 转换耗时与键的数量成线性关系;
+    使用显式栈而不是递归, 深层嵌套的文档不会触发递归深度限制。值为None的键会被跳过。
+
+    Args:
+        nbt_obj: 要转换的dict或list。
+        rules: 类型推断规则, 默认为 JsonNbtRules()。
+    """
+    if rules is None:
+        rules = JsonNbtRules()
+    if not isinstance(nbt_obj, (dict, list)):
         return
-    return nbt
+    root = rules.array("", nbt_obj) if isinstance(nbt_obj, list) else None
+    if root is not None:
+        return root
+    root = Compound("") if isinstance(nbt_obj, dict) else List("")
+    stack = [(root, nbt_obj)]
+    while stack:
+        container, source = stack.pop()
+        is_compound = isinstance(container, Compound)
+        element_id = None
+        for name, tag in (source.items() if is_compound else zip(repeat(""), source)):
+            if type(tag) is dict:
+                child = Compound(name)
+                stack.append((child, tag))
+            elif type(tag) is list:
+                child = rules.array(name, tag)
+                if child is None:
+                    child = List(name)
+                    stack.append((child, tag))
+            else:
+                child = rules.scalar(name, tag)
+                if child is None:
+                    continue
+            if is_compound:
+                container._value[name] = child
+            else:
+                if element_id is None:
+                    element_id = child.TAG_ID
+                elif child.TAG_ID != element_id:
+                    raise TypeError('All elements in a NBT List must be of the same type')
+                container._value.append(child)
+            _adopt(container, child)
+    return root
+
 
 def cout_nbt(nbt_obj: NBTObject, index=0):
     if len(str(nbt_obj.value)) > 30:
@@ -1016,7 +1673,7 @@ def cout_nbt(nbt_obj: NBTObject, index=0):
                 cout_nbt(tag, index+1)
         elif isinstance(nbt_obj, List):
             print(f"{'\t' * index}[")
-            for i in nbt_obj.value:
+            for i in (nbt_obj.tags() if isinstance(nbt_obj, TypedList) else nbt_obj.value):
                 cout_nbt(i, index + 1)
             print(f"{'\t' * index}]")
         else:
@@ -1025,7 +1682,7 @@ def cout_nbt(nbt_obj: NBTObject, index=0):
     else:
         print(f"{'\t' * index}{nbt_obj.__class__.__name__}(\"{nbt_obj.name}\", {nbt_obj.value}),")
 
-__all__ = ['End', 'Byte', 'Short', 'Int', 'Long', 'Float', 'Double', 'ByteArray', 'String', 'List', 'Compound', 'IntArray', 'LongArray', 'NBTObject', 'serialize', 'deserialize', 'print_nbt', 'IdToNbt', 'json_to_nbt']
+__all__ = ['End', 'Byte', 'Short', 'Int', 'Long', 'Float', 'Double', 'ByteArray', 'String', 'List', 'TypedList', 'Compound', 'LazyCompound', 'IntArray', 'LongArray', 'NBTObject', 'serialize', 'serialize_network', 'deserialize', 'load', 'save', 'print_nbt', 'IdToNbt', 'json_to_nbt', 'JsonNbtRules', 'SubtreePool']
 
 # __all__ = [cls.__name__ for cls in NBTObject.__subclasses__()] + [NBTObject.__name__, serialize.__name__,
 #                                                                   deserialize.__name__, print_nbt.__name__,
@@ -1,61 +1,132 @@
+import gzip
+import mmap
+import os
+import re
 import struct
+import sys
+import time
+import zlib
+from array import array
 from datetime import datetime, UTC
+from itertools import compress
+
+from pystom.MinecraftType import nbt
+
+SECTOR_SIZE = 4096
 
 
 class Region:
     """
-    用于读取Minecraft .mca区域文件头的类。
+    用于读取Minecraft .mca区域文件的类。
+
+    通过 Region.open() 打开时文件以mmap映射, 读取单个区块只会访问该区块所在的扇区,
+    区块数据通过memoryview切片直接交给解压器, 不会读入整个文件。
 
     Attributes:
-        data (bytearray): 整个.mca文件的二进制数据。
-        chunk_offsets (list): 存储1024个区块的位置偏移和扇区数量。
-        timestamps (list): 存储1024个区块的最后修改时间。
+        data (bytearray | mmap.mmap): 整个.mca文件的二进制数据。
+        path (str | None): 区域文件路径, 通过 open() 打开时设置。
+        locations (array): 1024个区块的位置表项, 高24位为扇区偏移, 低8位为扇区数量。
+        raw_timestamps (array): 1024个区块的最后修改时间 (Unix时间戳, 0表示区块不存在)。
     """
+    # 区块数据的压缩类型
+    COMPRESSION_GZIP = 1
+    COMPRESSION_ZLIB = 2
+    COMPRESSION_NONE = 3
+    COMPRESSION_LZ4 = 4
+    COMPRESSION_EXTERNAL = 0x80  # 区块数据存放在同目录的 c.x.z.mcc 文件中
 
-    def __init__(self, data):
+    def __init__(self, data, path: str = None):
         """
         使用给定的bytearray数据初始化Region对象。
 
         Args:
-            data (bytearray): .mca文件的二进制数据。
+            data (bytearray | mmap.mmap): .mca文件的二进制数据。
+            path (str): 区域文件路径, 读取外部区块文件 (.mcc) 时需要。
         """
         self.data = data
-        self.chunk_offsets = []  # 每个元素为元组 (sector_offset, sector_count)
-        self.timestamps = []  # 每个元素为datetime对象
+        self.path = path
+        self._file = None
+        self.locations = array("I")
+        self.raw_timestamps = array("I")
 
         self._parse_header()
 
+    @classmethod
+    def open(cls, path: str) -> 'Region':
+        """以只读mmap方式打开区域文件"""
+        file = open(path, "rb")
+        try:
+            if os.fstat(file.fileno()).st_size < 2 * SECTOR_SIZE:
+                raise ValueError("提供的字节数组数据不足以包含完整的MCA文件头（需要至少8192字节）")
+            region = cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), os.fspath(path))
+        except BaseException:
+            file.close()
+            raise
+        region._file = file
+        return region
+
+    def close(self):
+        """关闭mmap与文件, 仅对 open() 打开的Region有效"""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def _parse_header(self):
-        """解析MCA文件的前8KB文件头，包括区块位置表和时间戳表。"""
+        """解析MCA文件的前8KB文件头, 位置表与时间戳表各整块解码为一个数组。"""
         # 确保数据足够长
         if len(self.data) < 8192:
             raise ValueError("提供的字节数组数据不足以包含完整的MCA文件头（需要至少8192字节）")
 
-        # 解析区块位置表 (前4KB)
-        for i in range(1024):
-            start = i * 4
-            end = start + 4
-            entry_bytes = self.data[start:end]
+        self.locations = self._unpack_table(0)  # 区块位置表 (前4KB)
+        self.raw_timestamps = self._unpack_table(SECTOR_SIZE)  # 时间戳表 (后4KB)
+
+    def _unpack_table(self, start: int) -> array:
+        """将1024个大端序无符号整数整块解码为本机字节序的数组"""
+        table = array("I")
+        table.frombytes(self.data[start:start + SECTOR_SIZE])
+        if sys.byteorder == "little":
+            table.byteswap()
+        return table
 
-            # 前3字节为大端序扇区偏移量
-            sector_offset = int.from_bytes(entry_bytes[:3], byteorder='big')
-            # 第4字节为扇区数量
-            sector_count = entry_bytes[3]
+    @staticmethod
+    def _pack_table(table: array) -> bytes:
+        if sys.byteorder == "little":
+            table = table[:]
+            table.byteswap()
+        return table.tobytes()
 
-            self.chunk_offsets.append((sector_offset, sector_count))
+    @property
+    def chunk_offsets(self) -> list[tuple[int, int]]:
+        """1024个区块的 (sector_offset, sector_count)"""
+        return [(location >> 8, location & 0xFF) for location in self.locations]
 
-        # 解析时间戳表 (后4KB)
-        for i in range(1024):
-            start = 4096 + i * 4  # 时间戳表从4KB偏移开始
-            end = start + 4
-            timestamp_bytes = self.data[start:end]
+    @property
+    def timestamps(self) -> list[datetime | None]:
+        """1024个区块的最后修改时间, 区块不存在则为None; 每次访问都会重新转换, 只在需要时使用"""
+        return [datetime.fromtimestamp(timestamp, tz=UTC) if timestamp else None for timestamp in self.raw_timestamps]
 
-            # 将4字节大端序数据转换为无符号整数
-            timestamp_int = struct.unpack('>I', timestamp_bytes)[0]
-            # 将Unix时间戳转换为datetime对象，如果为0则保持None
-            timestamp_dt = datetime.fromtimestamp(timestamp_int, tz=UTC) if timestamp_int != 0 else None
+    def present_chunks(self) -> list[tuple[int, int]]:
+        """所有已生成区块在区域内的坐标 (x, z)"""
+        return [(index & 31, index >> 5) for index in compress(range(1024), self.locations)]
 
-            self.timestamps.append(timestamp_dt)
+    def modified_after(self, when: datetime | int) -> list[tuple[int, int]]:
+        """
+        所有在指定时间之后修改过的区块在区域内的坐标 (x, z)。
+
+        Args:
+            when (datetime | int): 时间点, 可以是datetime或Unix时间戳。
+        """
+        if isinstance(when, datetime):
+            when = int(when.timestamp())
+        return [(index & 31, index >> 5) for index in compress(range(1024), map(when.__lt__, self.raw_timestamps))]
 
     def get_chunk_offset(self, chunk_x, chunk_z):
         """
@@ -68,8 +139,102 @@ class Region:
         Returns:
             tuple: (sector_offset, sector_count)
         """
-        index = self._get_chunk_index(chunk_x, chunk_z)
-        return self.chunk_offsets[index]
+        location = self.locations[self._get_chunk_index(chunk_x, chunk_z)]
+        return location >> 8, location & 0xFF
+
+    def _locate(self, chunk_x, chunk_z) -> tuple[int, int, int] | None:
+        """解析区块头, 返回 (压缩类型, 数据起始位置, 数据结束位置), 区块不存在则为None"""
+        sector_offset, sector_count = self.get_chunk_offset(chunk_x, chunk_z)
+        if sector_offset == 0:
+            return None
+        start = sector_offset * SECTOR_SIZE
+        if start + 5 > len(self.data):
+            raise ValueError(f"区块 ({chunk_x}, {chunk_z}) 的扇区偏移超出文件范围")
+        # 5字节区块头: 4字节数据长度 (包含压缩类型字节) + 1字节压缩类型
+        length, compression = struct.unpack_from(">IB", self.data, start)
+        if length < 1 or length + 4 > sector_count * SECTOR_SIZE or start + 4 + length > len(self.data):
+            raise ValueError(f"区块 ({chunk_x}, {chunk_z}) 的数据长度无效: {length}")
+        return compression, start + 5, start + 4 + length
+
+    def read_chunk(self, chunk_x, chunk_z) -> bytes | None:
+        """
+        读取并解压指定区块的数据。
+
+        Args:
+            chunk_x (int): 区块在区域内的X坐标 (0-31)。
+            chunk_z (int): 区块在区域内的Z坐标 (0-31)。
+
+        Returns:
+            bytes: 解压后的区块NBT数据, 区块不存在则为None。
+        """
+        location = self._locate(chunk_x, chunk_z)
+        if location is None:
+            return None
+        compression, start, end = location
+        if compression & self.COMPRESSION_EXTERNAL:
+            with open(self._external_path(chunk_x, chunk_z), "rb") as f:
+                return self._decompress(compression & ~self.COMPRESSION_EXTERNAL, f.read())
+        with memoryview(self.data)[start:end] as payload:
+            return self._decompress(compression, payload)
+
+    def read_chunk_payload(self, chunk_x, chunk_z) -> tuple[int, bytes] | None:
+        """
+        读取指定区块未解压的数据, 外部文件中的区块会被读入。
+        数据是复制出来的, 解压可以在不持有区域文件的情况下进行。
+
+        Returns:
+            tuple[int, bytes]: (压缩类型, 压缩后的数据), 区块不存在则为None。
+        """
+        location = self._locate(chunk_x, chunk_z)
+        if location is None:
+            return None
+        compression, start, end = location
+        if compression & self.COMPRESSION_EXTERNAL:
+            with open(self._external_path(chunk_x, chunk_z), "rb") as f:
+                return compression & ~self.COMPRESSION_EXTERNAL, f.read()
+        return compression, self.data[start:end]
+
+    def read_chunk_nbt(self, chunk_x, chunk_z, lazy: bool = False, pool: nbt.SubtreePool = None):
+        """
+        读取并解码指定区块的NBT数据。
+
+        Args:
+            chunk_x (int): 区块在区域内的X坐标 (0-31)。
+            chunk_z (int): 区块在区域内的Z坐标 (0-31)。
+            lazy (bool): 以LazyCompound解码, 子标签在访问时才解码。
+            pool (SubtreePool): 对解码结果做子树共享。
+
+        Returns:
+            Compound: 区块的NBT数据, 区块不存在则为None。
+        """
+        data = self.read_chunk(chunk_x, chunk_z)
+        if data is None:
+            return None
+        return nbt.deserialize(data, compress=False, lazy=lazy, pool=pool)
+
+    @staticmethod
+    def _decompress(compression, payload) -> bytes:
+        """按压缩类型解压区块数据"""
+        match compression:
+            case Region.COMPRESSION_GZIP:
+                return zlib.decompress(payload, 16 + zlib.MAX_WBITS)
+            case Region.COMPRESSION_ZLIB:
+                return zlib.decompress(payload)
+            case Region.COMPRESSION_NONE:
+                return bytes(payload)
+            case Region.COMPRESSION_LZ4:
+                raise ValueError("不支持LZ4压缩的区块数据")
+            case _:
+                raise ValueError(f"未知的区块压缩类型: {compression}")
+
+    def _external_path(self, chunk_x, chunk_z) -> str:
+        """外部区块文件 c.<x>.<z>.mcc 的路径, 坐标为世界中的绝对区块坐标"""
+        match = re.fullmatch(r"r\.(-?\d+)\.(-?\d+)\.mca", os.path.basename(self.path or ""))
+        if match is None:
+            raise ValueError("无法从区域文件名推断外部区块文件的路径")
+        region_x, region_z = int(match.group(1)), int(match.group(2))
+        return os.path.join(os.path.dirname(self.path),
+                            f"c.{region_x * 32 + chunk_x}.{region_z * 32 + chunk_z}.mcc")
 
     def get_timestamp(self, chunk_x, chunk_z):
         """
@@ -82,8 +247,8 @@ class Region:
         Returns:
             datetime: 区块的最后修改时间，如果区块不存在则为None。
         """
-        index = self._get_chunk_index(chunk_x, chunk_z)
-        return self.timestamps[index]
+        timestamp = self.raw_timestamps[self._get_chunk_index(chunk_x, chunk_z)]
+        return datetime.fromtimestamp(timestamp, tz=UTC) if timestamp != 0 else None
 
     def _get_chunk_index(self, chunk_x, chunk_z):
         """
@@ -101,37 +266,269 @@ class Region:
         return chunk_z * 32 + chunk_x
 
 
+
+class RegionWriter(Region):
+    """
+    可写的区域文件。
+
+    根据文件头建立扇区占用表 (每个扇区一字节, 非零表示已占用), 写入区块时:
+    新数据不超过原有扇区数则原地覆盖并释放多余扇区, 否则释放旧扇区并按
+    首次适配 (first-fit) 或最佳适配 (best-fit) 分配新扇区, 没有合适空洞时追加到文件末尾。
+    文件头的位置表与时间戳表只在内存中修改, flush() 时批量写回, 保存一个区块的开销与区块大小成正比。
+
+    Attributes:
+        allocation (str): 扇区分配策略, "first-fit" 或 "best-fit"。
+        fsync (str): 落盘策略, "never" 不调用fsync, "flush" 在 flush()/close() 时调用,
+            "always" 每次写入区块后立即写回文件头并调用fsync。
+    """
+    ALLOCATIONS = ("first-fit", "best-fit")
+    FSYNC_POLICIES = ("never", "flush", "always")
+    MAX_SECTORS = 255  # 超过该扇区数的区块存放到外部 .mcc 文件
+
+    def __init__(self, data, path: str = None, allocation: str = "first-fit", fsync: str = "flush"):
+        if allocation not in self.ALLOCATIONS:
+            raise ValueError(f"未知的扇区分配策略: {allocation}")
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"未知的fsync策略: {fsync}")
+        super().__init__(data, path)
+        self.allocation = allocation
+        self.fsync = fsync
+        self._dirty_entries = set()  # 需要写回文件头的区块索引
+        self._sectors = self._build_sector_map()
+
+    @classmethod
+    def open(cls, path: str, allocation: str = "first-fit", fsync: str = "flush") -> 'RegionWriter':
+        """以读写方式打开区域文件, 文件不存在或为空时创建一个只有文件头的区域文件"""
+        file = open(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644), "r+b", buffering=0)
+        try:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                file.write(bytes(2 * SECTOR_SIZE))
+            elif size < 2 * SECTOR_SIZE:
+                raise ValueError("提供的字节数组数据不足以包含完整的MCA文件头（需要至少8192字节）")
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            region = cls(data, os.fspath(path), allocation, fsync)
+        except BaseException:
+            file.close()
+            raise
+        region._file = file
+        return region
+
+    def _build_sector_map(self) -> bytearray:
+        """根据文件头建立扇区占用表, 前两个扇区为文件头"""
+        sectors = bytearray(-(-len(self.data) // SECTOR_SIZE))
+        sectors[0:2] = b"\x01\x01"
+        for location in filter(None, self.locations):
+            sector_offset, sector_count = location >> 8, location & 0xFF
+            if sector_offset:
+                if sector_offset + sector_count > len(sectors):
+                    sectors.extend(bytes(sector_offset + sector_count - len(sectors)))
+                sectors[sector_offset:sector_offset + sector_count] = b"\x01" * sector_count
+        return sectors
+
+    def free_sectors(self) -> int:
+        """文件中空闲扇区的数量"""
+        return self._sectors.count(0)
+
+    def _allocate(self, count: int) -> int:
+        """分配count个连续扇区, 返回起始扇区"""
+        start = -1
+        if self.allocation == "best-fit":
+            best_size = None
+            for run in re.finditer(b"\x00+", self._sectors):
+                size = run.end() - run.start()
+                if size >= count and (best_size is None or size < best_size):
+                    start, best_size = run.start(), size
+                    if size == count:
+                        break
+        else:
+            start = self._sectors.find(bytes(count))
+        if start < 0:
+            # 没有足够大的空洞, 追加到最后一个已占用扇区之后
+            start = len(self._sectors.rstrip(b"\x00"))
+            if start + count > len(self._sectors):
+                self._sectors.extend(bytes(start + count - len(self._sectors)))
+        self._sectors[start:start + count] = b"\x01" * count
+        return start
+
+    def _release(self, start: int, count: int):
+        self._sectors[start:start + count] = bytes(count)
+
+    def write_chunk(self, chunk_x, chunk_z, data, compression: int = Region.COMPRESSION_ZLIB,
+                    timestamp: int = None):
+        """
+        写入指定区块。
+
+        Args:
+            chunk_x (int): 区块在区域内的X坐标 (0-31)。
+            chunk_z (int): 区块在区域内的Z坐标 (0-31)。
+            data (bytes | NBTObject): 未压缩的区块NBT数据或NBT标签。
+            compression (int): 压缩类型, COMPRESSION_GZIP / COMPRESSION_ZLIB / COMPRESSION_NONE。
+            timestamp (int): 最后修改时间 (Unix时间戳), 默认为当前时间。
+        """
+        if isinstance(data, nbt.NBTObject):
+            data = nbt.serialize(data, compress=False)
+        self.write_payload(chunk_x, chunk_z, self._compress(compression, data), compression, timestamp)
+
+    def write_payload(self, chunk_x, chunk_z, payload: bytes, compression: int = Region.COMPRESSION_ZLIB,
+                      timestamp: int = None):
+        """写入已经按compression压缩好的区块数据, 其余同 write_chunk()"""
+        index = self._get_chunk_index(chunk_x, chunk_z)
+        old_offset, old_count = self.locations[index] >> 8, self.locations[index] & 0xFF
+        if len(payload) + 5 > self.MAX_SECTORS * SECTOR_SIZE:
+            # 数据过大, 存放到外部文件, 区域文件中只保留区块头
+            with open(self._external_path(chunk_x, chunk_z), "wb") as f:
+                f.write(payload)
+            blob = struct.pack(">IB", 1, compression | self.COMPRESSION_EXTERNAL)
+        else:
+            blob = struct.pack(">IB", len(payload) + 1, compression) + payload
+            self._remove_external(chunk_x, chunk_z, old_offset)
+        count = -(-len(blob) // SECTOR_SIZE)
+
+        if old_offset and count <= old_count:
+            # 原地覆盖, 释放多余的扇区
+            start = old_offset
+            self._release(start + count, old_count - count)
+        else:
+            if old_offset:
+                self._release(old_offset, old_count)
+            start = self._allocate(count)
+
+        self._write_at(blob + bytes(count * SECTOR_SIZE - len(blob)), start * SECTOR_SIZE)
+        if (start + count) * SECTOR_SIZE > len(self.data):
+            self._remap()
+
+        self._set_entry(index, start, count, int(time.time()) if timestamp is None else timestamp)
+        if self.fsync == "always":
+            self.flush()
+
+    def write_batch(self, chunks: list[tuple[int, int, bytes, int]], timestamp: int = None):
+        """
+        批量写入已压缩的区块, 用于预生成等一次写入大量新区块的场景。
+
+        原本不存在的区块一次性分配一段连续的扇区, 并用一次写入落盘;
+        已存在的区块与需要存放到外部文件的区块逐个交给 write_payload()。
+        同一区块在列表中出现多次时只写入最后一次的数据。
+
+        Args:
+            chunks (list[tuple[int, int, bytes, int]]): (区域内X坐标, 区域内Z坐标, 压缩后的数据, 压缩类型) 列表。
+            timestamp (int): 最后修改时间 (Unix时间戳), 默认为当前时间。
+        """
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        # 按区块索引去重, 否则重复的区块各分配一段扇区, 先分配的那段会泄漏
+        latest = {}
+        for chunk in chunks:
+            latest[self._get_chunk_index(chunk[0], chunk[1])] = chunk
+        fresh = []
+        for index, (chunk_x, chunk_z, payload, compression) in latest.items():
+            if self.locations[index] or len(payload) + 5 > self.MAX_SECTORS * SECTOR_SIZE:
+                self.write_payload(chunk_x, chunk_z, payload, compression, timestamp)
+            else:
+                fresh.append((index, struct.pack(">IB", len(payload) + 1, compression) + payload))
+        if not fresh:
+            return
+        counts = [-(-len(blob) // SECTOR_SIZE) for _, blob in fresh]
+        start = self._allocate(sum(counts))
+        self._write_at(b"".join(blob + bytes(count * SECTOR_SIZE - len(blob))
+                                for (_, blob), count in zip(fresh, counts)), start * SECTOR_SIZE)
+        if (start + sum(counts)) * SECTOR_SIZE > len(self.data):
+            self._remap()
+        for (index, _), count in zip(fresh, counts):
+            self._set_entry(index, start, count, timestamp)
+            start += count
+        if self.fsync == "always":
+            self.flush()
+
+    def delete_chunk(self, chunk_x, chunk_z):
+        """删除指定区块并释放其扇区"""
+        index = self._get_chunk_index(chunk_x, chunk_z)
+        sector_offset, sector_count = self.locations[index] >> 8, self.locations[index] & 0xFF
+        if sector_offset == 0:
+            return
+        self._release(sector_offset, sector_count)
+        self._remove_external(chunk_x, chunk_z, sector_offset)
+        self._set_entry(index, 0, 0, 0)
+        if self.fsync == "always":
+            self.flush()
+
+    def _set_entry(self, index: int, sector_offset: int, sector_count: int, timestamp: int):
+        self.locations[index] = sector_offset << 8 | sector_count
+        self.raw_timestamps[index] = timestamp
+        self._dirty_entries.add(index)
+
+    def flush(self):
+        """将修改过的文件头表项批量写回文件, 并按fsync策略落盘"""
+        if self._dirty_entries:
+            first, last = min(self._dirty_entries), max(self._dirty_entries) + 1
+            self._write_at(self._pack_table(self.locations[first:last]), first * 4)
+            self._write_at(self._pack_table(self.raw_timestamps[first:last]), SECTOR_SIZE + first * 4)
+            self._dirty_entries.clear()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """写回文件头, 截掉文件末尾的空闲扇区后关闭"""
+        if self._file is None:
+            return
+        self.flush()
+        used = len(self._sectors.rstrip(b"\x00"))
+        if used * SECTOR_SIZE < len(self.data):
+            self.data.close()
+            os.ftruncate(self._file.fileno(), used * SECTOR_SIZE)
+            del self._sectors[used:]
+        super().close()
+
+    def _remap(self):
+        """文件变长后重新映射, 使读取能访问到新写入的扇区"""
+        self.data.close()
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _write_at(self, data: bytes, position: int):
+        self._file.seek(position)
+        self._file.write(data)
+
+    def _remove_external(self, chunk_x, chunk_z, sector_offset: int):
+        """区块原先存放在外部文件时将其删除"""
+        if sector_offset == 0 or not self.data[sector_offset * SECTOR_SIZE + 4] & self.COMPRESSION_EXTERNAL:
+            return
+        try:
+            os.remove(self._external_path(chunk_x, chunk_z))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _compress(compression: int, data) -> bytes:
+        """按压缩类型压缩区块数据"""
+        match compression:
+            case Region.COMPRESSION_GZIP:
+                return gzip.compress(data)
+            case Region.COMPRESSION_ZLIB:
+                return zlib.compress(data)
+            case Region.COMPRESSION_NONE:
+                return bytes(data)
+            case _:
+                raise ValueError(f"不支持写入的区块压缩类型: {compression}")
+
+
 # 示例用法
 if __name__ == "__main__":
-    # 假设你已经将.r.0.0.mca文件的内容读入了一个bytearray
-    # 例如：with open('r.0.0.mca', 'rb') as f:
-    #          data = bytearray(f.read())
-
-    # 为了演示，我们创建一个虚拟的bytearray（实际使用时请从文件读取）
-    # dummy_data = bytearray(8192)  # 创建一个最小8KB的文件头
-    # 设置一些示例值（实际数据会更复杂）
-    # dummy_data[0:3] = int(2).to_bytes(3, 'big')  # 第一个区块的扇区偏移量为2
-    # dummy_data[3] = 1  # 第一个区块占用1个扇区
-    # 设置一个时间戳 (2023-10-01 12:00:00 UTC)
-    # example_timestamp = int(datetime(2023, 10, 1, 12, 0, 0).timestamp())
-    # dummy_data[4096:4100] = struct.pack('>I', example_timestamp)  # 第一个区块的时间戳
-
-    with open("r.0.0.mca", "rb") as f:
-        dummy_data = f.read()
-
-    # 创建Region对象
-    region = Region(dummy_data)
-
-    # 获取第一个区块 (x=0, z=0) 的信息
-    offset, count = region.get_chunk_offset(0, 0)
-    timestamp = region.get_timestamp(0, 0)
-
-    print(f"区块 (0, 0) 的扇区偏移量: {offset}")
-    print(f"区块 (0, 0) 占用的扇区数: {count}")
-    print(f"区块 (0, 0) 的最后修改时间: {timestamp}")
-
-    # 检查另一个可能不存在的区块 (例如 x=1, z=1)
-    offset, count = region.get_chunk_offset(1, 1)
-    timestamp = region.get_timestamp(1, 1)
-    print(f"\n区块 (1, 1) 的扇区偏移量: {offset} (0表示区块未生成)")
-    print(f"区块 (1, 1) 的最后修改时间: {timestamp} (None表示区块未生成)")
+    # 以mmap方式打开区域文件, 只有被读取的区块所在扇区会被访问
+    with Region.open("r.0.0.mca") as region:
+        # 获取第一个区块 (x=0, z=0) 的信息
+        offset, count = region.get_chunk_offset(0, 0)
+        timestamp = region.get_timestamp(0, 0)
+
+        print(f"区块 (0, 0) 的扇区偏移量: {offset}")
+        print(f"区块 (0, 0) 占用的扇区数: {count}")
+        print(f"区块 (0, 0) 的最后修改时间: {timestamp}")
+
+        # 读取并解码区块数据
+        chunk = region.read_chunk_nbt(0, 0, lazy=True)
+        if chunk is not None:
+            print(f"区块 (0, 0) 的数据版本: {chunk['DataVersion'].value}")
+
+        # 检查另一个可能不存在的区块 (例如 x=1, z=1)
+        offset, count = region.get_chunk_offset(1, 1)
+        timestamp = region.get_timestamp(1, 1)
+        print(f"\n区块 (1, 1) 的扇区偏移量: {offset} (0表示区块未生成)")
+        print(f"区块 (1, 1) 的最后修改时间: {timestamp} (None表示区块未生成)")
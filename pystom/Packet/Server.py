@@ -1,12 +1,13 @@
 import json
 import struct
+import weakref
 from dataclasses import field, dataclass
 from uuid import UUID, uuid3
 
 from pystom.Minecraft import MinecraftConfig, GameMode
 from pystom.MinecraftType import *
 from pystom.Packet.PacketBase import ServerPacket
-from pystom.PacketType import encode_string, encode_varint, encode_bytes, serialize_nbt
+from pystom.PacketType import encode_string, encode_varint, encode_varints, encode_bytes, numpy, serialize_nbt
 from pystom.MinecraftType.nbt import *
 
 @dataclass
@@ -32,60 +33,73 @@ class ServerLoginSuccessPacket(ServerPacket):
                 UUID('00000000-0000-0000-0000-000000000000'),
                 f"OfflinePlayer:{self.player_name}").bytes) + encode_string(self.player_name)
 
+# 注册表数据在所有连接之间共享, 序列化结果由NBT节点缓存复用
+REGISTRY_DATA = Compound("",
+                         Compound(
+                             "minecraft:dimension_type",
+                             String("type", "minecraft:dimension_type"),
+                             List("value", [
+                                 Compound("",
+                                          String("id", "minecraft:overworld"),
+                                          Compound("element",
+                                                   Byte("piglin_safe", 0),  # false -> 0
+                                                   Byte("natural", 1),  # true -> 1
+                                                   Float("ambient_light", 0.0),
+                                                   Long("fixed_time", 0),
+                                                   String("infiniburn", "#minecraft:infiniburn_overworld"),
+                                                   Byte("respawn_anchor_works", 0),  # false -> 0
+                                                   Byte("has_skylight", 1),  # true -> 1
+                                                   Byte("bed_works", 1),  # true -> 1
+                                                   String("effects", "minecraft:overworld"),
+                                                   Byte("has_raids", 1),  # true -> 1
+                                                   Int("min_y", -64),
+                                                   Int("height", 384),
+                                                   Int("logical_height", 384),
+                                                   Double("coordinate_scale", 1.0),
+                                                   Byte("ultrawarm", 0),  # false -> 0
+                                                   Byte("has_ceiling", 0)  # false -> 0
+                                                   )
+                                          )
+                             ])
+                         ),
+                         Compound(
+                             "minecraft:worldgen/biome",
+                             String("type", "minecraft:worldgen/biome"),
+                             List("value", [
+                                 Compound("",
+                                          String("id", "minecraft:plains"),
+                                          Compound("element",
+                                                   String("precipitation", "rain"),
+                                                   Float("temperature", 0.8),
+                                                   Float("downfall", 0.4),
+                                                   Compound("effects",
+                                                            Int("sky_color", 7907327),
+                                                            Int("fog_color", 12638463),
+                                                            Int("water_color", 4159204),
+                                                            Int("water_fog_color", 329011)
+                                                            )
+                                                   )
+                                          )
+                             ])
+                         ))
+
+
+# 注册表 -> (生成数据包时的负载缓存, 压缩后的数据包), 负载缓存对象变化说明注册表被修改过
+_REGISTRY_PACKETS = weakref.WeakKeyDictionary()
+
+
 @dataclass
 class ServerConfigurationRegistryDataPack(ServerPacket):
+    registry: Compound = field(default_factory=lambda: REGISTRY_DATA)
 
     @property
     def to_bytes(self) -> bytes:
-        data = Compound("",
-                        Compound(
-                            "minecraft:dimension_type",
-                            String("type", "minecraft:dimension_type"),
-                            List("value", [
-                                Compound("",
-                                         String("id", "minecraft:overworld"),
-                                         Compound("element",
-                                                  Byte("piglin_safe", 0),  # false -> 0
-                                                  Byte("natural", 1),  # true -> 1
-                                                  Float("ambient_light", 0.0),
-                                                  Long("fixed_time", 0),
-                                                  String("infiniburn", "#minecraft:infiniburn_overworld"),
-                                                  Byte("respawn_anchor_works", 0),  # false -> 0
-                                                  Byte("has_skylight", 1),  # true -> 1
-                                                  Byte("bed_works", 1),  # true -> 1
-                                                  String("effects", "minecraft:overworld"),
-                                                  Byte("has_raids", 1),  # true -> 1
-                                                  Int("min_y", -64),
-                                                  Int("height", 384),
-                                                  Int("logical_height", 384),
-                                                  Double("coordinate_scale", 1.0),
-                                                  Byte("ultrawarm", 0),  # false -> 0
-                                                  Byte("has_ceiling", 0)  # false -> 0
-                                                  )
-                                         )
-                            ])
-                        ),
-                        Compound(
-                            "minecraft:worldgen/biome",
-                            String("type", "minecraft:worldgen/biome"),
-                            List("value", [
-                                Compound("",
-                                         String("id", "minecraft:plains"),
-                                         Compound("element",
-                                                  String("precipitation", "rain"),
-                                                  Float("temperature", 0.8),
-                                                  Float("downfall", 0.4),
-                                                  Compound("effects",
-                                                           Int("sky_color", 7907327),
-                                                           Int("fog_color", 12638463),
-                                                           Int("water_color", 4159204),
-                                                           Int("water_fog_color", 329011)
-                                                           )
-                                                  )
-                                         )
-                            ])
-                        ))
-        return serialize(data)
+        # 注册表未被修改时直接返回上次压缩好的数据包, 不会每次发送都重新gzip
+        payload = self.registry.memoize().serialize()
+        cached = _REGISTRY_PACKETS.get(self.registry)
+        if cached is None or cached[0] is not payload:
+            cached = _REGISTRY_PACKETS[self.registry] = (payload, bytes(serialize(self.registry)))
+        return cached[1]
 
 @dataclass
 class ServerSetCompressionPacket(ServerPacket):
@@ -300,6 +314,90 @@ class ServerUpdateViewPositionPacket(ServerPacket):
 
         return data
 
+# 区块数据包中高度图类型的ID (1.21.5起按ID而不是名称发送)
+HEIGHTMAP_IDS = {
+    "WORLD_SURFACE_WG": 0,
+    "WORLD_SURFACE": 1,
+    "OCEAN_FLOOR_WG": 2,
+    "OCEAN_FLOOR": 3,
+    "MOTION_BLOCKING": 4,
+    "MOTION_BLOCKING_NO_LEAVES": 5,
+}
+
+@dataclass
+class ServerUnloadChunkPacket(ServerPacket):
+    """
+    卸载区块包 (0x21) - Minecraft 1.21.6
+    通知客户端卸载离开视距的区块, 坐标按Z、X的顺序编码
+
+    参数:
+        chunk_x (int): 区块X坐标
+        chunk_z (int): 区块Z坐标
+    """
+    chunk_x: int
+    chunk_z: int
+
+    @property
+    def to_bytes(self) -> bytes:
+        return struct.pack(">ii", self.chunk_z, self.chunk_x)
+
+@dataclass
+class ServerBlockUpdatePacket(ServerPacket):
+    """
+    方块更新包 (0x08) - Minecraft 1.21.6
+    更新单个方块, 位置编码为 X(26位) Z(26位) Y(12位) 的long
+
+    参数:
+        x (int): 方块X坐标
+        y (int): 方块Y坐标
+        z (int): 方块Z坐标
+        state (int): 方块状态ID
+    """
+    x: int
+    y: int
+    z: int
+    state: int
+
+    @property
+    def to_bytes(self) -> bytes:
+        position = (self.x & 0x3FFFFFF) << 38 | (self.z & 0x3FFFFFF) << 12 | (self.y & 0xFFF)
+        return struct.pack(">Q", position) + encode_varint(self.state)
+
+@dataclass
+class ServerSectionBlocksUpdatePacket(ServerPacket):
+    """
+    区块段方块更新包 (0x4D) - Minecraft 1.21.6
+    一次更新同一区块段 (16×16×16) 内的多个方块
+
+    区块段位置编码为 X(22位) Z(22位) Y(20位) 的long,
+    每个方块编码为 方块状态 << 12 | 段内X << 8 | 段内Z << 4 | 段内Y 的VarLong, 整批向量化编码
+
+    参数:
+        section_x (int): 区块段X坐标 (即区块X坐标)
+        section_y (int): 区块段Y坐标 (世界Y坐标 >> 4)
+        section_z (int): 区块段Z坐标 (即区块Z坐标)
+        indices (list[int]): 段内位置, 按区块段存储的顺序 y << 8 | z << 4 | x
+        states (list[int]): 与indices对应的方块状态ID
+    """
+    section_x: int
+    section_y: int
+    section_z: int
+    indices: list[int] = field(default_factory=list)
+    states: list[int] = field(default_factory=list)
+
+    @property
+    def to_bytes(self) -> bytes:
+        position = (self.section_x & 0x3FFFFF) << 42 | (self.section_z & 0x3FFFFF) << 20 | (self.section_y & 0xFFFFF)
+        if numpy is not None:
+            indices = numpy.asarray(self.indices, dtype=numpy.uint64)
+            records = ((numpy.asarray(self.states, dtype=numpy.uint64) << numpy.uint64(12))
+                       | (indices & numpy.uint64(15)) << numpy.uint64(8)
+                       | (indices & numpy.uint64(0xF0)) | indices >> numpy.uint64(8))
+        else:
+            records = [state << 12 | (index & 15) << 8 | (index & 0xF0) | index >> 8
+                       for index, state in zip(self.indices, self.states)]
+        return struct.pack(">Q", position) + encode_varint(len(self.indices)) + encode_varints(records)
+
 @dataclass
 class ServerChunkDataPacket(ServerPacket):
     """
@@ -308,7 +406,7 @@ class ServerChunkDataPacket(ServerPacket):
     """
     chunk_x: int
     chunk_z: int
-    heightmaps: Compound = field(default_factory=Compound)
+    heightmaps: Compound = field(default_factory=Compound)  # 以高度图类型命名的LongArray
     chunk_data: bytes = b""
     block_entities: list[Compound] = field(default_factory=list)
     trust_edges: bool = True
@@ -316,7 +414,21 @@ class ServerChunkDataPacket(ServerPacket):
     block_light_mask: list[int] = field(default_factory=list)
     empty_sky_light_mask: list[int] = field(default_factory=list)
     empty_block_light_mask: list[int] = field(default_factory=list)
-    light_arrays: list[bytes] = field(default_factory=list)
+    light_arrays: list[bytes] = field(default_factory=list)  # 天空光照
+    block_light_arrays: list[bytes] = field(default_factory=list)
+
+    @classmethod
+    def from_chunk(cls, chunk, **fields) -> 'ServerChunkDataPacket':
+        """
+        由 MinecraftType.chunk.Chunk 构造, chunk_data使用区块 (及各区块段) 缓存的编码结果,
+        区块挂有高度图与光照时默认使用其高度图与光照, 其余字段由fields给出
+        """
+        if chunk.heightmaps is not None:
+            fields.setdefault("heightmaps", chunk.heightmaps.to_nbt())
+        if chunk.light is not None:
+            for name, value in chunk.light.packet_fields().items():
+                fields.setdefault(name, value)
+        return cls(chunk_x=chunk.chunk_x, chunk_z=chunk.chunk_z, chunk_data=chunk.to_bytes(), **fields)
 
     @property
     def to_bytes(self) -> bytes:
@@ -326,12 +438,8 @@ class ServerChunkDataPacket(ServerPacket):
         data += struct.pack(">i", self.chunk_x)
         data += struct.pack(">i", self.chunk_z)
 
-        # 高度图 (NBT)
-        heightmaps_bytes = serialize_nbt(self.heightmaps)
-        if isinstance(heightmaps_bytes, str):
-            heightmaps_bytes = heightmaps_bytes.encode('utf-8')
-        data += encode_varint(len(heightmaps_bytes))
-        data += heightmaps_bytes
+        # 高度图 (1.21.5起为 类型 + 长度前缀的long数组 的列表, 不再是NBT)
+        data += self._encode_heightmaps(self.heightmaps)
 
         # 区块数据 (字节数组)
         data += encode_varint(len(self.chunk_data))
@@ -340,10 +448,7 @@ class ServerChunkDataPacket(ServerPacket):
         # 方块实体 (NBT列表)
         data += encode_varint(len(self.block_entities))
         for entity in self.block_entities:
-            entity_bytes = serialize_nbt(entity)
-            if isinstance(entity_bytes, str):
-                entity_bytes = entity_bytes.encode('utf-8')
-            data += entity_bytes
+            data += self._encode_nbt(entity)
 
         # 信任边缘 (bool)
         data += b"\x01" if self.trust_edges else b"\x00"
@@ -354,14 +459,42 @@ class ServerChunkDataPacket(ServerPacket):
         data += self._encode_bitset(self.empty_sky_light_mask)
         data += self._encode_bitset(self.empty_block_light_mask)
 
-        # 光照数据数组
-        data += encode_varint(len(self.light_arrays))
-        for light_array in self.light_arrays:
-            data += encode_varint(len(light_array))
-            data += light_array
+        # 光照数据数组 (天空光照, 方块光照)
+        for arrays in (self.light_arrays, self.block_light_arrays):
+            data += encode_varint(len(arrays))
+            for light_array in arrays:
+                data += encode_varint(len(light_array))
+                data += light_array
 
         return data
 
+    @staticmethod
+    def _encode_heightmaps(heightmaps) -> bytes:
+        """
+        编码高度图: 数量, 之后每个高度图为 类型ID + 长度前缀的long数组。
+        heightmaps 为以类型名命名的LongArray组成的Compound (Heightmaps.to_nbt() 的结果),
+        或 类型名 -> long序列 的dict
+        """
+        items = heightmaps.value.items() if isinstance(heightmaps, Compound) else heightmaps.items()
+        data = b""
+        count = 0
+        for name, longs in items:
+            if isinstance(longs, NBTObject):
+                longs = longs.value
+            if name not in HEIGHTMAP_IDS:
+                raise ValueError(f"Unknown heightmap type: {name}")
+            data += encode_varint(HEIGHTMAP_IDS[name]) + encode_varint(len(longs))
+            data += struct.pack(f">{len(longs)}q", *longs)
+            count += 1
+        return encode_varint(count) + data
+
+    @staticmethod
+    def _encode_nbt(tag) -> bytes:
+        """项目自身的NBT对象使用带缓存的序列化, 其余 (如dict) 仍交给serialize_nbt"""
+        if isinstance(tag, NBTObject):
+            return serialize_network(tag)
+        return serialize_nbt(tag)
+
     def _encode_bitset(self, bitset: list[int]) -> bytes:
         """编码BitSet为字节"""
         data = encode_varint(len(bitset))
@@ -369,6 +502,36 @@ class ServerChunkDataPacket(ServerPacket):
             data += struct.pack(">q", value)
         return data
 
+@dataclass
+class ServerUpdateLightPacket(ServerPacket):
+    """
+    光照更新包 (0x2A) - Minecraft 1.21.6
+    用于更新已发送区块的部分光照区块段, 字段可由 ChunkLight.packet_fields() 生成
+    """
+    chunk_x: int
+    chunk_z: int
+    sky_light_mask: list[int] = field(default_factory=list)
+    block_light_mask: list[int] = field(default_factory=list)
+    empty_sky_light_mask: list[int] = field(default_factory=list)
+    empty_block_light_mask: list[int] = field(default_factory=list)
+    light_arrays: list[bytes] = field(default_factory=list)  # 天空光照
+    block_light_arrays: list[bytes] = field(default_factory=list)
+
+    @property
+    def to_bytes(self) -> bytes:
+        data = encode_varint(self.chunk_x & 0xFFFFFFFF) + encode_varint(self.chunk_z & 0xFFFFFFFF)
+        for bitset in (self.sky_light_mask, self.block_light_mask,
+                       self.empty_sky_light_mask, self.empty_block_light_mask):
+            data += encode_varint(len(bitset))
+            for value in bitset:
+                data += struct.pack(">q", value)
+        for arrays in (self.light_arrays, self.block_light_arrays):
+            data += encode_varint(len(arrays))
+            for light_array in arrays:
+                data += encode_varint(len(light_array))
+                data += light_array
+        return data
+
 @dataclass
 class ServerPlayerAbilitiesPacket(ServerPacket):
     """
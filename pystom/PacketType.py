@@ -1,6 +1,11 @@
 import struct
 from io import BytesIO
 
+try:
+    import numpy
+except ImportError:  # NumPy为可选依赖, 缺失时逐个编码
+    numpy = None
+
 type VarInt = bytes
 
 def encode_varint(value: int) -> VarInt:
@@ -15,6 +20,23 @@ def encode_varint(value: int) -> VarInt:
             break
     return bytes(_bytes)
 
+def encode_varints(values) -> bytes:
+    """
+    批量编码非负整数为连续的VarInt/VarLong, 结果与逐个调用 encode_varint() 拼接相同。
+    有NumPy时整批向量化: 先求每个值的字节数, 再按7位分组并设置延续位, 最后按字节数取出。
+    """
+    if numpy is None:
+        return b"".join(encode_varint(value) for value in values)
+    values = numpy.asarray(values, dtype=numpy.uint64)
+    if not values.size:
+        return b""
+    shifts = numpy.arange(10, dtype=numpy.uint64) * numpy.uint64(7)
+    groups = (values[:, None] >> shifts) & numpy.uint64(0x7F)
+    sizes = 1 + (values[:, None] >= (numpy.uint64(1) << shifts[1:])).sum(axis=1)
+    positions = numpy.arange(10)
+    groups |= (positions < (sizes - 1)[:, None]).astype(numpy.uint64) << numpy.uint64(7)
+    return groups[positions < sizes[:, None]].astype(numpy.uint8).tobytes()
+
 def decode_varint(_bytes: bytes, index: int = 0) -> int:
     # 分割字节列表为各个VarInt的字节数组
     varint_list = []
@@ -4,14 +4,20 @@ import time
 import traceback
 import uuid
 import zlib
-from threading import Thread
+from threading import Lock, Thread
 
 from pystom.Minecraft import MinecraftConfig
+from pystom.MinecraftType.chunk import Chunk
 from pystom.Packet import *
 from pystom.Packet.PacketBase import ServerPacket
-from pystom.PacketType import decode_varint, encode_varint, encode_string
+from pystom.PacketType import decode_varint, encode_varint, encode_string, varint_length
 from pystom.logging import Logging
-from pystom.utils import create_simple_heightmap, create_simple_chunk_data
+from pystom.utils import ChunkTemplate
+from pystom.MinecraftType.heightmap import Heightmaps
+from pystom.world.blockupdate import BlockUpdateBatcher
+from pystom.world.edit import WorldEditor
+from pystom.world.light import LightEngine
+from pystom.world.streaming import ChunkStreamer, chunk_of
 
 def DataFormat(data):
     return ' '.join([data.hex().upper()[i:i+2] for i in range(0, len(data.hex().upper()), 2)])
@@ -23,6 +29,14 @@ class MinecraftServer:
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._threshold = -1
         self.logger = Logging()
+        self._send_locks: dict[socket.socket, Lock] = {}
+        self.template = ChunkTemplate.uniform()  # 默认世界为虚空
+        self.streamer = ChunkStreamer(self.chunk_frame, self._send_frame, self._frame,
+                                      max_view_distance=_config.viewDistance)
+        self.block_updates = BlockUpdateBatcher(self.streamer)
+        self.chunks: dict[tuple[int, int], Chunk] = {}  # 已载入的区块, 其余区块按 template 发送
+        self.light = LightEngine(self.get_chunk)
+        self.editor = WorldEditor(self.get_chunk, self.light, self.block_updates)  # 批量修改一个范围内的方块
 
     def configuration(self, _c: socket.socket):
         self._send(_c, 0x07, ServerConfigurationRegistryDataPack())
@@ -31,7 +45,7 @@ class MinecraftServer:
     def play(self, _c: socket.socket):
         try:
             # 发送加入游戏包
-            self._send(_c, 0x28, ServerJoinGamePacket(entity_id=1))
+            self._send(_c, 0x28, ServerJoinGamePacket(entity_id=1, view_distance=self._config.viewDistance))
 
             # 发送出生点位置
             self._send(_c, 0x4E, ServerSpawnPositionPacket())
@@ -44,17 +58,8 @@ class MinecraftServer:
                 teleport_id=1
             )))
 
-            # 更新玩家区块位置
-            self._send(_c, 0x49, ServerUpdateViewPositionPacket(ChunkLocation(chunk_x=0, chunk_z=0)))
-
-            # 发送初始区块
-            chunk_packet = ServerChunkDataPacket(
-                chunk_x=0,
-                chunk_z=0,
-                heightmaps=create_simple_heightmap(),
-                chunk_data=create_simple_chunk_data(0, 0),
-            )
-            self._send(_c, 0x22, chunk_packet)
+            # 开始按视距发送区块 (包括更新玩家区块位置), 客户端设置到达后再按其视距调整
+            self.streamer.add(_c, 0, 0, self._config.viewDistance)
 
             # 发送玩家能力
             self._send(_c, 0x32, ServerPlayerAbilitiesPacket(
@@ -110,15 +115,15 @@ class MinecraftServer:
 
                 # 处理客户端设置
                 elif packet_id == 0x08:
-                    # 解析 ClientSettings 包
-                    # [根据协议解析字段]
+                    settings = ClientSettingsPacket.parser(data[varint_length(data, 0):])
+                    self.streamer.set_view_distance(_c, settings.view_distance)
                     self.logger.info("收到客户端设置")
 
                 # 处理位置更新
-                elif packet_id in (0x13, 0x14, 0x15):
-                    # 解析位置包
-                    # [根据协议解析字段]
-                    self.logger.info("收到位置更新")
+                elif packet_id in (0x13, 0x14):
+                    parser = ClientPlayerPositionPacket if packet_id == 0x13 else ClientPlayerPositionLookPacket
+                    position = parser.parser(data[varint_length(data, 0):])
+                    self.streamer.move(_c, *chunk_of(position.x, position.z))
 
         except ConnectionAbortedError:
             self.logger.warning("客户端断开连接")
@@ -130,6 +135,8 @@ class MinecraftServer:
             lineno = tb.lineno
             self.logger.error(f"游戏线程错误: {e} (发生在 {filename} 第 {lineno} 行)")
         finally:
+            self.streamer.remove(_c)
+            self._send_locks.pop(_c, None)
             _c.close()
             self.logger.info("连接关闭")
 
@@ -170,8 +177,113 @@ class MinecraftServer:
 
     # ServerKeepAlivePacket ServerTimeUpdatePacket ServerUpdateLightPacket
 
+    def send_chunk(self, _socket: socket.socket, chunk: Chunk) -> None:
+        """
+        发送区块数据包, 数据包内容与压缩后的帧缓存在区块中,
+        区块未被修改时多次发送 (包括发送给多个玩家) 只编码和压缩一次。
+        """
+        self._send_frame(_socket, self._chunk_frame(chunk))
+
+    def _chunk_frame(self, chunk: Chunk) -> bytes:
+        return chunk.cached(("frame", self._threshold), lambda: self._frame(
+            0x22, chunk.cached("packet", lambda: ServerChunkDataPacket.from_chunk(chunk).to_bytes)))
+
+    def get_chunk(self, chunk_x: int, chunk_z: int) -> Chunk | None:
+        """已载入的区块, 未载入时为None"""
+        return self.chunks.get((chunk_x, chunk_z))
+
+    def load_chunk(self, chunk: Chunk) -> None:
+        """
+        载入区块, 之后该坐标按此区块发送, 并可以通过 set_block() 修改。
+        没有高度图或光照的区块在载入时计算, 已经收到该坐标区块的玩家会重新收到它。
+        """
+        if chunk.heightmaps is None:
+            Heightmaps(chunk)
+        self.chunks[chunk.chunk_x, chunk.chunk_z] = chunk
+        if chunk.light is None:
+            self.light.light_chunk(chunk)
+        self.streamer.resend(chunk.chunk_x, chunk.chunk_z)
+
+    def set_block(self, x: int, y: int, z: int, state: int) -> bool:
+        """
+        修改已载入区块中的一个方块, 变化在下一刻合并发送给看得到该区块的玩家,
+        透光性或发光等级改变时光照在下一刻更新; 修改一个范围内的方块使用 editor。
+
+        Returns:
+            bool: 方块是否改变 (区块未载入、超出世界高度或方块本来就是state时为False)。
+        """
+        chunk = self.get_chunk(x >> 4, z >> 4)
+        if chunk is None or not chunk.min_y <= y < chunk.min_y + chunk.height:
+            return False
+        # Chunk.set_block() 只更新高度图受影响的一列
+        old = chunk.set_block(x, y, z, state)
+        if old == state:
+            return False
+        self.block_updates.record(x, y, z, state)
+        light = self.light
+        if ((old in light.transparent) != (state in light.transparent)
+                or old in light.emission or state in light.emission):
+            light.block_changed(x, y, z, old, state)
+        return True
+
+    def send_template(self, _socket: socket.socket, template: ChunkTemplate, chunk_x: int, chunk_z: int) -> None:
+        """按区块模板发送指定坐标的区块"""
+        self._send_frame(_socket, template.frame(chunk_x, chunk_z, self._threshold))
+
+    def tick(self):
+        """每刻执行一次: 先发送本刻合并的方块变化与光照更新, 再按视距发送区块"""
+        self.block_updates.flush()
+        self.flush_light()
+        self.streamer.tick()
+
+    def flush_light(self) -> None:
+        """处理本刻的方块改变引起的光照变化, 每个区块一个光照更新包发送给看得到该区块的玩家"""
+        sections: dict[tuple[int, int], set[int]] = {}
+        for chunk_x, chunk_z, section in self.light.tick():
+            sections.setdefault((chunk_x, chunk_z), set()).add(section)
+        for (chunk_x, chunk_z), changed in sections.items():
+            chunk = self.get_chunk(chunk_x, chunk_z)
+            if chunk is None or chunk.light is None:
+                continue
+            self.streamer.broadcast(chunk_x, chunk_z, self._frame(
+                0x2A, ServerUpdateLightPacket(chunk_x, chunk_z, **chunk.light.packet_fields(changed))))
+
+    def tick_loop(self, interval: float = 0.05):
+        """按固定间隔 (默认每刻50毫秒) 调用 tick()"""
+        while ...:
+            start = time.monotonic()
+            try:
+                self.tick()
+            except Exception as e:
+                self.logger.error(f"tick错误: {e}")
+            time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+    def chunk_frame(self, chunk_x: int, chunk_z: int) -> bytes | None:
+        """
+        区块流发送时获取指定坐标的区块数据包帧, 已载入的区块按区块本身生成, 其余按 template 生成;
+        子类可重写为从世界读取或生成区块, 区块尚未就绪时返回None。
+        """
+        chunk = self.get_chunk(chunk_x, chunk_z)
+        if chunk is not None:
+            return self._chunk_frame(chunk)
+        return self.template.frame(chunk_x, chunk_z, self._threshold)
+
+    def _send_frame(self, _socket: socket.socket, data: bytes) -> None:
+        """发送已经包装好的帧, 同一连接上的发送互斥, 避免多个线程的帧交错"""
+        lock = self._send_locks.get(_socket)
+        if lock is None:
+            lock = self._send_locks.setdefault(_socket, Lock())
+        with lock:
+            _socket.sendall(data)
+
     def _send(self, _socket: socket.socket, *_data) -> None:
         """自动包装数据为Minecraft格式"""
+        data = self._frame(*_data)
+        self._send_frame(_socket, data)
+        return data
+
+    def _frame(self, *_data) -> bytes:
+        """将数据包装为带长度前缀 (超过压缩阈值时压缩) 的帧"""
         data = b''
         for i in _data:
             if isinstance(i, ServerPacket):
@@ -187,9 +299,6 @@ class MinecraftServer:
         if 0 < self._threshold <= len(data):
             length = encode_varint(len(data))
             data = length + zlib.compress(data, level=-1)
-        _socket.send(encode_varint(len(data)) + data)
-        time.sleep(0.1)
-        print(f"S2C PacketId: {data[0]} Length: {encode_varint(len(data))} Bytes: {data}")
         return encode_varint(len(data)) + data
 
     def client(self, _client: socket.socket, addr: tuple[str, int]):
@@ -233,6 +342,7 @@ class MinecraftServer:
         self._socket.bind((host, port))
         self._socket.listen(self._config.maxPlayers)
         self.logger.info(f"开始监听, 地址为 {host}:{port}")
+        Thread(target=self.tick_loop, daemon=True).start()
         while ...:
             client, addr = self._socket.accept()
             Thread(target=self.client, args=(client, addr)).start()
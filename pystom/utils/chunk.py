@@ -1,77 +1,100 @@
 import struct
-from nbtlib import Compound, String, Long, List
-from pystom.PacketType import encode_varint
+import zlib
 
+from pystom.MinecraftType.chunk import AIR, Chunk
+from pystom.MinecraftType.heightmap import Heightmaps
+from pystom.Packet.Server import ServerChunkDataPacket
+from pystom.PacketType import encode_varint
+from pystom.world.light import LightEngine
 
-def create_simple_chunk_data(chunk_x: int, chunk_z: int, biome_id: int = 0) -> bytes:
-    """创建符合 1.21.6 协议的简化区块数据"""
-    # 1. 区块章节数量 (24 个章节，覆盖 -64 到 320)
-    section_count = 24
-    chunk_data = encode_varint(section_count)
 
-    # 2. 每个章节的数据
-    for _ in range(section_count):
-        # 2.1 方块数量 (全空气)
-        chunk_data += struct.pack(">h", 0)  # 非空气方块数量为0
+def _adler32_combine(adler1: int, adler2: int, length2: int) -> int:
+    """由两段数据各自的Adler-32与第二段的长度求拼接后的Adler-32"""
+    base = 65521
+    sum1 = ((adler1 & 0xFFFF) + (adler2 & 0xFFFF) - 1) % base
+    sum2 = ((adler1 >> 16) + (adler2 >> 16) + length2 % base * ((adler1 & 0xFFFF) - 1)) % base
+    return sum2 << 16 | sum1
 
-        # 2.2 方块状态数据
-        # - 调色板大小 (1: 只有空气)
-        chunk_data += encode_varint(1)
-        # - 调色板内容 (空气方块ID)
-        chunk_data += encode_varint(0)  # 空气方块ID
-        # - 数据数组长度 (0: 不需要数据数组)
-        chunk_data += encode_varint(0)
 
-        # 2.3 生物群系数据 (使用VarInt编码)
-        biome_data = b""
-        for _ in range(64):  # 4x4x4 生物群系网格
-            biome_data += encode_varint(biome_id)  # 使用VarInt编码
+class ChunkTemplate:
+    """
+    区块模板, 用于大量发送内容相同、只有坐标不同的区块 (虚空、平坦、超平坦等)。
 
-        chunk_data += encode_varint(len(biome_data))
-        chunk_data += biome_data
+    区块数据包中坐标之后的部分只编码一次, 并按压缩阈值预先压缩为raw deflate数据;
+    生成帧时只需把包头与坐标作为一个未压缩的deflate存储块放在前面,
+    再拼上预先压缩好的数据与合并得到的Adler-32校验和, 不需要重新压缩。
+    帧的格式与 MinecraftServer._frame(0x22, 数据包) 相同。
 
-        # 2.4 光照数据 (1.21.6 要求)
-        # - 天空光照掩码 (空)
-        chunk_data += encode_varint(0)  # 空BitSet
-        # - 方块光照掩码 (空)
-        chunk_data += encode_varint(0)  # 空BitSet
-        # - 空天空光照掩码 (全章节)
-        chunk_data += encode_varint(0xFFFFFFFF)  # 所有章节都需要天空光照
-        # - 空方块光照掩码 (全章节)
-        chunk_data += encode_varint(0xFFFFFFFF)  # 所有章节都需要方块光照
-        # - 光照数据数组 (空)
-        chunk_data += encode_varint(0)  # 无光照数据
+    Attributes:
+        packet_id (int): 区块数据包ID。
+        body (bytes): 数据包中坐标之后的部分。
+    """
+    packet_id = 0x22
 
-    # 3. 区块实体数据 (空)
-    chunk_data += encode_varint(0)  # 无区块实体
+    def __init__(self, chunk: Chunk, **fields):
+        """
+        Args:
+            chunk (Chunk): 作为模板的区块, 其坐标不会被使用。
+            fields: ServerChunkDataPacket 的其余字段, 如 heightmaps。
+        """
+        self.body = ServerChunkDataPacket.from_chunk(chunk, **fields).to_bytes[8:]
+        # 包ID + 数据包长度, 之后是8字节的坐标
+        self._header = encode_varint(self.packet_id) + encode_varint(len(self.body) + 8)
+        self._size = len(self._header) + 8 + len(self.body)
+        self._compressed = {}  # 压缩阈值 -> (raw deflate数据, Adler-32)
 
-    # 4. 信任边缘 (False)
-    chunk_data += b'\x00'
+    @classmethod
+    def layered(cls, layers: list[tuple[int, int]], min_y: int = -64, height: int = 384,
+                biome: int = 0, **fields) -> 'ChunkTemplate':
+        """
+        由从世界底部向上的方块层创建模板, 如超平坦世界。
 
-    # 5. 光照数据结束标记
-    chunk_data += encode_varint(0)  # 天空光照更新部分为空
-    chunk_data += encode_varint(0)  # 方块光照更新部分为空
+        Args:
+            layers (list[tuple[int, int]]): (方块状态, 厚度) 列表。
+            min_y (int): 世界最低高度。
+            height (int): 世界高度。
+            biome (int): 生物群系ID。
+        """
+        chunk = Chunk(0, 0, min_y, height, biome)
+        y = min_y
+        for state, thickness in layers:
+            chunk.fill(state, y0=y, y1=y + thickness)
+            y += thickness
+        Heightmaps(chunk)
+        # 模板区块四周都是同样的区块, 不需要与相邻区块拼接光照
+        LightEngine(lambda chunk_x, chunk_z: None).light_chunk(chunk)
+        return cls(chunk, **fields)
 
-    return chunk_data
+    @classmethod
+    def uniform(cls, state: int = AIR, min_y: int = -64, height: int = 384, biome: int = 0,
+                **fields) -> 'ChunkTemplate':
+        """整个区块都是同一种方块的模板, 默认为虚空 (全空气)"""
+        return cls.layered([(state, height)], min_y, height, biome, **fields)
 
+    def packet(self, chunk_x: int, chunk_z: int) -> bytes:
+        """指定坐标的区块数据包 (不含包ID与长度)"""
+        return struct.pack(">ii", chunk_x, chunk_z) + self.body
 
-def create_simple_heightmap() -> Compound:
-    """创建符合 1.21.6 协议的高度图"""
-    # 创建高度图数据 (所有位置高度为 64)
-    height_data = []
-    for _ in range(37):  # 16x16 区块需要 37 个长整数 (256/7≈36.57)
-        value = 0
-        for bit in range(7):
-            value |= (64 << (bit * 9))
-        height_data.append(Long(value))
+    def frame(self, chunk_x: int, chunk_z: int, threshold: int = -1) -> bytes:
+        """
+        生成指定坐标的区块数据包帧。
 
-    return Compound({
-        "MOTION_BLOCKING": Compound({
-            "type": String("LONG_ARRAY"),
-            "value": List(height_data)
-        }),
-        "WORLD_SURFACE": Compound({
-            "type": String("LONG_ARRAY"),
-            "value": List(height_data)
-        })
-    })
+        Args:
+            chunk_x (int): 区块X坐标。
+            chunk_z (int): 区块Z坐标。
+            threshold (int): 压缩阈值, 不大于0时不压缩。
+        """
+        head = self._header + struct.pack(">ii", chunk_x, chunk_z)
+        if not 0 < threshold <= self._size:
+            return encode_varint(self._size) + head + self.body
+        compressed = self._compressed.get(threshold)
+        if compressed is None:
+            deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            compressed = self._compressed[threshold] = (deflate.compress(self.body) + deflate.flush(),
+                                                        zlib.adler32(self.body))
+        tail, adler = compressed
+        # zlib头 + 存储块 (BFINAL=0, BTYPE=00, LEN, NLEN, 数据) + 预先压缩的数据 + Adler-32
+        data = (encode_varint(self._size) + b"\x78\x9c"
+                + struct.pack("<BHH", 0, len(head), len(head) ^ 0xFFFF) + head + tail
+                + struct.pack(">I", _adler32_combine(zlib.adler32(head), adler, len(self.body))))
+        return encode_varint(len(data)) + data
@@ -0,0 +1,9 @@
+from .regionpool import RegionPool
+from .chunkio import ChunkIO
+from .cache import ChunkCache
+from .light import ChunkLight, LightEngine
+from .generator import Generator, VoidGenerator, FlatGenerator, NoiseGenerator, WorldGenerator
+from .streaming import ChunkStreamer, PlayerView
+from .blockupdate import BlockUpdateBatcher
+from .edit import Box, Schematic, WorldEditor
+from .tracker import SpatialGrid, EntityTracker
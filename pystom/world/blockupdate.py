@@ -0,0 +1,97 @@
+import threading
+from collections import defaultdict
+
+from pystom.MinecraftType.chunk import numpy
+from pystom.Packet.Server import ServerBlockUpdatePacket, ServerSectionBlocksUpdatePacket
+from pystom.world.streaming import ChunkStreamer
+
+
+class BlockUpdateBatcher:
+    """
+    按刻合并方块变化并发送给玩家。
+
+    一刻内的方块变化按区块段 (16×16×16) 收集, 同一位置多次修改只保留最后一次;
+    flush() 时每个区块段只发送一个区块段方块更新包 (只有一个方块时为单个方块更新包),
+    同一区块的所有包拼接后一次发送给看得到该区块的玩家。
+    某个区块段一刻内的变化达到 resend_threshold 时不再发送方块更新, 改为让玩家重新接收整个区块,
+    因此无论一刻内修改了多少方块, 每个区块最多产生一个区块数据包或每段一个方块更新包。
+
+    Attributes:
+        streamer (ChunkStreamer): 区块流, 用于找到看得到区块的玩家与重新发送区块。
+        resend_threshold (int): 区块段一刻内的变化达到该数量时重新发送整个区块。
+    """
+    BLOCK_UPDATE = 0x08
+    SECTION_BLOCKS_UPDATE = 0x4D
+
+    def __init__(self, streamer: ChunkStreamer, resend_threshold: int = 1024):
+        self.streamer = streamer
+        self.resend_threshold = resend_threshold
+        # (区块X, 区块段Y, 区块Z) -> {段内位置 (y << 8 | z << 4 | x): 方块状态}
+        self._sections: dict[tuple[int, int, int], dict[int, int]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def record(self, x: int, y: int, z: int, state: int):
+        """记录世界坐标 (x, y, z) 的方块被设为state"""
+        with self._lock:
+            self._sections[x >> 4, y >> 4, z >> 4][(y & 15) << 8 | (z & 15) << 4 | (x & 15)] = state
+
+    def record_section(self, chunk_x: int, section_y: int, chunk_z: int, indices, states):
+        """
+        批量记录同一区块段内的方块变化。
+
+        Args:
+            chunk_x (int): 区块X坐标。
+            section_y (int): 区块段Y坐标 (世界Y坐标 >> 4)。
+            chunk_z (int): 区块Z坐标。
+            indices: 段内位置 (y << 8 | z << 4 | x), 可以是列表或NumPy数组。
+            states: 与indices对应的方块状态, 也可以是所有位置共用的一个方块状态。
+        """
+        if numpy is not None and isinstance(indices, numpy.ndarray):
+            indices = indices.tolist()
+        if isinstance(states, int):
+            states = [states] * len(indices)
+        elif numpy is not None and isinstance(states, numpy.ndarray):
+            states = states.tolist()
+        with self._lock:
+            self._sections[chunk_x, section_y, chunk_z].update(zip(indices, states))
+
+    def pending(self) -> int:
+        """等待发送的方块变化数"""
+        with self._lock:
+            return sum(map(len, self._sections.values()))
+
+    def flush(self) -> int:
+        """
+        发送本刻收集的方块变化, 每刻调用一次。
+
+        Returns:
+            int: 生成的数据包数 (重新发送的区块计为一个)。
+        """
+        with self._lock:
+            sections, self._sections = self._sections, defaultdict(dict)
+        chunks = defaultdict(list)
+        for (chunk_x, section_y, chunk_z), changes in sections.items():
+            chunks[chunk_x, chunk_z].append((section_y, changes))
+
+        packets = 0
+        frame = self.streamer.frame
+        for (chunk_x, chunk_z), changed in chunks.items():
+            if not self.streamer.viewers(chunk_x, chunk_z):
+                continue
+            if any(len(changes) >= self.resend_threshold for _, changes in changed):
+                self.streamer.resend(chunk_x, chunk_z)
+                packets += 1
+                continue
+            frames = []
+            for section_y, changes in changed:
+                if len(changes) == 1:
+                    (index, state), = changes.items()
+                    frames.append(frame(self.BLOCK_UPDATE, ServerBlockUpdatePacket(
+                        chunk_x << 4 | (index & 15), section_y << 4 | index >> 8, chunk_z << 4 | (index >> 4 & 15),
+                        state)))
+                else:
+                    frames.append(frame(self.SECTION_BLOCKS_UPDATE, ServerSectionBlocksUpdatePacket(
+                        chunk_x, section_y, chunk_z, list(changes), list(changes.values()))))
+            packets += len(frames)
+            self.streamer.broadcast(chunk_x, chunk_z, b"".join(frames))
+        return packets
@@ -0,0 +1,277 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+
+from pystom.MinecraftType import nbt
+from pystom.world.chunkio import ChunkIO
+
+
+_SCALAR_SIZE = {nbt.Byte: 1, nbt.Short: 2, nbt.Int: 4, nbt.Long: 8, nbt.Float: 4, nbt.Double: 8}
+
+
+def _nbt_size(tag: nbt.NBTObject) -> int:
+    """
+    NBT标签负载编码后的字节数。
+
+    已有的序列化缓存与LazyCompound中未解码的字节区间直接取长度, 其余节点按编码规则累加,
+    不会调用 serialize(), 因此估算大小不会在节点上留下新的缓存。
+    """
+    total = 0
+    stack = [tag]
+    while stack:
+        tag = stack.pop()
+        if tag._cache is not None:
+            total += len(tag._cache)
+            continue
+        size = _SCALAR_SIZE.get(type(tag))
+        if size is not None:
+            total += size
+        elif isinstance(tag, nbt.LazyCompound) and tag._span is not None:
+            total += tag._span[1] - tag._span[0]
+        elif isinstance(tag, nbt.Compound):
+            total += 1  # TAG_End
+            # LazyCompound未解码的子标签是 (start, end) 区间, 包含类型ID与名称
+            for name, child in tag._value.items():
+                if type(child) is tuple:
+                    total += child[1] - child[0]
+                else:
+                    total += 3 + len(name.encode("utf-8"))
+                    stack.append(child)
+        elif isinstance(tag, nbt.TypedList):
+            total += 5 + len(tag._value) * tag._value.itemsize
+        elif isinstance(tag, nbt.List):
+            total += 5
+            stack.extend(tag._value)
+        elif isinstance(tag, nbt.String):
+            total += 2 + len(tag._value.encode("utf-8"))
+        elif isinstance(tag, nbt.ByteArray):
+            total += 4 + len(tag._value)
+        elif isinstance(tag, (nbt.IntArray, nbt.LongArray)):
+            total += 4 + len(tag._value) * (4 if isinstance(tag, nbt.IntArray) else 8)
+    return total
+
+
+def estimate_size(value) -> int:
+    """估算缓存中一个区块占用的字节数, 优先使用对象的 nbytes 属性, 否则取NBT编码后的长度"""
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    if isinstance(value, nbt.NBTObject):
+        return _nbt_size(value)
+    return 0
+
+
+class _CachedChunk:
+    __slots__ = ("value", "size", "dirty", "version")
+
+    def __init__(self, value, size: int, dirty: bool):
+        self.value = value
+        self.size = size
+        self.dirty = dirty
+        self.version = 0  # 每次修改加一, 写回完成时用于判断期间是否又被修改过
+
+
+class ChunkCache:
+    """
+    按 (world, chunk_x, chunk_z) 缓存区块的内存缓存, 位于区块存储与 ServerChunkDataPacket 之间。
+
+    常驻字节数超过 max_bytes 时按LRU顺序淘汰未被固定的区块, 被修改过 (dirty) 的区块在淘汰前写回存储。
+    pin() 与 unpin() 做引用计数, 玩家视距内的区块由 pin_view() 固定, 不会被淘汰;
+    固定可以在区块载入之前进行。所有操作都是线程安全的。
+
+    Attributes:
+        storage (dict[str, ChunkIO]): 各个世界的区块存储。
+        max_bytes (int): 常驻字节数上限。
+        hits / misses / evictions / writebacks (int): 命中、未命中、淘汰与写回次数。
+    """
+
+    def __init__(self, storage: dict[str, ChunkIO], max_bytes: int = 256 << 20,
+                 sizeof: Callable[[object], int] = estimate_size):
+        """
+        Args:
+            storage (dict[str, ChunkIO]): 世界名称 -> 区块存储。
+            max_bytes (int): 常驻字节数上限。
+            sizeof (Callable): 估算区块字节数的函数。
+        """
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._chunks: OrderedDict[tuple, _CachedChunk] = OrderedDict()
+        self._pins: dict[tuple, int] = {}
+        self._lock = threading.RLock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+
+    def get(self, world: str, chunk_x: int, chunk_z: int):
+        """读取区块, 未缓存时从存储同步载入, 区块不存在则为None"""
+        return self.get_async(world, chunk_x, chunk_z).result()
+
+    def get_async(self, world: str, chunk_x: int, chunk_z: int) -> Future:
+        """
+        读取区块。
+
+        Returns:
+            Future: 结果为区块, 区块不存在则为None; 命中缓存时已经完成。
+        """
+        key = (world, chunk_x, chunk_z)
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is not None:
+                self.hits += 1
+                self._chunks.move_to_end(key)
+                return ChunkIO._done(chunk.value)
+            self.misses += 1
+        future = self.storage[world].load(chunk_x, chunk_z)
+        future.add_done_callback(lambda f: self._loaded(key, f))
+        return future
+
+    def _loaded(self, key: tuple, future: Future):
+        if future.cancelled() or future.exception() is not None or future.result() is None:
+            return
+        with self._lock:
+            # 载入期间可能已经 put() 了更新的数据
+            if key not in self._chunks:
+                self._insert(key, future.result(), dirty=False)
+
+    def put(self, world: str, chunk_x: int, chunk_z: int, value, dirty: bool = True):
+        """放入区块, dirty 为True时该区块会在淘汰或 flush() 时写回存储"""
+        key = (world, chunk_x, chunk_z)
+        with self._lock:
+            old = self._chunks.pop(key, None)
+            if old is not None:
+                self.resident_bytes -= old.size
+                dirty = dirty or old.dirty
+            chunk = self._insert(key, value, dirty)
+            if old is not None:
+                chunk.version = old.version + 1
+
+    def mark_dirty(self, world: str, chunk_x: int, chunk_z: int):
+        """区块被原地修改后调用, 重新估算其字节数并在淘汰时写回"""
+        key = (world, chunk_x, chunk_z)
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is None:
+                raise KeyError(f"区块 {key} 不在缓存中")
+            chunk.dirty = True
+            chunk.version += 1
+            size = self.sizeof(chunk.value)
+            self.resident_bytes += size - chunk.size
+            chunk.size = size
+            self._evict()
+
+    def _insert(self, key: tuple, value, dirty: bool) -> _CachedChunk:
+        chunk = self._chunks[key] = _CachedChunk(value, self.sizeof(value), dirty)
+        self.resident_bytes += chunk.size
+        self._evict()
+        return chunk
+
+    def pin(self, world: str, chunk_x: int, chunk_z: int):
+        """固定区块, 固定期间不会被淘汰"""
+        key = (world, chunk_x, chunk_z)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, world: str, chunk_x: int, chunk_z: int):
+        """取消一次固定"""
+        key = (world, chunk_x, chunk_z)
+        with self._lock:
+            count = self._pins[key] - 1
+            if count:
+                self._pins[key] = count
+            else:
+                del self._pins[key]
+                self._evict()
+
+    def pin_view(self, world: str, chunk_x: int, chunk_z: int, view_distance: int):
+        """固定以 (chunk_x, chunk_z) 为中心、视距范围内的所有区块"""
+        with self._lock:
+            for x, z in self.view(chunk_x, chunk_z, view_distance):
+                self.pin(world, x, z)
+
+    def unpin_view(self, world: str, chunk_x: int, chunk_z: int, view_distance: int):
+        """取消 pin_view() 的固定"""
+        with self._lock:
+            for x, z in self.view(chunk_x, chunk_z, view_distance):
+                self.unpin(world, x, z)
+
+    @staticmethod
+    def view(chunk_x: int, chunk_z: int, view_distance: int):
+        return ((x, z)
+                for x in range(chunk_x - view_distance, chunk_x + view_distance + 1)
+                for z in range(chunk_z - view_distance, chunk_z + view_distance + 1))
+
+    def _evict(self):
+        """超出字节预算时按LRU顺序淘汰未被固定的区块, 调用方需持有 self._lock"""
+        if self.resident_bytes <= self.max_bytes:
+            return
+        for key in list(self._chunks):
+            if self.resident_bytes <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            chunk = self._chunks.pop(key)
+            self.resident_bytes -= chunk.size
+            self.evictions += 1
+            if chunk.dirty:
+                self._write_back(key, chunk)
+
+    def _write_back(self, key: tuple, chunk: _CachedChunk) -> Future:
+        """
+        写回区块。dirty 只在写入成功后清除; 写入失败时区块保持dirty,
+        已经被淘汰的区块重新放回缓存, 下次淘汰或 flush() 时再次写回, 数据不会丢失。
+        """
+        # ChunkIO 在数据落盘之前会用内存中的数据响应读取, 淘汰后立即重新载入也能读到最新数据
+        world, chunk_x, chunk_z = key
+        self.writebacks += 1
+        version = chunk.version
+        try:
+            future = self.storage[world].save(chunk_x, chunk_z, chunk.value)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda f: self._written(key, chunk, version, f))
+        return future
+
+    def _written(self, key: tuple, chunk: _CachedChunk, version: int, future: Future):
+        with self._lock:
+            current = self._chunks.get(key)
+            if not future.cancelled() and future.exception() is None:
+                if current is chunk and chunk.version == version:
+                    chunk.dirty = False
+                return
+            if current is None:
+                # 写回失败的区块已被淘汰, 放回缓存 (此时不再淘汰, 避免立即重试)
+                self._chunks[key] = chunk
+                self.resident_bytes += chunk.size
+            elif current.value is chunk.value:
+                # 淘汰后又以相同的数据重新载入 (来自 ChunkIO 待写入的数据), 标记为dirty
+                current.dirty = True
+
+    def flush(self) -> list[Future]:
+        """将所有被修改过的区块写回存储"""
+        with self._lock:
+            return [self._write_back(key, chunk) for key, chunk in list(self._chunks.items()) if chunk.dirty]
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._chunks
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def stats(self) -> dict:
+        """命中率、常驻字节数等统计信息"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate,
+                    "evictions": self.evictions, "writebacks": self.writebacks,
+                    "chunks": len(self._chunks), "pinned": len(self._pins),
+                    "resident_bytes": self.resident_bytes}
@@ -0,0 +1,196 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from pystom.MinecraftType import nbt
+from pystom.MinecraftType.region import Region
+from pystom.world.regionpool import RegionPool
+
+
+def _decode(compression: int, payload: bytes) -> nbt.Compound:
+    """解压并解码区块数据, 在进程池中执行时结果需要能被pickle, 所以不使用惰性解码"""
+    return nbt.deserialize(Region._decompress(compression, payload), compress=False)
+
+
+def _sign(value: int) -> int:
+    return (value > 0) - (value < 0)
+
+
+class ChunkIO:
+    """
+    异步区块I/O服务。
+
+    区块的读取、解压与NBT解码在线程池中执行 (processes=True 时解压与解码放到进程池),
+    所有请求都返回 Future; 同一区块的并发请求共用一个 Future。
+    move() 记录玩家所在的区块, 玩家跨越区块边界时按其移动方向预取视距外前方的区块,
+    预取的结果暂存起来, 之后的 load() 直接返回。
+
+    写入的数据在落盘前保留在内存中, 这期间读取同一区块得到的是待写入的数据;
+    同一区块的多次写入会合并, 只写入最新的数据。
+
+    Attributes:
+        pool (RegionPool): 区域文件池。
+        lookahead (int): 预取的圈数。
+        max_ready (int): 最多暂存的预取结果数。
+    """
+
+    def __init__(self, pool: RegionPool, workers: int = None, processes: bool = False,
+                 lazy: bool = False, lookahead: int = 1, max_ready: int = 1024):
+        """
+        Args:
+            pool (RegionPool): 区域文件池。
+            workers (int): 工作线程 (进程) 数, 默认由 concurrent.futures 决定。
+            processes (bool): 在进程池中解压和解码区块。
+            lazy (bool): 以LazyCompound解码区块, 只在线程模式下有效。
+            lookahead (int): 预取的圈数。
+            max_ready (int): 最多暂存的预取结果数。
+        """
+        self.pool = pool
+        self.lazy = lazy and not processes
+        self.lookahead = lookahead
+        self.max_ready = max_ready
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="chunk-io")
+        self._decoder = ProcessPoolExecutor(workers) if processes else None
+        self._lock = threading.RLock()  # 已完成的 Future 添加回调时回调在当前线程中立即执行
+        self._inflight: dict[tuple[int, int], Future] = {}  # 正在读取的区块
+        self._ready: OrderedDict[tuple[int, int], nbt.Compound] = OrderedDict()  # 预取完成的区块
+        self._writes: dict[tuple[int, int], nbt.NBTObject] = {}  # 等待写入的区块
+        self._write_futures: dict[tuple[int, int], Future] = {}
+        self._players: dict = {}  # 玩家 -> 所在区块坐标
+
+    def load(self, chunk_x: int, chunk_z: int) -> Future:
+        """
+        异步读取区块。
+
+        Returns:
+            Future: 结果为区块的NBT数据, 区块不存在时为None。
+        """
+        return self._submit((chunk_x, chunk_z), prefetch=False)
+
+    def save(self, chunk_x: int, chunk_z: int, data: nbt.NBTObject) -> Future:
+        """
+        异步写入区块, 需要 pool 以可写方式打开。
+
+        Returns:
+            Future: 数据写入区域文件后完成。
+        """
+        key = (chunk_x, chunk_z)
+        with self._lock:
+            self._writes[key] = data
+            self._ready.pop(key, None)
+            if key in self._inflight:
+                # 正在读取的是旧数据, 不能暂存
+                self._inflight[key].consumed = True
+            future = self._write_futures.get(key)
+            if future is None:
+                future = self._write_futures[key] = self._executor.submit(self._write, key)
+        return future
+
+    def move(self, player, chunk_x: int, chunk_z: int, view_distance: int) -> list[Future]:
+        """
+        记录玩家所在的区块, 玩家跨越区块边界时预取移动方向前方 lookahead 圈的区块。
+
+        Args:
+            player: 玩家的标识, 可以是任意可哈希的对象。
+            chunk_x (int): 玩家所在区块的X坐标。
+            chunk_z (int): 玩家所在区块的Z坐标。
+            view_distance (int): 玩家的视距。
+
+        Returns:
+            list[Future]: 新发起的预取请求。
+        """
+        previous = self._players.get(player)
+        self._players[player] = (chunk_x, chunk_z)
+        if previous is None or previous == (chunk_x, chunk_z):
+            return []
+        dx, dz = _sign(chunk_x - previous[0]), _sign(chunk_z - previous[1])
+        futures = []
+        for step in range(1, self.lookahead + 1):
+            for key in self.ring(chunk_x + dx * (step - 1), chunk_z + dz * (step - 1), dx, dz, view_distance):
+                futures.append(self._submit(key, prefetch=True))
+        return futures
+
+    def forget(self, player):
+        """玩家离开时调用, 不再跟踪其位置"""
+        self._players.pop(player, None)
+
+    @staticmethod
+    def ring(chunk_x: int, chunk_z: int, dx: int, dz: int, view_distance: int) -> list[tuple[int, int]]:
+        """以 (chunk_x, chunk_z) 为中心的视距范围沿 (dx, dz) 移动一个区块后新进入视距的区块"""
+        next_x, next_z = chunk_x + dx, chunk_z + dz
+        return [(x, z)
+                for x in range(next_x - view_distance, next_x + view_distance + 1)
+                for z in range(next_z - view_distance, next_z + view_distance + 1)
+                if abs(x - chunk_x) > view_distance or abs(z - chunk_z) > view_distance]
+
+    def _submit(self, key: tuple[int, int], prefetch: bool) -> Future:
+        with self._lock:
+            if key in self._writes:
+                return self._done(self._writes[key])
+            if key in self._ready:
+                if prefetch:
+                    self._ready.move_to_end(key)
+                    return self._done(self._ready[key])
+                return self._done(self._ready.pop(key))
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = self._executor.submit(self._read, key)
+                future.consumed = not prefetch
+                future.add_done_callback(lambda f: self._finish(key, f))
+            elif not prefetch:
+                future.consumed = True
+            return future
+
+    def _finish(self, key: tuple[int, int], future: Future):
+        """读取完成后移出正在读取的列表, 没有被 load() 取走的预取结果暂存起来"""
+        with self._lock:
+            self._inflight.pop(key, None)
+            if getattr(future, "consumed", False) or future.cancelled() or future.exception() is not None:
+                return
+            self._ready[key] = future.result()
+            while len(self._ready) > self.max_ready:
+                self._ready.popitem(last=False)
+
+    def _read(self, key: tuple[int, int]) -> nbt.Compound | None:
+        payload = self.pool.read_chunk_payload(*key)
+        if payload is None:
+            return None
+        if self._decoder is not None:
+            return self._decoder.submit(_decode, *payload).result()
+        return nbt.deserialize(Region._decompress(*payload), compress=False, lazy=self.lazy)
+
+    def _write(self, key: tuple[int, int]):
+        try:
+            while True:
+                with self._lock:
+                    data = self._writes[key]
+                self.pool.write_chunk(*key, data)
+                with self._lock:
+                    # 写入期间又有新的数据时继续写入, 直到落盘的是最新的数据
+                    if self._writes[key] is data:
+                        del self._writes[key]
+                        del self._write_futures[key]
+                        return
+        except BaseException:
+            # 写入失败: 保留最新的数据 (读取仍能得到它), 下一次 save() 重新提交写入
+            with self._lock:
+                self._write_futures.pop(key, None)
+            raise
+
+    @staticmethod
+    def _done(value) -> Future:
+        future = Future()
+        future.set_result(value)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        """等待所有写入完成后关闭线程池与进程池"""
+        self._executor.shutdown(wait)
+        if self._decoder is not None:
+            self._decoder.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
@@ -0,0 +1,248 @@
+from collections.abc import Callable
+from typing import NamedTuple
+
+from pystom.MinecraftType.chunk import AIR, Chunk, ChunkSection, air_states, numpy
+from pystom.world.blockupdate import BlockUpdateBatcher
+from pystom.world.light import LightEngine
+
+
+class Box(NamedTuple):
+    """方块范围 [x0, x1) × [y0, y1) × [z0, z1) (世界坐标)"""
+    x0: int
+    y0: int
+    z0: int
+    x1: int
+    y1: int
+    z1: int
+
+    @classmethod
+    def corners(cls, a: tuple[int, int, int], b: tuple[int, int, int]) -> 'Box':
+        """由两个对角 (均包含在内) 创建范围, 与WorldEdit选区的含义相同"""
+        return cls(min(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]),
+                   max(a[0], b[0]) + 1, max(a[1], b[1]) + 1, max(a[2], b[2]) + 1)
+
+    @property
+    def volume(self) -> int:
+        return max(self.x1 - self.x0, 0) * max(self.y1 - self.y0, 0) * max(self.z1 - self.z0, 0)
+
+
+class Schematic:
+    """
+    一块方块数据, 用于 WorldEditor.copy() / paste()。
+
+    blocks按 (y * length + z) * width + x 排列 (与Sponge Schematic以及区块段的顺序一致),
+    有NumPy时为int64数组, 否则为列表。
+
+    Attributes:
+        width (int): X方向的大小。
+        height (int): Y方向的大小。
+        length (int): Z方向的大小。
+        blocks: 方块状态。
+    """
+    __slots__ = ("width", "height", "length", "blocks")
+
+    def __init__(self, width: int, height: int, length: int, blocks=None):
+        self.width = width
+        self.height = height
+        self.length = length
+        size = width * height * length
+        if blocks is None:
+            blocks = [AIR] * size
+        if numpy is not None:
+            blocks = numpy.asarray(blocks, dtype=numpy.int64).ravel()
+        else:
+            blocks = list(blocks)
+        if len(blocks) != size:
+            raise ValueError(f"方块数量应为 {size}, 实际为 {len(blocks)}")
+        self.blocks = blocks
+
+    def get(self, x: int, y: int, z: int) -> int:
+        return int(self.blocks[(y * self.length + z) * self.width + x])
+
+    def set(self, x: int, y: int, z: int, state: int):
+        self.blocks[(y * self.length + z) * self.width + x] = state
+
+
+def _positions(x0: int, x1: int, y0: int, y1: int, z0: int, z1: int, width: int, length: int):
+    """
+    范围内每个方块的 (段内位置, Schematic位置): 坐标均相对于各自的原点,
+    段内位置为 y << 8 | z << 4 | x, Schematic位置为 (y * length + z) * width + x, 两者顺序一致。
+    """
+    if numpy is not None:
+        ys, zs, xs = numpy.arange(y0, y1)[:, None, None], numpy.arange(z0, z1)[None, :, None], numpy.arange(x0, x1)
+        return (ys << 8 | zs << 4 | xs).ravel(), ((ys * length + zs) * width + xs).ravel()
+    coords = [(x, y, z) for y in range(y0, y1) for z in range(z0, z1) for x in range(x0, x1)]
+    return [y << 8 | z << 4 | x for x, y, z in coords], [(y * length + z) * width + x for x, y, z in coords]
+
+
+class WorldEditor:
+    """
+    批量修改方块的API, 直接操作区块段的调色板存储。
+
+    每次编辑按区块段处理: 用向量化的下标计算一次取出范围内的方块、得到改变的位置,
+    整段写回后只重建一次调色板、标记一次修改; 每个区块只重新计算一次高度图,
+    方块变化按段批量交给 BlockUpdateBatcher, 光照只记录透光性或发光等级改变的方块,
+    由 LightEngine.tick() 一次处理。
+
+    Attributes:
+        get_chunk (Callable[[int, int], Chunk | None]): 按区块坐标获取已载入的区块, 未载入的区块会被跳过。
+        light (LightEngine): 可选的光照引擎。
+        updates (BlockUpdateBatcher): 可选的方块变化发送器。
+    """
+
+    def __init__(self, get_chunk: Callable[[int, int], Chunk | None], light: LightEngine = None,
+                 updates: BlockUpdateBatcher = None):
+        self.get_chunk = get_chunk
+        self.light = light
+        self.updates = updates
+
+    def fill(self, box: Box, state: int) -> int:
+        """
+        将范围内的方块设为state。
+
+        Returns:
+            int: 改变的方块数。
+        """
+        return self._edit(box, lambda old, source: [state] * len(old) if numpy is None
+                          else numpy.full(len(old), state, dtype=numpy.int64))
+
+    def replace(self, box: Box, source: int, target: int) -> int:
+        """
+        将范围内的source方块替换为target。
+
+        Returns:
+            int: 改变的方块数。
+        """
+        if numpy is not None:
+            return self._edit(box, lambda old, _: numpy.where(old == source, target, old))
+        return self._edit(box, lambda old, _: [target if value == source else value for value in old])
+
+    def paste(self, schematic: Schematic, origin: tuple[int, int, int], skip_air: bool = False) -> int:
+        """
+        将schematic粘贴到以origin为最小角的位置。
+
+        Args:
+            schematic (Schematic): 方块数据。
+            origin (tuple[int, int, int]): 粘贴位置的最小角 (世界坐标)。
+            skip_air (bool): 不粘贴空气, 保留原有的方块。
+
+        Returns:
+            int: 改变的方块数。
+        """
+        ox, oy, oz = origin
+        box = Box(ox, oy, oz, ox + schematic.width, oy + schematic.height, oz + schematic.length)
+        blocks = schematic.blocks
+        if numpy is not None:
+            def apply(old, source):
+                new = blocks[source]
+                return numpy.where(numpy.isin(new, list(air_states())), old, new) if skip_air else new
+        else:
+            def apply(old, source):
+                new = [blocks[i] for i in source]
+                air = air_states()
+                return [o if skip_air and n in air else n for o, n in zip(old, new)]
+        return self._edit(box, apply, schematic)
+
+    def copy(self, box: Box) -> Schematic:
+        """复制范围内的方块, 未载入的区块视为空气"""
+        schematic = Schematic(box.x1 - box.x0, box.y1 - box.y0, box.z1 - box.z0)
+        for section, local, origin in self._sections(box):
+            indices, targets = _positions(*local, schematic.width, schematic.length)
+            targets = targets + origin if numpy is not None else [target + origin for target in targets]
+            values = section.blocks.values()
+            if numpy is not None:
+                schematic.blocks[targets] = values[indices]
+            else:
+                for index, target in zip(indices, targets):
+                    schematic.blocks[target] = values[index]
+        return schematic
+
+    def _sections(self, box: Box):
+        """遍历与范围相交的区块段, 返回 (区块段, 段内范围 (x0, x1, y0, y1, z0, z1), 段内原点在范围中的Schematic位置)"""
+        if box.volume == 0:
+            return
+        width, length = box.x1 - box.x0, box.z1 - box.z0
+        for chunk_x in range(box.x0 >> 4, ((box.x1 - 1) >> 4) + 1):
+            for chunk_z in range(box.z0 >> 4, ((box.z1 - 1) >> 4) + 1):
+                chunk = self.get_chunk(chunk_x, chunk_z)
+                if chunk is None:
+                    continue
+                x0, z0 = max(box.x0 - (chunk_x << 4), 0), max(box.z0 - (chunk_z << 4), 0)
+                x1, z1 = min(box.x1 - (chunk_x << 4), 16), min(box.z1 - (chunk_z << 4), 16)
+                y0, y1 = max(box.y0, chunk.min_y), min(box.y1, chunk.min_y + chunk.height)
+                for index in range((y0 - chunk.min_y) >> 4, -(-(y1 - chunk.min_y) // 16)):
+                    bottom = chunk.min_y + (index << 4)
+                    local = (x0, x1, max(y0 - bottom, 0), min(y1 - bottom, 16), z0, z1)
+                    # 段内 (0, 0, 0) 对应的Schematic位置, 段内位置换算为Schematic位置时加上它
+                    origin = ((bottom - box.y0) * length + (chunk_z << 4) - box.z0) * width + (chunk_x << 4) - box.x0
+                    yield chunk.sections[index], local, origin
+
+    def _edit(self, box: Box, apply: Callable, schematic: Schematic = None) -> int:
+        """
+        对范围内的每个区块段: 取出范围内的方块old, 由 apply(old, Schematic位置) 得到新方块,
+        只保留改变的位置, 整段写回并重建一次调色板。
+        """
+        changed = 0
+        chunks = {}
+        width, length = box.x1 - box.x0, box.z1 - box.z0
+        for section, local, origin in self._sections(box):
+            if schematic is not None:
+                indices, source = _positions(*local, schematic.width, schematic.length)
+                source = source + origin if numpy is not None else [i + origin for i in source]
+            else:
+                indices, source = _positions(*local, width, length)
+            values = section.blocks.values()
+            if numpy is not None:
+                old = values[indices]
+                new = numpy.asarray(apply(old, source), dtype=numpy.int64)
+                mask = old != new
+                if not mask.any():
+                    continue
+                indices, old, new = indices[mask], old[mask], new[mask]
+                values[indices] = new
+            else:
+                old = [values[i] for i in indices]
+                diff = [(i, o, n) for i, o, n in zip(indices, old, apply(old, source)) if o != n]
+                if not diff:
+                    continue
+                indices, old, new = (list(column) for column in zip(*diff))
+                for index, state in zip(indices, new):
+                    values[index] = state
+            self._commit(section, values, indices, old, new)
+            chunks[id(section._parent)] = section._parent
+            changed += len(indices)
+        # 高度图每个区块只重新计算一次
+        for chunk in chunks.values():
+            if chunk.heightmaps is not None:
+                chunk.heightmaps.compute()
+        return changed
+
+    def _commit(self, section: ChunkSection, values, indices, old, new):
+        """写回一个区块段, 并把改变交给光照引擎与方块变化发送器"""
+        section.blocks.load(values)
+        section.block_count = section.blocks.count(air_states())
+        section.mark_dirty()
+        chunk = section._parent
+        section_y = (chunk.min_y >> 4) + chunk.sections.index(section)
+        if self.updates is not None:
+            self.updates.record_section(chunk.chunk_x, section_y, chunk.chunk_z, indices, new)
+        if self.light is not None:
+            self._light_changed(chunk, section_y, indices, old, new)
+
+    def _light_changed(self, chunk: Chunk, section_y: int, indices, old, new):
+        """只把透光性或发光等级改变的方块交给光照引擎"""
+        light = self.light
+        if numpy is not None:
+            transparent, emitters = list(light.transparent), list(light.emission)
+            mask = numpy.isin(old, transparent) != numpy.isin(new, transparent)
+            if emitters:
+                mask |= numpy.isin(old, emitters) | numpy.isin(new, emitters)
+            indices, old, new = indices[mask].tolist(), old[mask].tolist(), new[mask].tolist()
+        else:
+            affected = [(i, o, n) for i, o, n in zip(indices, old, new)
+                        if (o in light.transparent) != (n in light.transparent)
+                        or o in light.emission or n in light.emission]
+            indices, old, new = ([item[k] for item in affected] for k in range(3))
+        base_x, base_y, base_z = chunk.chunk_x << 4, section_y << 4, chunk.chunk_z << 4
+        for index, o, n in zip(indices, old, new):
+            light.block_changed(base_x | index & 15, base_y | index >> 8, base_z | index >> 4 & 15, o, n)
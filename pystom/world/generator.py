@@ -0,0 +1,304 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from pystom.MinecraftType.block import registry
+from pystom.MinecraftType.chunk import Chunk, air_states, numpy
+from pystom.MinecraftType.heightmap import column_heights
+
+
+# 生成器使用的方块, 方块状态在第一次使用时才从方块注册表取得 (STONE, GRASS_BLOCK, DIRT)
+_BLOCKS = {"STONE": "minecraft:stone", "GRASS_BLOCK": "minecraft:grass_block", "DIRT": "minecraft:dirt"}
+
+
+def __getattr__(name: str):
+    if name in _BLOCKS:
+        return registry().default_state(_BLOCKS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def fill_columns(chunk: Chunk, bottom, top, state: int):
+    """
+    将每一列 [bottom, top) 范围内的方块设为state。
+
+    Args:
+        chunk (Chunk): 区块。
+        bottom: 256个下界 (相对于min_y, 含), 索引为 z * 16 + x。
+        top: 256个上界 (相对于min_y, 不含)。
+        state (int): 方块状态。
+    """
+    if numpy is not None:
+        bottom = numpy.asarray(bottom, dtype=numpy.int64)
+        top = numpy.asarray(top, dtype=numpy.int64)
+        low, high = int(bottom.min(initial=chunk.height)), int(top.max(initial=0))
+    else:
+        low, high = min(bottom, default=chunk.height), max(top, default=0)
+    for index in range(max(low, 0) >> 4, min(-(-high // 16), len(chunk.sections))):
+        section = chunk.sections[index]
+        base = index << 4
+        if numpy is not None:
+            ys = numpy.arange(base, base + 16)[:, None]
+            mask = (ys >= bottom[None, :]) & (ys < top[None, :])
+            if not mask.any():
+                continue
+            if mask.all():
+                section.fill(state)
+                continue
+            values = section.blocks.values()
+            values.reshape(16, 256)[mask] = state
+        else:
+            values = section.blocks.values()
+            changed = False
+            for column in range(256):
+                for y in range(max(bottom[column], base), min(top[column], base + 16)):
+                    values[(y - base) << 8 | column] = state
+                    changed = True
+            if not changed:
+                continue
+        section.blocks.load(values)
+        section.block_count = section.blocks.count(air_states())
+        section.mark_dirty()
+
+
+class Generator:
+    """
+    世界生成器的基类。
+
+    generate() 依次执行 terrain (地形)、surface (地表) 与 decorate (装饰) 三个阶段,
+    子类按需重写各个阶段。生成器对象会被发送到工作进程中, 需要能被pickle, 且相同的参数必须生成相同的区块。
+
+    Attributes:
+        min_y (int): 世界最低高度。
+        height (int): 世界高度。
+        biome (int): 生物群系ID。
+    """
+
+    def __init__(self, min_y: int = -64, height: int = 384, biome: int = 0):
+        self.min_y = min_y
+        self.height = height
+        self.biome = biome
+
+    def generate(self, chunk_x: int, chunk_z: int) -> Chunk:
+        chunk = Chunk(chunk_x, chunk_z, self.min_y, self.height, self.biome)
+        self.terrain(chunk)
+        self.surface(chunk)
+        self.decorate(chunk)
+        return chunk
+
+    def terrain(self, chunk: Chunk):
+        pass
+
+    def surface(self, chunk: Chunk):
+        pass
+
+    def decorate(self, chunk: Chunk):
+        pass
+
+
+class VoidGenerator(Generator):
+    """虚空世界, 所有区块都是空气"""
+
+
+class FlatGenerator(Generator):
+    """平坦世界, 由从世界底部向上的方块层组成"""
+
+    def __init__(self, layers: list[tuple[int, int]] = None, **options):
+        """
+        Args:
+            layers (list[tuple[int, int]]): (方块状态, 厚度) 列表, 默认为60层石头、3层泥土与1层草方块。
+        """
+        super().__init__(**options)
+        if layers is None:
+            blocks = registry()
+            layers = ((blocks.default_state("minecraft:stone"), 60), (blocks.default_state("minecraft:dirt"), 3),
+                      (blocks.default_state("minecraft:grass_block"), 1))
+        self.layers = list(layers)
+
+    def terrain(self, chunk: Chunk):
+        y = self.min_y
+        for state, thickness in self.layers:
+            chunk.fill(state, y0=y, y1=y + thickness)
+            y += thickness
+
+
+def _hash(x, z, seed: int):
+    """整数格点的伪随机值, 范围 [0, 1), x与z可以是int或NumPy数组"""
+    h = (x * 374761393 + z * 668265263 + (seed * 1442695041 & 0xFFFFFFFF)) & 0xFFFFFFFF
+    h = ((h ^ (h >> 13)) * 1274126177) & 0xFFFFFFFF
+    return (h ^ (h >> 16)) / 4294967296.0
+
+
+class NoiseGenerator(Generator):
+    """
+    基于多层值噪声 (value noise) 的起伏地形: 石头地形, 地表覆盖泥土和草方块。
+
+    有NumPy时一次计算整个区块的256列, 否则逐列计算, 两者结果相同。
+
+    Attributes:
+        seed (int): 世界种子。
+        base (int): 平均地表高度 (世界坐标)。
+        amplitude (int): 地表起伏的幅度。
+        scale (float): 第一层噪声的格点间距 (方块)。
+        octaves (int): 噪声层数。
+    """
+
+    def __init__(self, seed: int = 0, base: int = 64, amplitude: int = 24, scale: float = 96.0,
+                 octaves: int = 4, **options):
+        super().__init__(**options)
+        self.seed = seed
+        self.base = base
+        self.amplitude = amplitude
+        self.scale = scale
+        self.octaves = octaves
+
+    def heights(self, chunk_x: int, chunk_z: int):
+        """区块内256列的地表高度 (相对于min_y), 索引为 z * 16 + x"""
+        if numpy is not None:
+            xs = numpy.tile(numpy.arange(16), 16) + chunk_x * 16
+            zs = numpy.repeat(numpy.arange(16), 16) + chunk_z * 16
+            noise = self._noise(xs.astype(numpy.float64), zs.astype(numpy.float64), numpy)
+            heights = numpy.rint(self.base + (noise * 2 - 1) * self.amplitude).astype(numpy.int64) - self.min_y
+            return numpy.clip(heights, 1, self.height)
+        heights = []
+        for column in range(256):
+            noise = self._noise(float(chunk_x * 16 + (column & 15)), float(chunk_z * 16 + (column >> 4)), None)
+            height = round(self.base + (noise * 2 - 1) * self.amplitude) - self.min_y
+            heights.append(min(max(height, 1), self.height))
+        return heights
+
+    def _noise(self, x, z, np):
+        total = weight = 0.0
+        frequency, amplitude = 1.0 / self.scale, 1.0
+        for octave in range(self.octaves):
+            total = total + self._value(x * frequency, z * frequency, self.seed + octave, np) * amplitude
+            weight += amplitude
+            frequency *= 2
+            amplitude /= 2
+        return total / weight
+
+    @staticmethod
+    def _value(x, z, seed: int, np):
+        """双线性插值 (smoothstep) 的值噪声"""
+        if np is not None:
+            x0, z0 = np.floor(x), np.floor(z)
+            ix, iz = x0.astype(np.int64) & 0xFFFFFFFF, z0.astype(np.int64) & 0xFFFFFFFF
+        else:
+            x0, z0 = float(int(x // 1)), float(int(z // 1))
+            ix, iz = int(x0) & 0xFFFFFFFF, int(z0) & 0xFFFFFFFF
+        tx, tz = x - x0, z - z0
+        tx, tz = tx * tx * (3 - 2 * tx), tz * tz * (3 - 2 * tz)
+        a = _hash(ix, iz, seed)
+        b = _hash((ix + 1) & 0xFFFFFFFF, iz, seed)
+        c = _hash(ix, (iz + 1) & 0xFFFFFFFF, seed)
+        d = _hash((ix + 1) & 0xFFFFFFFF, (iz + 1) & 0xFFFFFFFF, seed)
+        top = a + (b - a) * tx
+        bottom = c + (d - c) * tx
+        return top + (bottom - top) * tz
+
+    def terrain(self, chunk: Chunk):
+        fill_columns(chunk, [0] * 256, self.heights(chunk.chunk_x, chunk.chunk_z),
+                     registry().default_state("minecraft:stone"))
+
+    def surface(self, chunk: Chunk):
+        blocks = registry()
+        dirt, grass_block = blocks.default_state("minecraft:dirt"), blocks.default_state("minecraft:grass_block")
+        heights = column_heights(chunk, air_states())
+        if numpy is not None:
+            heights = numpy.frombuffer(heights, dtype=numpy.uint16).astype(numpy.int64)
+            fill_columns(chunk, numpy.maximum(heights - 4, 0), heights - 1, dirt)
+            fill_columns(chunk, heights - 1, heights, grass_block)
+        else:
+            fill_columns(chunk, [max(height - 4, 0) for height in heights], [height - 1 for height in heights], dirt)
+            fill_columns(chunk, [height - 1 for height in heights], heights, grass_block)
+
+
+# 工作进程中的生成器, 由进程池的initializer设置
+_worker_generator: Generator = None
+
+
+def _init_worker(generator: Generator):
+    global _worker_generator
+    _worker_generator = generator
+
+
+def _generate_batch(coords: list[tuple[int, int]], encode=None) -> list[tuple[int, int, bytes]]:
+    """在工作进程中生成一批区块, 返回 (chunk_x, chunk_z, 编码结果), 默认编码为调色板格式的chunk_data"""
+    results = []
+    for chunk_x, chunk_z in coords:
+        chunk = _worker_generator.generate(chunk_x, chunk_z)
+        results.append((chunk_x, chunk_z, chunk.to_bytes() if encode is None else encode(chunk)))
+    return results
+
+
+class WorldGenerator:
+    """
+    在进程池中运行世界生成器。
+
+    生成器在每个工作进程启动时发送一次; 区块按批提交以减少进程间通信,
+    生成结果以调色板格式的chunk_data字节串 (而不是对象图) 传回主进程, 再由 Chunk.from_bytes() 重建。
+
+    Attributes:
+        generator (Generator): 世界生成器。
+        workers (int): 工作进程数。
+        batch_size (int): 每批提交的区块数。
+    """
+
+    def __init__(self, generator: Generator, workers: int = None, batch_size: int = 8):
+        self.generator = generator
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(generator,))
+
+    def submit(self, chunk_x: int, chunk_z: int) -> Future:
+        """
+        异步生成一个区块。
+
+        Returns:
+            Future: 结果为 Chunk。
+        """
+        future = Future()
+        batch = self._executor.submit(_generate_batch, [(chunk_x, chunk_z)])
+
+        def done(batch: Future):
+            if batch.exception() is not None:
+                future.set_exception(batch.exception())
+            else:
+                future.set_result(self._decode(*batch.result()[0]))
+        batch.add_done_callback(done)
+        return future
+
+    def generate(self, coords, encode=None):
+        """
+        批量生成区块, 按完成顺序逐个返回。
+
+        Args:
+            coords (Iterable[tuple[int, int]]): 区块坐标。
+            encode (Callable[[Chunk], bytes]): 在工作进程中对区块编码的函数 (需要能被pickle),
+                给出时直接返回 (chunk_x, chunk_z, 编码结果), 否则返回重建后的 Chunk。
+        """
+        pending = set()
+        coords = iter(coords)
+        while True:
+            # 保持每个进程有两批任务在排队
+            while len(pending) < self.workers * 2:
+                batch = [coord for _, coord in zip(range(self.batch_size), coords)]
+                if not batch:
+                    break
+                pending.add(self._executor.submit(_generate_batch, batch, encode))
+            if not pending:
+                return
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for batch in finished:
+                for result in batch.result():
+                    yield result if encode is not None else self._decode(*result)
+
+    def _decode(self, chunk_x: int, chunk_z: int, data: bytes) -> Chunk:
+        return Chunk.from_bytes(chunk_x, chunk_z, data, self.generator.min_y, self.generator.height)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait, cancel_futures=not wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
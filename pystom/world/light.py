@@ -0,0 +1,376 @@
+from collections import deque
+from typing import Callable
+
+from pystom.MinecraftType.block import registry
+from pystom.MinecraftType.chunk import Chunk, numpy
+from pystom.MinecraftType.heightmap import column_heights
+
+
+EMPTY = None  # 全为0的光照区块段
+FULL = b"\xff" * 2048  # 全为15的光照区块段, 只读, 修改前复制
+SKY, BLOCK = "sky", "block"
+
+# 六个相邻方向 (dx, dy, dz)
+_DIRECTIONS = ((1, 0, 0), (-1, 0, 0), (0, 0, 1), (0, 0, -1), (0, 1, 0), (0, -1, 0))
+
+
+def _bitset(mask: int) -> list[int]:
+    """将整数位掩码转换为BitSet的long列表 (有符号)"""
+    longs = []
+    while mask:
+        value = mask & 0xFFFFFFFFFFFFFFFF
+        longs.append(value - (1 << 64) if value >> 63 else value)
+        mask >>= 64
+    return longs
+
+
+def _pack_nibbles(levels) -> bytes | None:
+    """将4096个光照等级打包为2048字节 (低4位在前), 全为0时返回EMPTY, 全为15时返回FULL"""
+    if numpy is not None:
+        if not levels.any():
+            return EMPTY
+        if (levels == 15).all():
+            return FULL
+        return (levels[0::2] | levels[1::2] << 4).astype(numpy.uint8).tobytes()
+    if not any(levels):
+        return EMPTY
+    if levels.count(15) == 4096:
+        return FULL
+    return bytes(levels[i] | levels[i + 1] << 4 for i in range(0, 4096, 2))
+
+
+class ChunkLight:
+    """
+    区块的天空光照与方块光照。
+
+    每个区块段一个2048字节的半字节数组, 索引为 (y * 16 + z) * 16 + x, 偶数索引在低4位;
+    列表比区块段多两个, 分别是世界底部以下与顶部以上的一个段。
+    全为0的段为EMPTY (None), 全为15的段共用只读的FULL。
+
+    Attributes:
+        sky (list[bytes | bytearray | None]): 天空光照。
+        block (list[bytes | bytearray | None]): 方块光照。
+    """
+    __slots__ = ("sky", "block")
+
+    def __init__(self, count: int):
+        self.sky = [EMPTY] * count
+        self.block = [EMPTY] * count
+
+    def get(self, kind: str, section: int, index: int) -> int:
+        data = getattr(self, kind)[section]
+        if data is EMPTY:
+            return 0
+        return data[index >> 1] >> ((index & 1) << 2) & 15
+
+    def set(self, kind: str, section: int, index: int, level: int):
+        arrays = getattr(self, kind)
+        data = arrays[section]
+        if not isinstance(data, bytearray):
+            data = arrays[section] = bytearray(2048) if data is EMPTY else bytearray(data)
+        shift = (index & 1) << 2
+        data[index >> 1] = data[index >> 1] & (0xF0 >> shift) | level << shift
+
+    def packet_fields(self, sections=None) -> dict:
+        """
+        生成区块数据包与光照更新包的光照字段。
+
+        Args:
+            sections (Iterable[int]): 只包含这些光照区块段, 默认为全部。
+
+        Returns:
+            dict: sky_light_mask, block_light_mask, empty_sky_light_mask, empty_block_light_mask,
+                light_arrays (天空光照) 与 block_light_arrays (方块光照)。
+        """
+        fields = {}
+        indices = None if sections is None else sorted(sections)
+        for kind, mask_name, empty_name, arrays_name in ((SKY, "sky_light_mask", "empty_sky_light_mask", "light_arrays"),
+                                                         (BLOCK, "block_light_mask", "empty_block_light_mask",
+                                                          "block_light_arrays")):
+            mask = empty = 0
+            arrays = []
+            data = getattr(self, kind)
+            for index in range(len(data)) if indices is None else indices:
+                if data[index] is EMPTY:
+                    empty |= 1 << index
+                else:
+                    mask |= 1 << index
+                    arrays.append(bytes(data[index]))
+            fields[mask_name] = _bitset(mask)
+            fields[empty_name] = _bitset(empty)
+            fields[arrays_name] = arrays
+        return fields
+
+
+class LightEngine:
+    """
+    天空光照与方块光照引擎。
+
+    light_chunk() 对整个区块做初始光照: 按高度图向量化地填充天空光照的列, 再从被遮挡处和发光方块
+    开始在区块内做广度优先传播, 最后与已有光照的相邻区块在边界处互相传播。
+    方块改变时调用 block_changed() 记录, tick() 批量处理: 先对所有改变做一次移除传播 (removal BFS),
+    再做一次增加传播, 光照跨越区块边界时同样处理。
+
+    方块的透光性目前只区分透明与不透明, 天空光照等级15向下传播时不衰减。
+
+    Attributes:
+        get_chunk (Callable[[int, int], Chunk | None]): 按区块坐标获取已载入的区块。
+        transparent (frozenset): 透明的方块状态, 默认取自方块注册表 (不透明度小于15)。
+        emission (dict[int, int]): 方块状态 -> 发光等级, 默认取自方块注册表。
+    """
+
+    def __init__(self, get_chunk: Callable[[int, int], Chunk | None], transparent: frozenset = None,
+                 emission: dict[int, int] = None):
+        self.get_chunk = get_chunk
+        self.transparent = registry().transparent_states() if transparent is None else transparent
+        self.emission = registry().emission_map() if emission is None else emission
+        self._pending = []  # 等待 tick() 处理的方块改变
+        self._changed = set()  # 光照改变过的 (chunk_x, chunk_z, 光照区块段)
+
+    # 初始光照
+
+    def light_chunk(self, chunk: Chunk) -> ChunkLight:
+        """计算区块的初始光照并挂在区块上 (chunk.light)"""
+        count = len(chunk.sections)
+        light = ChunkLight(count + 2)
+        opaque, emitters = self._scan(chunk)
+        sky = self._initial_sky(chunk, opaque)
+        block = self._initial_block(chunk, opaque, emitters)
+        if numpy is not None:
+            sky, block = numpy.frombuffer(sky, dtype=numpy.uint8), numpy.frombuffer(block, dtype=numpy.uint8)
+        for index in range(count):
+            light.sky[index + 1] = _pack_nibbles(sky[index << 12:(index + 1) << 12])
+            light.block[index + 1] = _pack_nibbles(block[index << 12:(index + 1) << 12])
+        light.sky[count + 1] = FULL
+        chunk.light = light
+        chunk.mark_dirty()
+        self._stitch(chunk)
+        return light
+
+    def _scan(self, chunk: Chunk):
+        """
+        返回整个区块的不透明标记 (bytes, 按 (y * 16 + z) * 16 + x 排列, y相对于min_y) 与发光方块列表。
+        传播时逐个访问元素, bytes/bytearray比ndarray快得多, 所以向量化计算的结果都转换为字节串。
+        """
+        size = len(chunk.sections) << 12
+        emitters = []
+        if numpy is not None:
+            opaque = numpy.zeros(size, dtype=bool)
+            transparent = list(self.transparent)
+            for index, section in enumerate(chunk.sections):
+                blocks = section.blocks
+                if blocks.bits == 0 and blocks.palette[0] in self.transparent and blocks.palette[0] not in self.emission:
+                    continue
+                values = blocks.values()
+                opaque[index << 12:(index + 1) << 12] = ~numpy.isin(values, transparent)
+                if self.emission and any(value in self.emission for value in (blocks.palette or values.tolist())):
+                    for offset in numpy.flatnonzero(numpy.isin(values, list(self.emission))).tolist():
+                        emitters.append(((index << 12) + offset, self.emission[int(values[offset])]))
+            return opaque.tobytes(), emitters
+        opaque = bytearray(size)
+        for index, section in enumerate(chunk.sections):
+            blocks = section.blocks
+            if blocks.bits == 0 and blocks.palette[0] in self.transparent and blocks.palette[0] not in self.emission:
+                continue
+            base = index << 12
+            for offset, value in enumerate(blocks.values()):
+                if value not in self.transparent:
+                    opaque[base + offset] = 1
+                if value in self.emission:
+                    emitters.append((base + offset, self.emission[value]))
+        return opaque, emitters
+
+    def _initial_sky(self, chunk: Chunk, opaque):
+        height = chunk.height
+        heights = column_heights(chunk, self.transparent)
+        if numpy is not None:
+            tops = numpy.frombuffer(heights, dtype=numpy.uint16)
+            levels = bytearray(numpy.where(numpy.arange(height)[:, None] >= tops[None, :], 15, 0)
+                               .astype(numpy.uint8).tobytes())
+        else:
+            levels = bytearray(height << 8)
+            for column, top in enumerate(heights):
+                for y in range(top, height):
+                    levels[y << 8 | column] = 15
+        # 相邻列更高时, 本列被照亮的格子可能向旁边被遮挡的格子传播
+        queue = deque()
+        for column, top in enumerate(heights):
+            x, z = column & 15, column >> 4
+            highest = max(heights[(z << 4) | nx] if 0 <= nx < 16 else 0 for nx in (x - 1, x + 1))
+            highest = max(highest, *(heights[(nz << 4) | x] if 0 <= nz < 16 else 0 for nz in (z - 1, z + 1)))
+            for y in range(top, highest):
+                queue.append(y << 8 | column)
+        self._spread(levels, opaque, queue, height, sky=True)
+        return levels
+
+    def _initial_block(self, chunk: Chunk, opaque, emitters):
+        levels = bytearray(chunk.height << 8)
+        queue = deque()
+        for index, level in emitters:
+            levels[index] = level
+            queue.append(index)
+        self._spread(levels, opaque, queue, chunk.height, sky=False)
+        return levels
+
+    @staticmethod
+    def _spread(levels, opaque, queue: deque, height: int, sky: bool):
+        """在一个区块内做广度优先的光照传播, levels与opaque按 (y * 16 + z) * 16 + x 排列"""
+        limit = height << 8
+        while queue:
+            index = queue.popleft()
+            level = levels[index]
+            if level <= 1:
+                continue
+            x, z = index & 15, index >> 4 & 15
+            for neighbor, valid in ((index + 1, x < 15), (index - 1, x > 0), (index + 16, z < 15),
+                                    (index - 16, z > 0), (index + 256, index + 256 < limit), (index - 256, index >= 256)):
+                if not valid or opaque[neighbor]:
+                    continue
+                new = 15 if sky and level == 15 and neighbor == index - 256 else level - 1
+                if levels[neighbor] < new:
+                    levels[neighbor] = new
+                    queue.append(neighbor)
+
+    def _stitch(self, chunk: Chunk):
+        """与已有光照的相邻区块在边界处互相传播, 只从比对面高出1级以上的格子开始"""
+        base_x, base_z = chunk.chunk_x << 4, chunk.chunk_z << 4
+        for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            neighbor = self.get_chunk(chunk.chunk_x + dx, chunk.chunk_z + dz)
+            if neighbor is None or getattr(neighbor, "light", None) is None:
+                continue
+            # 边界两侧的段内坐标
+            inner, outer = (15, 0) if dx + dz > 0 else (0, 15)
+            for kind in (SKY, BLOCK):
+                queue = deque()
+                mine, theirs = getattr(chunk.light, kind), getattr(neighbor.light, kind)
+                for section in range(1, len(mine) - 1):
+                    if mine[section] is theirs[section] and mine[section] in (EMPTY, FULL):
+                        continue
+                    y0 = chunk.min_y + ((section - 1) << 4)
+                    for y in range(16):
+                        for i in range(16):
+                            if dx:
+                                a, b = y << 8 | i << 4 | inner, y << 8 | i << 4 | outer
+                                pa, pb = (base_x + inner, y0 + y, base_z + i), (base_x + dx * 16 + outer, y0 + y, base_z + i)
+                            else:
+                                a, b = y << 8 | inner << 4 | i, y << 8 | outer << 4 | i
+                                pa, pb = (base_x + i, y0 + y, base_z + inner), (base_x + i, y0 + y, base_z + dz * 16 + outer)
+                            la = chunk.light.get(kind, section, a)
+                            lb = neighbor.light.get(kind, section, b)
+                            if la > lb + 1:
+                                queue.append(pa)
+                            elif lb > la + 1:
+                                queue.append(pb)
+                self._propagate(kind, queue)
+
+    # 增量更新
+
+    def block_changed(self, x: int, y: int, z: int, old: int, new: int):
+        """记录一次方块改变 (世界坐标), 在下一次 tick() 时处理"""
+        if old != new:
+            self._pending.append((x, y, z, new))
+
+    def tick(self) -> set[tuple[int, int, int]]:
+        """
+        批量处理本tick内的方块改变。
+
+        Returns:
+            set[tuple[int, int, int]]: 光照改变过的 (chunk_x, chunk_z, 光照区块段), 用于发送光照更新包。
+        """
+        changes, self._pending = self._pending, []
+        for kind in (SKY, BLOCK):
+            removal, add, sources = deque(), deque(), []
+            for x, y, z, state in changes:
+                level = self._get(kind, x, y, z)
+                if level is None:
+                    continue
+                opaque = state not in self.transparent
+                emission = self.emission.get(state, 0) if kind == BLOCK else 0
+                if level and (opaque or kind == BLOCK):
+                    # 不透明方块挡住光照, 方块光照的来源可能也随之消失; 先全部移除, 再从周围重新传播
+                    self._set(kind, x, y, z, 0)
+                    removal.append((x, y, z, level))
+                if emission:
+                    sources.append((x, y, z, emission))
+                if not opaque:
+                    add.extend((x + dx, y + dy, z + dz) for dx, dy, dz in _DIRECTIONS)
+            add.extend(self._remove(kind, removal))
+            for x, y, z, emission in sources:
+                if emission > self._get(kind, x, y, z):
+                    self._set(kind, x, y, z, emission)
+                add.append((x, y, z))
+            self._propagate(kind, add)
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def _remove(self, kind: str, queue: deque) -> list:
+        """移除传播, 返回需要重新向外传播的格子"""
+        readd = []
+        while queue:
+            x, y, z, level = queue.popleft()
+            for dx, dy, dz in _DIRECTIONS:
+                nx, ny, nz = x + dx, y + dy, z + dz
+                neighbor = self._get(kind, nx, ny, nz)
+                if not neighbor:
+                    continue
+                if neighbor < level or (kind == SKY and dy == -1 and level == 15):
+                    # 光照来自被移除的格子
+                    self._set(kind, nx, ny, nz, 0)
+                    queue.append((nx, ny, nz, neighbor))
+                    emission = self.emission.get(self._block(nx, ny, nz), 0) if kind == BLOCK else 0
+                    if emission:
+                        self._set(kind, nx, ny, nz, emission)
+                        readd.append((nx, ny, nz))
+                else:
+                    readd.append((nx, ny, nz))
+        return readd
+
+    def _propagate(self, kind: str, queue: deque):
+        """增加传播"""
+        while queue:
+            x, y, z = queue.popleft()
+            level = self._get(kind, x, y, z)
+            if not level or level <= 1:
+                continue
+            for dx, dy, dz in _DIRECTIONS:
+                nx, ny, nz = x + dx, y + dy, z + dz
+                if self._opaque(nx, ny, nz):
+                    continue
+                new = 15 if kind == SKY and dy == -1 and level == 15 else level - 1
+                if self._get(kind, nx, ny, nz) < new:
+                    self._set(kind, nx, ny, nz, new)
+                    queue.append((nx, ny, nz))
+
+    # 按世界坐标访问
+
+    def _locate(self, x: int, y: int, z: int):
+        """返回 (区块, 光照区块段, 段内索引), 区块未载入、没有光照或超出世界高度时为None"""
+        chunk = self.get_chunk(x >> 4, z >> 4)
+        if chunk is None or getattr(chunk, "light", None) is None:
+            return None
+        relative = y - chunk.min_y
+        if not 0 <= relative < chunk.height:
+            return None
+        return chunk, (relative >> 4) + 1, (relative & 15) << 8 | (z & 15) << 4 | (x & 15)
+
+    def _get(self, kind: str, x: int, y: int, z: int) -> int | None:
+        location = self._locate(x, y, z)
+        if location is None:
+            return None
+        chunk, section, index = location
+        return chunk.light.get(kind, section, index)
+
+    def _set(self, kind: str, x: int, y: int, z: int, level: int):
+        chunk, section, index = self._locate(x, y, z)
+        chunk.light.set(kind, section, index, level)
+        chunk.mark_dirty()
+        self._changed.add((chunk.chunk_x, chunk.chunk_z, section))
+
+    def _block(self, x: int, y: int, z: int) -> int:
+        return self.get_chunk(x >> 4, z >> 4).get_block(x, y, z)
+
+    def _opaque(self, x: int, y: int, z: int) -> bool:
+        """不透明、区块未载入或超出世界高度时为True"""
+        if self._locate(x, y, z) is None:
+            return True
+        return self._block(x, y, z) not in self.transparent
@@ -0,0 +1,199 @@
+import argparse
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from functools import cache
+
+from pystom.logging import Logging
+from pystom.MinecraftType import nbt
+from pystom.MinecraftType.block import registry
+from pystom.MinecraftType.chunk import Chunk, PalettedContainer
+from pystom.MinecraftType.heightmap import Heightmaps, pack_heightmap
+from pystom.MinecraftType.region import Region
+from pystom.Packet.Server import REGISTRY_DATA
+from pystom.world.generator import FlatGenerator, Generator, NoiseGenerator, VoidGenerator, WorldGenerator
+from pystom.world.regionpool import RegionPool
+from pystom.world.util import spiral
+
+
+DATA_VERSION = 4435  # 1.21.6
+
+
+GENERATORS = {
+    "noise": NoiseGenerator,
+    "flat": FlatGenerator,
+    "void": VoidGenerator,
+}
+
+
+@cache
+def biome_names() -> tuple[str, ...]:
+    """
+    生物群系ID -> 名称。
+    区块中的生物群系ID是发送给客户端的注册表 (REGISTRY_DATA) 中 minecraft:worldgen/biome 各项的下标,
+    存储格式使用名称, 两者由同一份注册表对应, 不会与客户端看到的生物群系不一致。
+    """
+    return tuple(entry["id"].value for entry in REGISTRY_DATA["minecraft:worldgen/biome"]["value"].value)
+
+
+def _biome(biome: int) -> nbt.String:
+    names = biome_names()
+    if not 0 <= biome < len(names):
+        raise ValueError(f"未知的生物群系ID: {biome} (注册表中有 {len(names)} 个生物群系)")
+    return nbt.String("", names[biome])
+
+
+def _block_state(state: int) -> nbt.Compound:
+    """区块存储中的调色板使用方块名与方块属性"""
+    blocks = registry()
+    tags = [nbt.String("Name", blocks.name(state))]
+    properties = blocks.properties(state)
+    if properties:
+        tags.append(nbt.Compound("Properties", *(nbt.String(key, value) for key, value in properties.items())))
+    return nbt.Compound("", *tags)
+
+
+def _container(name: str, container: PalettedContainer, entry, max_bits: int) -> nbt.Compound:
+    """
+    将调色板容器编码为区块存储格式: palette + data。
+
+    存储格式总是使用调色板 (没有直接调色板), 数据数组的排列与协议相同 (值不跨越long),
+    因此间接调色板的数据可以直接复用, 直接调色板的容器重新打包为max_bits位以内的间接调色板。
+    """
+    if container.palette is None:
+        repacked = PalettedContainer(container.size, container.min_bits, max_bits, container.direct_bits)
+        repacked.load(container.values())
+        container = repacked
+    tags = [nbt.List("palette", [entry(value) for value in container.palette])]
+    if container.bits:
+        tags.append(nbt.LongArray("data", array("q", container.data.tobytes())))
+    return nbt.Compound(name, *tags)
+
+
+def to_anvil(chunk: Chunk) -> nbt.Compound:
+    """
+    将区块编码为区域文件中的区块NBT。
+
+    光照不写入存储 (isLightOn为0), 由服务端加载时重新计算。
+    """
+    if chunk.heightmaps is None:
+        Heightmaps(chunk)
+    bottom = chunk.min_y >> 4
+    sections = [nbt.Compound(
+        "",
+        nbt.Byte("Y", bottom + index),
+        _container("block_states", section.blocks, _block_state, 12),
+        _container("biomes", section.biomes, _biome, 6),
+    ) for index, section in enumerate(chunk.sections)]
+    return nbt.Compound(
+        "",
+        nbt.Int("DataVersion", DATA_VERSION),
+        nbt.Int("xPos", chunk.chunk_x),
+        nbt.Int("yPos", bottom),
+        nbt.Int("zPos", chunk.chunk_z),
+        nbt.String("Status", "minecraft:full"),
+        nbt.Long("LastUpdate", 0),
+        nbt.Long("InhabitedTime", 0),
+        nbt.Byte("isLightOn", 0),
+        nbt.List("sections", sections),
+        nbt.List("block_entities", []),
+        nbt.List("block_ticks", []),
+        nbt.List("fluid_ticks", []),
+        nbt.Compound("Heightmaps", *(nbt.LongArray(name, pack_heightmap(heights, chunk.height))
+                                     for name, heights in chunk.heightmaps.heights.items())),
+    )
+
+
+def encode_anvil(chunk: Chunk) -> bytes:
+    """编码并以zlib压缩区块NBT, 在生成区块的工作进程中调用"""
+    return zlib.compress(nbt.serialize(to_anvil(chunk), compress=False))
+
+
+def pregenerate(directory: str, generator: Generator, radius: int, center_x: int = 0, center_z: int = 0,
+                workers: int = None, batch: int = 256, force: bool = False, interval: float = 2.0,
+                logger: Logging = None) -> int:
+    """
+    预生成以 (center_x, center_z) 为中心、半径为radius的正方形范围内的区块, 写入directory下的区域文件。
+
+    区块坐标按螺旋顺序交给工作进程生成并在工作进程中编码压缩,
+    主进程按区域分组缓存结果, 每个区域攒够batch个区块或全部完成时一次写入 (连续分配扇区, 写回一次文件头)。
+    区域文件的时间戳表非零的区块视为已生成, 中断后重新运行会跳过它们, force为True时全部重新生成。
+
+    Args:
+        directory (str): 区域文件目录。
+        generator (Generator): 世界生成器。
+        radius (int): 半径 (区块)。
+        center_x (int): 中心区块X坐标。
+        center_z (int): 中心区块Z坐标。
+        workers (int): 工作进程数, 默认为CPU核心数。
+        batch (int): 每个区域每次写入的区块数。
+        force (bool): 是否重新生成已存在的区块。
+        interval (float): 输出进度的间隔 (秒)。
+        logger (Logging): 输出进度的日志对象。
+
+    Returns:
+        int: 生成的区块数。
+    """
+    logger = logger or Logging()
+    # 每批写入后立即写回文件头, 中断时已写入的区块仍可被识别
+    pool = RegionPool(directory, writable=True, fsync="always")
+    coords = list(spiral(radius, center_x, center_z))
+    if not force:
+        existing = {}
+        for region_x, region_z in {(x >> 5, z >> 5) for x, z in coords}:
+            with pool.region(region_x, region_z) as region:
+                if region is not None:
+                    existing[region_x, region_z] = region.raw_timestamps[:]
+        coords = [(x, z) for x, z in coords
+                  if (x >> 5, z >> 5) not in existing or not existing[x >> 5, z >> 5][(z & 31) << 5 | (x & 31)]]
+    remaining = defaultdict(int)
+    for x, z in coords:
+        remaining[x >> 5, z >> 5] += 1
+
+    total, done = len(coords), 0
+    logger.info(f"预生成 {total} 个区块 ({len(remaining)} 个区域)")
+    pending = defaultdict(list)
+    start = last = time.monotonic()
+    try:
+        with WorldGenerator(generator, workers) as world:
+            for chunk_x, chunk_z, payload in world.generate(coords, encode_anvil):
+                key = (chunk_x >> 5, chunk_z >> 5)
+                pending[key].append((chunk_x & 31, chunk_z & 31, payload, Region.COMPRESSION_ZLIB))
+                remaining[key] -= 1
+                if len(pending[key]) >= batch or not remaining[key]:
+                    pool.write_batch(*key, pending.pop(key))
+                done += 1
+                now = time.monotonic()
+                if now - last >= interval:
+                    last = now
+                    rate = done / (now - start)
+                    logger.info(f"{done}/{total} 区块, {rate:.1f} 区块/秒, 剩余约 {(total - done) / rate:.0f} 秒")
+    finally:
+        for key, chunks in pending.items():
+            pool.write_batch(*key, chunks)
+        pool.close()
+    elapsed = time.monotonic() - start
+    logger.info(f"完成 {done} 个区块, 用时 {elapsed:.1f} 秒 ({done / max(elapsed, 1e-9):.1f} 区块/秒)")
+    return done
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(prog="pystom-pregen", description="预生成区块并写入Anvil区域文件")
+    parser.add_argument("directory", help="区域文件目录 (如 world/region)")
+    parser.add_argument("--radius", type=int, default=32, help="半径 (区块), 默认32")
+    parser.add_argument("--center", type=int, nargs=2, default=(0, 0), metavar=("X", "Z"), help="中心区块坐标")
+    parser.add_argument("--generator", choices=GENERATORS, default="noise", help="世界生成器, 默认noise")
+    parser.add_argument("--seed", type=int, default=0, help="世界种子 (noise)")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数, 默认为CPU核心数")
+    parser.add_argument("--batch", type=int, default=256, help="每个区域每次写入的区块数")
+    parser.add_argument("--force", action="store_true", help="重新生成已存在的区块")
+    args = parser.parse_args(argv)
+
+    generator = NoiseGenerator(args.seed) if args.generator == "noise" else GENERATORS[args.generator]()
+    pregenerate(args.directory, generator, args.radius, *args.center, workers=args.workers,
+                batch=args.batch, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from pystom.MinecraftType.region import Region, RegionWriter
+
+
+class _PooledRegion:
+    """池中的一个区域文件"""
+    __slots__ = ("region", "refs", "lock", "size")
+
+    def __init__(self, region: Region):
+        self.region = region
+        self.refs = 0  # 正在使用该区域文件的调用方数量
+        self.lock = threading.Lock()  # 串行化对同一区域文件的读写, 写入时文件可能被重新映射
+        self.size = len(region.data)  # 映射的字节数
+
+
+class RegionPool:
+    """
+    按区域坐标 (region_x, region_z) 缓存已打开 (mmap) 的区域文件的LRU池。
+
+    打开的文件数与映射的总字节数都有上限, 超出时按最近最少使用的顺序关闭空闲的区域文件;
+    acquire() 与 release() 成对使用并做引用计数, 正在读取的区域文件不会被关闭。
+    所有操作都是线程安全的。
+
+    Attributes:
+        directory (str): 存放 r.x.z.mca 文件的目录。
+        max_open (int): 最多同时打开的区域文件数 (文件描述符预算)。
+        max_mapped_bytes (int): 最多同时映射的字节数。
+        writable (bool): 以RegionWriter打开, 允许写入并在写入时创建区域文件。
+        hits / misses / evictions (int): 命中、未命中与淘汰次数。
+    """
+
+    def __init__(self, directory: str, max_open: int = 256, max_mapped_bytes: int = 1 << 32,
+                 writable: bool = False, **writer_options):
+        """
+        Args:
+            directory (str): 存放区域文件的目录。
+            max_open (int): 最多同时打开的区域文件数。
+            max_mapped_bytes (int): 最多同时映射的字节数。
+            writable (bool): 是否以可写方式打开区域文件。
+            writer_options: 传给 RegionWriter.open() 的参数 (allocation, fsync)。
+        """
+        self.directory = directory
+        self.max_open = max_open
+        self.max_mapped_bytes = max_mapped_bytes
+        self.writable = writable
+        self._writer_options = writer_options
+        self._regions: OrderedDict[tuple[int, int], _PooledRegion] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, region_x: int, region_z: int) -> str:
+        return os.path.join(self.directory, f"r.{region_x}.{region_z}.mca")
+
+    def acquire(self, region_x: int, region_z: int, create: bool = False) -> Region | None:
+        """
+        获取区域文件并增加其引用计数, 使用完毕后必须调用 release()。
+
+        Args:
+            create (bool): 文件不存在时是否创建 (仅可写模式), 只读取时不会创建空的区域文件。
+
+        Returns:
+            Region: 区域文件; 文件不存在且不创建时为None。
+        """
+        entry = self._acquire((region_x, region_z), create)
+        return None if entry is None else entry.region
+
+    def _acquire(self, key: tuple[int, int], create: bool) -> _PooledRegion | None:
+        with self._lock:
+            entry = self._regions.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._regions.move_to_end(key)
+            else:
+                self.misses += 1
+                path = self.path(*key)
+                if not os.path.exists(path) and not (create and self.writable):
+                    return None
+                if self.writable:
+                    os.makedirs(self.directory, exist_ok=True)
+                    region = RegionWriter.open(path, **self._writer_options)
+                else:
+                    region = Region.open(path)
+                entry = self._regions[key] = _PooledRegion(region)
+            # 先增加引用计数再淘汰, 刚取得的区域文件不会被关闭
+            entry.refs += 1
+            self._evict()
+            return entry
+
+    def release(self, region: Region):
+        """释放 acquire() 取得的区域文件"""
+        with self._lock:
+            for entry in self._regions.values():
+                if entry.region is region:
+                    entry.refs -= 1
+                    break
+            self._evict()
+
+    @contextmanager
+    def region(self, region_x: int, region_z: int, create: bool = False):
+        """在with语句中使用区域文件, 退出时自动release"""
+        region = self.acquire(region_x, region_z, create)
+        try:
+            yield region
+        finally:
+            if region is not None:
+                self.release(region)
+
+    @contextmanager
+    def _entry(self, key: tuple[int, int], create: bool = False):
+        entry = self._acquire(key, create)
+        try:
+            yield entry
+        finally:
+            if entry is not None:
+                with self._lock:
+                    entry.refs -= 1
+                    self._evict()
+
+    def read_chunk_payload(self, chunk_x: int, chunk_z: int) -> tuple[int, bytes] | None:
+        """按世界中的绝对区块坐标读取未解压的区块数据, 返回 (压缩类型, 数据), 区块不存在则为None"""
+        with self._entry((chunk_x >> 5, chunk_z >> 5)) as entry:
+            if entry is None:
+                return None
+            # 只在复制数据时持有区域文件的锁, 不会读到写入了一半的扇区
+            with entry.lock:
+                return entry.region.read_chunk_payload(chunk_x & 31, chunk_z & 31)
+
+    def read_chunk(self, chunk_x: int, chunk_z: int) -> bytes | None:
+        """按世界中的绝对区块坐标读取解压后的区块NBT数据, 区块不存在则为None"""
+        payload = self.read_chunk_payload(chunk_x, chunk_z)
+        if payload is None:
+            return None
+        return Region._decompress(*payload)
+
+    def write_chunk(self, chunk_x: int, chunk_z: int, data, **options):
+        """按世界中的绝对区块坐标写入区块, 参数同 RegionWriter.write_chunk()"""
+        if not self.writable:
+            raise PermissionError("RegionPool is read-only")
+        with self._entry((chunk_x >> 5, chunk_z >> 5), create=True) as entry:
+            with entry.lock:
+                entry.region.write_chunk(chunk_x & 31, chunk_z & 31, data, **options)
+                entry.size = len(entry.region.data)
+
+    def write_batch(self, region_x: int, region_z: int, chunks: list[tuple[int, int, bytes, int]], **options):
+        """向一个区域文件批量写入已压缩的区块, 参数同 RegionWriter.write_batch()"""
+        if not self.writable:
+            raise PermissionError("RegionPool is read-only")
+        with self._entry((region_x, region_z), create=True) as entry:
+            with entry.lock:
+                entry.region.write_batch(chunks, **options)
+                entry.size = len(entry.region.data)
+
+    @property
+    def mapped_bytes(self) -> int:
+        return sum(entry.size for entry in self._regions.values())
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """命中、未命中、淘汰次数以及当前打开的文件数与映射字节数"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "open": len(self._regions), "mapped_bytes": self.mapped_bytes}
+
+    def _evict(self):
+        """超出预算时按LRU顺序关闭空闲的区域文件, 调用方需持有 self._lock"""
+        mapped = self.mapped_bytes
+        for key in list(self._regions):
+            if len(self._regions) <= self.max_open and mapped <= self.max_mapped_bytes:
+                break
+            entry = self._regions[key]
+            if entry.refs > 0:
+                continue
+            mapped -= entry.size
+            del self._regions[key]
+            entry.region.close()
+            self.evictions += 1
+
+    def close(self):
+        """关闭所有区域文件"""
+        with self._lock:
+            for entry in self._regions.values():
+                entry.region.close()
+            self._regions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,208 @@
+import math
+import threading
+import time
+from collections.abc import Callable
+
+from pystom.MinecraftType.Location import ChunkLocation
+from pystom.Packet.Server import ServerUnloadChunkPacket, ServerUpdateViewPositionPacket
+from pystom.world.chunkio import ChunkIO
+from pystom.world.util import spiral
+
+
+def chunk_of(x: float, z: float) -> tuple[int, int]:
+    """方块坐标 (可以是小数) 所在的区块坐标"""
+    return math.floor(x) >> 4, math.floor(z) >> 4
+
+
+class PlayerView:
+    """
+    一个玩家的视距状态。
+
+    Attributes:
+        chunk_x (int): 玩家所在区块的X坐标。
+        chunk_z (int): 玩家所在区块的Z坐标。
+        view_distance (int): 视距。
+        loaded (set[tuple[int, int]]): 已发送给客户端的区块。
+        queue (list[tuple[int, int]]): 在视距内、等待发送的区块, 按与玩家距离由远到近存放以便从末尾弹出。
+        unload (list[tuple[int, int]]): 等待发送卸载包的区块。
+    """
+    __slots__ = ("chunk_x", "chunk_z", "view_distance", "loaded", "queue", "unload", "center_sent")
+
+    def __init__(self, chunk_x: int, chunk_z: int, view_distance: int):
+        self.chunk_x = chunk_x
+        self.chunk_z = chunk_z
+        self.view_distance = view_distance
+        self.loaded = set()
+        self.queue = []
+        self.unload = []
+        self.center_sent = False
+
+    def visible(self, chunk_x: int, chunk_z: int) -> bool:
+        return abs(chunk_x - self.chunk_x) <= self.view_distance and abs(chunk_z - self.chunk_z) <= self.view_distance
+
+    def update(self):
+        """按当前的中心与视距计算可见区块的差集, 重新排列发送队列"""
+        stale = [key for key in self.loaded if not self.visible(*key)]
+        self.loaded.difference_update(stale)
+        self.unload.extend(stale)
+        order = [key for key in spiral(self.view_distance, self.chunk_x, self.chunk_z) if key not in self.loaded]
+        order.reverse()
+        self.queue = order
+
+
+class ChunkStreamer:
+    """
+    按玩家视距向客户端发送区块。
+
+    玩家跨越区块边界或视距改变时计算新旧可见范围的差集: 离开视距的区块发送卸载包,
+    新进入视距的区块按螺旋顺序 (由近到远) 排队。tick() 中每个玩家按每刻的字节预算发送队列中的区块,
+    加入游戏与快速飞行时区块逐刻填充, 不会一次性塞满连接的发送缓冲区。
+
+    区块帧由source提供, 返回None表示区块尚未就绪 (如仍在读取或生成), 之后的tick中再试。
+
+    Attributes:
+        budget (int): 每个玩家每刻最多发送的区块字节数 (每刻至少发送一个区块)。
+        max_view_distance (int): 服务端的最大视距。
+        io (ChunkIO): 可选的区块I/O服务, 玩家移动时通知其预取前方的区块。
+    """
+
+    def __init__(self, source: Callable[[int, int], bytes | None], send: Callable[[object, bytes], None],
+                 frame: Callable[..., bytes], budget: int = 256 << 10, max_view_distance: int = 32,
+                 io: ChunkIO = None):
+        """
+        Args:
+            source (Callable[[int, int], bytes | None]): 由区块坐标得到区块数据包帧。
+            send (Callable[[object, bytes], None]): 向玩家发送数据。
+            frame (Callable[..., bytes]): 将包ID与数据包包装为帧, 如 MinecraftServer._frame。
+            budget (int): 每个玩家每刻的字节预算。
+            max_view_distance (int): 服务端的最大视距。
+            io (ChunkIO): 区块I/O服务。
+        """
+        self.source = source
+        self.send = send
+        self.frame = frame
+        self.budget = budget
+        self.max_view_distance = max_view_distance
+        self.io = io
+        self._players: dict[object, PlayerView] = {}
+        self._lock = threading.Lock()
+
+    def add(self, player, chunk_x: int, chunk_z: int, view_distance: int) -> PlayerView:
+        """开始为玩家发送区块"""
+        with self._lock:
+            view = self._players[player] = PlayerView(chunk_x, chunk_z, min(view_distance, self.max_view_distance))
+            view.update()
+        if self.io is not None:
+            self.io.move(player, chunk_x, chunk_z, view.view_distance)
+        return view
+
+    def remove(self, player):
+        """玩家离开时调用"""
+        with self._lock:
+            self._players.pop(player, None)
+        if self.io is not None:
+            self.io.forget(player)
+
+    def view(self, player) -> PlayerView | None:
+        return self._players.get(player)
+
+    def move(self, player, chunk_x: int, chunk_z: int) -> bool:
+        """
+        记录玩家所在的区块。
+
+        Returns:
+            bool: 玩家是否跨越了区块边界。
+        """
+        with self._lock:
+            view = self._players.get(player)
+            if view is None or (view.chunk_x, view.chunk_z) == (chunk_x, chunk_z):
+                return False
+            view.chunk_x, view.chunk_z = chunk_x, chunk_z
+            view.center_sent = False
+            view.update()
+        if self.io is not None:
+            self.io.move(player, chunk_x, chunk_z, view.view_distance)
+        return True
+
+    def set_view_distance(self, player, view_distance: int):
+        """客户端设置中的视距改变时调用"""
+        with self._lock:
+            view = self._players.get(player)
+            view_distance = min(view_distance, self.max_view_distance)
+            if view is None or view.view_distance == view_distance:
+                return
+            view.view_distance = view_distance
+            view.update()
+
+    def viewers(self, chunk_x: int, chunk_z: int) -> list:
+        """已经收到区块 (chunk_x, chunk_z) 的玩家"""
+        with self._lock:
+            return [player for player, view in self._players.items() if (chunk_x, chunk_z) in view.loaded]
+
+    def broadcast(self, chunk_x: int, chunk_z: int, data: bytes) -> int:
+        """
+        向所有已经收到该区块的玩家发送data, 还在队列中的玩家之后会收到最新的区块, 不需要发送。
+
+        Returns:
+            int: 发送的玩家数。
+        """
+        players = self.viewers(chunk_x, chunk_z)
+        for player in players:
+            try:
+                self.send(player, data)
+            except OSError:
+                self.remove(player)
+        return len(players)
+
+    def resend(self, chunk_x: int, chunk_z: int):
+        """区块被大量修改时调用, 已经收到该区块的玩家在下一刻优先重新收到整个区块"""
+        key = (chunk_x, chunk_z)
+        with self._lock:
+            for view in self._players.values():
+                if key in view.loaded:
+                    view.loaded.discard(key)
+                    view.queue.append(key)
+
+    def tick(self):
+        """为每个玩家发送卸载包与预算内的区块, 发送失败 (连接已关闭) 的玩家会被移除"""
+        with self._lock:
+            players = list(self._players.items())
+        for player, view in players:
+            try:
+                with self._lock:
+                    frames = self._collect(view)
+                if frames:
+                    self.send(player, b"".join(frames))
+            except OSError:
+                self.remove(player)
+
+    def _collect(self, view: PlayerView) -> list[bytes]:
+        frames = []
+        if not view.center_sent:
+            view.center_sent = True
+            frames.append(self.frame(0x49, ServerUpdateViewPositionPacket(ChunkLocation(view.chunk_x, view.chunk_z))))
+        for chunk_x, chunk_z in view.unload:
+            frames.append(self.frame(0x21, ServerUnloadChunkPacket(chunk_x, chunk_z)))
+        view.unload.clear()
+
+        spent, skipped = 0, []
+        while view.queue and (spent < self.budget or not spent):
+            key = view.queue.pop()
+            data = self.source(*key)
+            if data is None:
+                skipped.append(key)
+                continue
+            view.loaded.add(key)
+            frames.append(data)
+            spent += len(data)
+        # 未就绪的区块保持原来的先后顺序, 下一刻优先发送
+        view.queue.extend(reversed(skipped))
+        return frames
+
+    def run(self, interval: float = 0.05, stop: threading.Event = None):
+        """按固定间隔 (默认每刻50毫秒) 调用 tick(), 直到stop被设置"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            start = time.monotonic()
+            self.tick()
+            stop.wait(max(0.0, interval - (time.monotonic() - start)))
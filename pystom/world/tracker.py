@@ -0,0 +1,325 @@
+import math
+import threading
+from collections import defaultdict
+from collections.abc import Iterator
+
+
+class SpatialGrid:
+    """
+    按水平坐标分格的空间哈希网格。
+
+    每个格子是边长为cell_size的正方形柱体 (cell_size为16时即区块), 只保存有对象的格子;
+    对象在格子内移动只更新位置, 跨越格子时才在两个格子之间移动。
+    范围查询只访问与范围相交的格子, 开销与范围内的对象数成正比, 与对象总数无关。
+
+    Attributes:
+        cell_size (int): 格子的边长 (方块)。
+    """
+
+    def __init__(self, cell_size: int = 16):
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], set] = defaultdict(set)
+        self._positions: dict[object, tuple[float, float, float]] = {}
+        self._cell_of: dict[object, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, item) -> bool:
+        return item in self._positions
+
+    def cell(self, x: float, z: float) -> tuple[int, int]:
+        """坐标所在的格子"""
+        return math.floor(x / self.cell_size), math.floor(z / self.cell_size)
+
+    def position(self, item) -> tuple[float, float, float]:
+        return self._positions[item]
+
+    def cell_of(self, item) -> tuple[int, int]:
+        return self._cell_of[item]
+
+    def insert(self, item, x: float, y: float, z: float) -> tuple[int, int]:
+        """加入对象, 返回其所在的格子"""
+        if item in self._positions:
+            raise KeyError(f"{item!r} 已经在网格中")
+        cell = self.cell(x, z)
+        self._cells[cell].add(item)
+        self._positions[item] = (x, y, z)
+        self._cell_of[item] = cell
+        return cell
+
+    def move(self, item, x: float, y: float, z: float) -> tuple[tuple[int, int], tuple[int, int]]:
+        """
+        移动对象。
+
+        Returns:
+            tuple: (原来的格子, 新的格子), 两者相同表示没有跨越格子。
+        """
+        old = self._cell_of[item]
+        new = self.cell(x, z)
+        self._positions[item] = (x, y, z)
+        if new != old:
+            self._discard(old, item)
+            self._cells[new].add(item)
+            self._cell_of[item] = new
+        return old, new
+
+    def remove(self, item) -> tuple[int, int]:
+        """移除对象, 返回其原来所在的格子"""
+        cell = self._cell_of.pop(item)
+        del self._positions[item]
+        self._discard(cell, item)
+        return cell
+
+    def _discard(self, cell: tuple[int, int], item):
+        items = self._cells[cell]
+        items.discard(item)
+        if not items:
+            del self._cells[cell]
+
+    def in_cell(self, cell: tuple[int, int]) -> set:
+        """格子中的对象, 调用方不应修改返回的集合"""
+        return self._cells.get(cell, set())
+
+    def cells(self, cell_x0: int, cell_z0: int, cell_x1: int, cell_z1: int) -> Iterator:
+        """[cell_x0, cell_x1] × [cell_z0, cell_z1] 范围内所有格子中的对象"""
+        cells = self._cells
+        if (cell_x1 - cell_x0 + 1) * (cell_z1 - cell_z0 + 1) > len(cells):
+            # 范围内的格子比有对象的格子还多, 直接遍历有对象的格子
+            for (cell_x, cell_z), items in list(cells.items()):
+                if cell_x0 <= cell_x <= cell_x1 and cell_z0 <= cell_z <= cell_z1:
+                    yield from items
+            return
+        for cell_x in range(cell_x0, cell_x1 + 1):
+            for cell_z in range(cell_z0, cell_z1 + 1):
+                items = cells.get((cell_x, cell_z))
+                if items:
+                    yield from items
+
+    def query_box(self, x0: float, z0: float, x1: float, z1: float, y0: float = None, y1: float = None) -> list:
+        """位置在 [x0, x1] × [z0, z1] (以及给出时的 [y0, y1]) 范围内的对象"""
+        (cell_x0, cell_z0), (cell_x1, cell_z1) = self.cell(x0, z0), self.cell(x1, z1)
+        positions = self._positions
+        result = []
+        for item in self.cells(cell_x0, cell_z0, cell_x1, cell_z1):
+            x, y, z = positions[item]
+            if x0 <= x <= x1 and z0 <= z <= z1 and (y0 is None or y0 <= y) and (y1 is None or y <= y1):
+                result.append(item)
+        return result
+
+    def query_radius(self, x: float, y: float, z: float, radius: float, vertical: bool = True) -> list:
+        """
+        与 (x, y, z) 的距离不超过radius的对象。
+
+        Args:
+            vertical (bool): 是否计入Y方向的距离, 为False时只按水平距离计算。
+        """
+        limit = radius * radius
+        positions = self._positions
+        result = []
+        for item in self.cells(*self.cell(x - radius, z - radius), *self.cell(x + radius, z + radius)):
+            px, py, pz = positions[item]
+            distance = (px - x) ** 2 + (pz - z) ** 2
+            if vertical:
+                distance += (py - y) ** 2
+            if distance <= limit:
+                result.append(item)
+        return result
+
+
+def _square(cell: tuple[int, int], distance: int) -> set[tuple[int, int]]:
+    cell_x, cell_z = cell
+    return {(x, z) for x in range(cell_x - distance, cell_x + distance + 1)
+            for z in range(cell_z - distance, cell_z + distance + 1)}
+
+
+class EntityTracker:
+    """
+    实体可见性跟踪。
+
+    实体与观察者 (玩家) 都放在 SpatialGrid 中, 观察者看得到以其所在格子为中心、
+    边长 2 * view_distance + 1 个格子的正方形范围内的实体 (不包括自己)。
+    只有实体或观察者跨越格子时才重新计算可见性: 实体跨越格子时只检查两个格子附近的观察者,
+    观察者跨越格子时只检查新旧范围的差集中的格子, 每个观察者的可见实体集合增量维护,
+    不需要每刻让所有玩家检查所有实体 (O(N²))。
+
+    可见性的变化累积为每个观察者的生成 (spawn) 与销毁 (destroy) 差异, 由 flush() 每刻取出一次;
+    同一刻内先生成后销毁 (或相反) 的实体互相抵消, 不会发送给客户端。
+
+    Attributes:
+        grid (SpatialGrid): 所有实体 (包括观察者) 所在的网格。
+        view_distance (int): 默认的可见距离 (格子)。
+    """
+
+    def __init__(self, cell_size: int = 16, view_distance: int = 4):
+        """
+        Args:
+            cell_size (int): 格子的边长 (方块), 默认与区块相同。
+            view_distance (int): 默认的可见距离 (格子)。
+        """
+        self.grid = SpatialGrid(cell_size)
+        self.view_distance = view_distance
+        self._viewers: dict[object, int] = {}  # 观察者 -> 可见距离
+        self._viewer_cells: dict[tuple[int, int], set] = defaultdict(set)  # 格子 -> 其中的观察者
+        self._max_distance = 0
+        self.visible: dict[object, set] = {}  # 观察者 -> 当前可见的实体
+        self._spawn: dict[object, set] = defaultdict(set)
+        self._destroy: dict[object, set] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    # 可见性差异
+
+    def _show(self, viewer, entity):
+        if entity is viewer or entity in self.visible[viewer]:
+            return
+        self.visible[viewer].add(entity)
+        if entity in self._destroy[viewer]:
+            self._destroy[viewer].discard(entity)
+        else:
+            self._spawn[viewer].add(entity)
+
+    def _hide(self, viewer, entity):
+        if entity not in self.visible[viewer]:
+            return
+        self.visible[viewer].discard(entity)
+        if entity in self._spawn[viewer]:
+            self._spawn[viewer].discard(entity)
+        else:
+            self._destroy[viewer].add(entity)
+
+    def flush(self) -> dict[object, tuple[list, list]]:
+        """
+        取出本刻累积的可见性变化。
+
+        Returns:
+            dict[object, tuple[list, list]]: 观察者 -> (需要生成的实体, 需要销毁的实体)。
+        """
+        with self._lock:
+            spawns, destroys = self._spawn, self._destroy
+            self._spawn, self._destroy = defaultdict(set), defaultdict(set)
+        result = {}
+        for viewer in spawns.keys() | destroys.keys():
+            spawn, destroy = spawns.get(viewer, ()), destroys.get(viewer, ())
+            if spawn or destroy:
+                result[viewer] = (list(spawn), list(destroy))
+        return result
+
+    # 观察者
+
+    def _sees(self, viewer, cell: tuple[int, int]) -> bool:
+        viewer_x, viewer_z = self.grid.cell_of(viewer)
+        distance = self._viewers[viewer]
+        return abs(cell[0] - viewer_x) <= distance and abs(cell[1] - viewer_z) <= distance
+
+    def _viewers_near(self, cell: tuple[int, int]) -> set:
+        """可能看得到cell的观察者 (所在格子距cell不超过最大可见距离)"""
+        distance = self._max_distance
+        cell_x, cell_z = cell
+        viewers = set()
+        if (2 * distance + 1) ** 2 > len(self._viewer_cells):
+            for (x, z), items in self._viewer_cells.items():
+                if abs(x - cell_x) <= distance and abs(z - cell_z) <= distance:
+                    viewers |= items
+            return viewers
+        for x in range(cell_x - distance, cell_x + distance + 1):
+            for z in range(cell_z - distance, cell_z + distance + 1):
+                items = self._viewer_cells.get((x, z))
+                if items:
+                    viewers |= items
+        return viewers
+
+    # 加入、移动与移除
+
+    def add(self, entity, x: float, y: float, z: float, viewer: bool = False, view_distance: int = None):
+        """
+        加入实体。
+
+        Args:
+            viewer (bool): 实体是否同时是观察者 (玩家)。
+            view_distance (int): 观察者的可见距离 (格子), 默认为 view_distance。
+        """
+        with self._lock:
+            cell = self.grid.insert(entity, x, y, z)
+            for other in self._viewers_near(cell):
+                if self._sees(other, cell):
+                    self._show(other, entity)
+            if viewer:
+                distance = self.view_distance if view_distance is None else view_distance
+                self._viewers[entity] = distance
+                self._max_distance = max(self._max_distance, distance)
+                self._viewer_cells[cell].add(entity)
+                self.visible[entity] = set()
+                for other in self.grid.cells(cell[0] - distance, cell[1] - distance,
+                                             cell[0] + distance, cell[1] + distance):
+                    self._show(entity, other)
+
+    def move(self, entity, x: float, y: float, z: float) -> bool:
+        """
+        移动实体, 只有跨越格子时才更新可见性。
+
+        Returns:
+            bool: 是否跨越了格子。
+        """
+        with self._lock:
+            old, new = self.grid.move(entity, x, y, z)
+            if old == new:
+                return False
+            # 其他观察者对该实体的可见性
+            for other in self._viewers_near(old) | self._viewers_near(new):
+                if other is entity:
+                    continue
+                if self._sees(other, new):
+                    self._show(other, entity)
+                else:
+                    self._hide(other, entity)
+            # 该实体作为观察者时, 只检查新旧范围的差集
+            if entity in self._viewers:
+                cells = self._viewer_cells[old]
+                cells.discard(entity)
+                if not cells:
+                    del self._viewer_cells[old]
+                self._viewer_cells[new].add(entity)
+                distance = self._viewers[entity]
+                before, after = _square(old, distance), _square(new, distance)
+                for cell in before - after:
+                    for other in self.grid.in_cell(cell):
+                        self._hide(entity, other)
+                for cell in after - before:
+                    for other in self.grid.in_cell(cell):
+                        self._show(entity, other)
+            return True
+
+    def set_view_distance(self, viewer, view_distance: int):
+        """修改观察者的可见距离"""
+        with self._lock:
+            old = self._viewers[viewer]
+            if old == view_distance:
+                return
+            cell = self.grid.cell_of(viewer)
+            before, after = _square(cell, old), _square(cell, view_distance)
+            self._viewers[viewer] = view_distance
+            self._max_distance = max(self._viewers.values())
+            for other_cell in before - after:
+                for other in self.grid.in_cell(other_cell):
+                    self._hide(viewer, other)
+            for other_cell in after - before:
+                for other in self.grid.in_cell(other_cell):
+                    self._show(viewer, other)
+
+    def remove(self, entity):
+        """移除实体, 看得到它的观察者会收到销毁差异; 观察者移除后不再产生差异"""
+        with self._lock:
+            cell = self.grid.remove(entity)
+            for other in self._viewers_near(cell):
+                if other is not entity:
+                    self._hide(other, entity)
+            if entity in self._viewers:
+                del self._viewers[entity]
+                cells = self._viewer_cells[cell]
+                cells.discard(entity)
+                if not cells:
+                    del self._viewer_cells[cell]
+                self._max_distance = max(self._viewers.values(), default=0)
+                del self.visible[entity]
+                self._spawn.pop(entity, None)
+                self._destroy.pop(entity, None)
@@ -0,0 +1,9 @@
+def spiral(radius: int, center_x: int = 0, center_z: int = 0):
+    """从中心向外按正方形螺旋依次返回 (2 * radius + 1) ** 2 个区块坐标"""
+    yield center_x, center_z
+    for ring in range(1, radius + 1):
+        x, z = center_x - ring, center_z - ring
+        for dx, dz in ((1, 0), (0, 1), (-1, 0), (0, -1)):
+            for _ in range(ring * 2):
+                yield x, z
+                x, z = x + dx, z + dz
@@ -11,11 +11,15 @@ setup(
     long_description_content_type='text/markdown',               # README格式
     url='https://github.com/Mogui-Hao/PyStom',               # 项目主页
     packages=find_packages(),          # 自动查找包
+    package_data={'pystom.MinecraftType': ['data/*.bin']},  # 方块状态数据文件
     classifiers=[                     # 项目分类，方便PyPI展示
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',  # 许可证，根据实际情况修改
         'Operating System :: OS Independent',
     ],
+    entry_points={                    # 命令行入口
+        'console_scripts': ['pystom-pregen=pystom.world.pregen:main'],
+    },
     python_requires='>=3.11',          # 支持的Python版本
     install_requires=[                # 依赖包列表
         # 'requests>=2.20.0',
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+from pystom.MinecraftType import block
+
+
+def _report() -> dict:
+    """
+    测试用的方块报告: 前16个方块状态与原版相同 (air 到 oak_planks), 之后是测试用到的其他方块,
+    其ID与原版不同。完整的数据文件需要由原版数据生成器的报告生成, 不随源码提供。
+    """
+    report = {}
+    next_id = 0
+
+    def add(name, properties=None, definition="minecraft:block", default=0):
+        nonlocal next_id
+        combos = [{}]
+        for key, values in (properties or {}).items():
+            combos = [{**combo, key: value} for combo in combos for value in values]
+        states = []
+        for index, combo in enumerate(combos):
+            state = {"id": next_id, **({"properties": combo} if combo else {})}
+            if index == default:
+                state["default"] = True
+            states.append(state)
+            next_id += 1
+        report[name] = {"definition": {"type": definition}, "states": states}
+
+    add("minecraft:air", definition="minecraft:air")
+    for name in ("stone", "granite", "polished_granite", "diorite", "polished_diorite", "andesite",
+                 "polished_andesite"):
+        add(f"minecraft:{name}")
+    add("minecraft:grass_block", {"snowy": ["true", "false"]}, default=1)
+    add("minecraft:dirt")
+    add("minecraft:coarse_dirt")
+    add("minecraft:podzol", {"snowy": ["true", "false"]}, default=1)
+    add("minecraft:cobblestone")
+    add("minecraft:oak_planks")
+    add("minecraft:water", {"level": [str(level) for level in range(16)]}, "minecraft:liquid")
+    add("minecraft:lava", {"level": [str(level) for level in range(16)]}, "minecraft:liquid")
+    add("minecraft:glass")
+    add("minecraft:glowstone")
+    add("minecraft:torch")
+    add("minecraft:cave_air", definition="minecraft:air")
+    add("minecraft:void_air", definition="minecraft:air")
+    return report
+
+
+def pytest_configure(config):
+    # 子进程 (如检查导入时不打开注册表的测试) 通过环境变量使用同一个数据文件
+    path = os.path.join(tempfile.mkdtemp(prefix="pystom-test-"), "block_states.bin")
+    with open(path, "wb") as file:
+        file.write(block.build(_report()))
+    os.environ[block.PATH_ENV] = path
+    block.registry.cache_clear()
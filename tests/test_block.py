@@ -0,0 +1,99 @@
+import subprocess
+import sys
+
+import pytest
+
+from pystom.MinecraftType import block
+
+
+def report() -> dict:
+    """blocks.json 报告的片段, 方块状态ID连续"""
+    states = iter(range(1000))
+
+    def entry(name, properties=None, definition="minecraft:block"):
+        combos = [{}]
+        for key, values in (properties or {}).items():
+            combos = [{**combo, key: value} for combo in combos for value in values]
+        return name, {"definition": {"type": definition},
+                      "states": [{"id": next(states), "default": index == 0, **({"properties": combo} if combo else {})}
+                                 for index, combo in enumerate(combos)]}
+
+    return dict([
+        entry("minecraft:air", definition="minecraft:air"),
+        entry("minecraft:stone"),
+        entry("minecraft:water", {"level": [str(level) for level in range(16)]}, "minecraft:liquid"),
+        entry("minecraft:redstone_lamp", {"lit": ["false", "true"]}),
+        entry("minecraft:oak_slab", {"type": ["bottom"], "waterlogged": ["false", "true"]}),
+        entry("minecraft:light", {"level": [str(level) for level in range(16)], "waterlogged": ["false", "true"]}),
+        entry("minecraft:cave_air", definition="minecraft:air"),
+    ])
+
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / "block_states.bin"
+    path.write_bytes(block.build(report()))
+    blocks = block.BlockRegistry(str(path))
+    yield blocks
+    blocks.close()
+
+
+def test_build_defaults_for_fluids_emitters_and_air(registry):
+    water = registry.default_state("water")
+    assert registry.is_fluid(water) and not registry.is_solid(water)
+    assert water not in registry.non_motion_blocking_states()
+    assert water in registry.transparent_states()
+    lit = registry.state_id("redstone_lamp", {"lit": True})
+    assert registry.light_emission(lit) == 15
+    assert registry.light_emission(registry.default_state("redstone_lamp")) == 0
+    assert registry.light_emission(registry.state_id("light", {"level": 11, "waterlogged": True})) == 11
+    assert registry.is_fluid(registry.state_id("oak_slab", {"waterlogged": True}))
+    assert not registry.is_fluid(registry.state_id("oak_slab", {"waterlogged": False}))
+    assert registry.default_state("cave_air") in registry.air_states()
+
+
+def test_unknown_states_fall_back_to_opaque_solid(registry):
+    unknown = registry.state_count + 100
+    assert not registry.known(unknown)
+    assert not registry.is_air(unknown) and registry.is_solid(unknown) and not registry.is_fluid(unknown)
+    assert registry.light_opacity(unknown) == 15
+    assert registry.light_emission(unknown) == 0
+    assert registry.light_opacity(-1) == 15
+    with pytest.raises(KeyError):
+        registry.name(unknown)
+    with pytest.raises(KeyError):
+        registry.describe(-1)
+
+
+def test_importing_modules_does_not_open_registry():
+    code = ("import pystom.world, pystom.utils, pystom.world.pregen\n"
+            "from pystom.MinecraftType import block\n"
+            "assert block.registry.cache_info().currsize == 0\n"
+            "from pystom.world import generator\n"
+            "assert generator.STONE == block.registry().default_state('minecraft:stone')\n")
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_anvil_biomes_use_registry_names():
+    from pystom.MinecraftType.chunk import Chunk
+    from pystom.world.pregen import biome_names, to_anvil
+
+    assert biome_names()[0] == "minecraft:plains"
+    section = to_anvil(Chunk(0, 0, -64, 384))["sections"].value[0]
+    assert section["biomes"]["palette"].value[0].value == "minecraft:plains"
+    with pytest.raises(ValueError):
+        to_anvil(Chunk(0, 0, -64, 384, biome=len(biome_names())))
+
+
+def test_incomplete_or_missing_registry_is_an_error(tmp_path, monkeypatch):
+    stub = tmp_path / "stub.bin"
+    stub.write_bytes(block.build(dict(list(report().items())[:2])))  # 只有 air 与 stone
+    try:
+        for path, error in ((stub, ValueError), (tmp_path / "missing.bin", FileNotFoundError)):
+            monkeypatch.setenv(block.PATH_ENV, str(path))
+            block.registry.cache_clear()
+            with pytest.raises(error):
+                block.registry()
+    finally:
+        monkeypatch.undo()
+        block.registry.cache_clear()
@@ -0,0 +1,111 @@
+import struct
+
+from pystom.MinecraftType.chunk import Chunk
+from pystom.Packet.Server import ServerBlockUpdatePacket, ServerSectionBlocksUpdatePacket
+from pystom.server.MinecraftServer import MinecraftServer
+
+
+def read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, offset
+
+
+def signed(value: int, bits: int) -> int:
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+def test_section_blocks_update_encoding():
+    indices = [0, 1 << 8 | 2 << 4 | 3, 0xFFF]
+    states = [1, 300, 70000]
+    data = ServerSectionBlocksUpdatePacket(-3, -4, 5, indices, states).to_bytes
+    (position,) = struct.unpack_from(">Q", data)
+    assert (signed(position >> 42, 22), signed(position & 0xFFFFF, 20), signed(position >> 20 & 0x3FFFFF, 22)) \
+        == (-3, -4, 5)
+    count, offset = read_varint(data, 8)
+    assert count == 3
+    decoded = []
+    for _ in range(count):
+        record, offset = read_varint(data, offset)
+        # 状态 << 12 | 段内X << 8 | 段内Z << 4 | 段内Y
+        x, z, y = record >> 8 & 15, record >> 4 & 15, record & 15
+        decoded.append((y << 8 | z << 4 | x, record >> 12))
+    assert offset == len(data)
+    assert decoded == list(zip(indices, states))
+
+
+def test_block_update_encoding():
+    data = ServerBlockUpdatePacket(-1, -64, 17, 9).to_bytes
+    (position,) = struct.unpack_from(">Q", data)
+    assert (signed(position >> 38, 26), signed(position & 0xFFF, 12), signed(position >> 12 & 0x3FFFFFF, 26)) \
+        == (-1, -64, 17)
+    assert read_varint(data, 8) == (9, 9)
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = bytearray()
+
+    def sendall(self, data):
+        self.sent += data
+
+
+def packets(data: bytes) -> list[tuple[int, bytes]]:
+    """拆分未压缩的帧, 帧内为 包ID + 长度前缀的数据包 (与 MinecraftServer._frame() 相同)"""
+    result, offset = [], 0
+    while offset < len(data):
+        length, offset = read_varint(data, offset)
+        packet_id, body = read_varint(data, offset)
+        size, body = read_varint(data, body)
+        result.append((packet_id, data[body:body + size]))
+        offset += length
+    return result
+
+
+def test_server_set_block_sends_batched_updates():
+    server = MinecraftServer()
+    chunk = Chunk(0, 0, -64, 384)
+    chunk.fill(1, y0=-64, y1=-60)
+    server.load_chunk(chunk)
+    player = FakeSocket()
+    server.streamer.add(player, 0, 0, 2)
+    # 发送完视距内的所有区块
+    server.tick()
+    while player.sent:
+        player.sent.clear()
+        server.tick()
+
+    assert server.set_block(1, -61, 1, 0)
+    assert not server.set_block(1, -61, 1, 0)
+    assert not server.set_block(1000, 0, 0, 1)  # 未载入的区块
+    assert server.set_block(2, -61, 2, 0)
+    assert chunk.get_block(1, -61, 1) == 0
+    server.tick()
+
+    sent = packets(bytes(player.sent))
+    assert sorted(packet_id for packet_id, _ in sent) == [0x2A, 0x4D]
+    body = dict(sent)[0x4D]
+    count, _ = read_varint(body, 8)
+    assert count == 2
+
+
+def test_set_block_only_relights_when_light_properties_change():
+    server = MinecraftServer()
+    chunk = Chunk(0, 0, -64, 384)
+    chunk.fill(1, y0=-64, y1=-60)
+    server.load_chunk(chunk)
+    before = list(chunk.heightmaps.heights["WORLD_SURFACE"])
+    assert server.set_block(3, -61, 3, 2)  # 石头 -> 花岗岩, 都不透明
+    assert server.light._pending == []
+    assert server.block_updates.pending() == 1
+    assert server.set_block(3, -61, 3, 0)
+    assert len(server.light._pending) == 1
+    column = 3 << 4 | 3
+    after = chunk.heightmaps.heights["WORLD_SURFACE"]
+    assert after[column] == before[column] - 1
+    assert not server.set_block(0, 400, 0, 1)  # 超出世界高度
@@ -0,0 +1,106 @@
+from concurrent.futures import Future
+
+import pytest
+
+from pystom.MinecraftType import nbt
+from pystom.world.cache import ChunkCache, estimate_size
+from pystom.world.chunkio import ChunkIO
+
+
+def chunk_nbt(x: int) -> nbt.Compound:
+    return nbt.Compound("", nbt.Int("xPos", x), nbt.String("Status", "minecraft:full"),
+                        nbt.Compound("sub", nbt.List("palette", [nbt.String("", "minecraft:air")]),
+                                     nbt.LongArray("data", [1, 2, 3])),
+                        nbt.TypedList("Pos", nbt.Double, [1.0, 2.0]))
+
+
+def test_estimate_size_matches_encoding_without_caching():
+    tag = chunk_nbt(1)
+    raw = nbt.serialize(tag, compress=False)
+    fresh = nbt.deserialize(raw, compress=False)
+    assert estimate_size(fresh) == len(fresh.serialize())
+    nested = fresh["sub"]
+    assert not nested.cached
+    estimate_size(fresh)
+    assert not nested.cached and not nested.dirty
+
+
+def test_estimate_size_of_partially_decoded_lazy_compound():
+    raw = nbt.serialize(chunk_nbt(1), compress=False)
+    lazy = nbt.deserialize(raw, compress=False, lazy=True)
+    lazy["sub"]["data"]
+    assert lazy._span is None
+    assert estimate_size(lazy) == len(nbt.LazyCompound.serialize(lazy))
+    lazy["sub"].put(nbt.Int("extra", 5))
+    assert estimate_size(lazy) == len(nbt.serialize(lazy, compress=False)) - 3
+
+
+class Storage:
+    """save() 按 results 的顺序成功 (None) 或失败 (异常)"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.saved = []
+
+    def load(self, chunk_x, chunk_z):
+        return ChunkIO._done(None)
+
+    def save(self, chunk_x, chunk_z, data):
+        future = Future()
+        result = self.results.pop(0) if self.results else None
+        if result is None:
+            self.saved.append(data)
+            future.set_result(None)
+        else:
+            future.set_exception(result)
+        return future
+
+
+def test_dirty_flag_cleared_only_after_successful_save():
+    storage = Storage(OSError("disk full"))
+    cache = ChunkCache({"w": storage}, max_bytes=1 << 20, sizeof=lambda value: 1)
+    cache.put("w", 0, 0, chunk_nbt(0))
+    (failed,) = cache.flush()
+    with pytest.raises(OSError):
+        failed.result()
+    assert cache._chunks["w", 0, 0].dirty
+    (saved,) = cache.flush()
+    saved.result()
+    assert not cache._chunks["w", 0, 0].dirty
+    assert cache.flush() == []
+
+
+def test_failed_write_back_keeps_evicted_chunk():
+    storage = Storage(OSError("disk full"))
+    cache = ChunkCache({"w": storage}, max_bytes=1, sizeof=lambda value: 1)
+    first = chunk_nbt(0)
+    cache.put("w", 0, 0, first)
+    cache.put("w", 1, 0, chunk_nbt(1))  # 淘汰 (0, 0), 写回失败
+    assert ("w", 0, 0) in cache
+    assert cache.get("w", 0, 0) is first
+    assert cache._chunks["w", 0, 0].dirty
+    # 预算仍然超出, 之后的区块照常淘汰并写回
+    assert [data["xPos"].value for data in storage.saved] == [1]
+
+
+def test_unknown_world_does_not_lose_data():
+    cache = ChunkCache({}, max_bytes=1, sizeof=lambda value: 1)
+    cache.put("missing", 0, 0, chunk_nbt(0))
+    cache.put("missing", 1, 0, chunk_nbt(1))
+    assert ("missing", 0, 0) in cache and ("missing", 1, 0) in cache
+    assert all(chunk.dirty for chunk in cache._chunks.values())
+
+
+def test_modification_during_write_keeps_chunk_dirty():
+    pending = Future()
+
+    class Slow(Storage):
+        def save(self, chunk_x, chunk_z, data):
+            return pending
+
+    cache = ChunkCache({"w": Slow()}, max_bytes=1 << 20, sizeof=lambda value: 1)
+    cache.put("w", 0, 0, chunk_nbt(0))
+    cache.flush()
+    cache.mark_dirty("w", 0, 0)
+    pending.set_result(None)
+    assert cache._chunks["w", 0, 0].dirty
@@ -0,0 +1,107 @@
+import struct
+import zlib
+
+import pytest
+
+from pystom.MinecraftType.chunk import Chunk
+from pystom.MinecraftType.heightmap import Heightmaps
+from pystom.MinecraftType.nbt import Compound, LongArray
+from pystom.Packet.Server import HEIGHTMAP_IDS, ServerChunkDataPacket
+from pystom.server.MinecraftServer import MinecraftServer
+from pystom.utils import ChunkTemplate
+from pystom.world.light import LightEngine
+
+
+def read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, offset
+
+
+def test_heightmaps_use_prefixed_type_and_long_array():
+    chunk = Chunk(0, 0, -64, 384)
+    chunk.fill(1, y0=-64, y1=-60)
+    heightmaps = Heightmaps(chunk)
+    data = ServerChunkDataPacket.from_chunk(chunk).to_bytes
+
+    assert struct.unpack_from(">ii", data) == (0, 0)
+    count, offset = read_varint(data, 8)
+    assert count == len(heightmaps.heights)
+    decoded = {}
+    for _ in range(count):
+        kind, offset = read_varint(data, offset)
+        length, offset = read_varint(data, offset)
+        decoded[kind] = struct.unpack_from(f">{length}q", data, offset)
+        offset += length * 8
+    expected = heightmaps.to_nbt()
+    assert decoded == {HEIGHTMAP_IDS[name]: tuple(tag.value) for name, tag in expected.value.items()}
+    # 9位的高度值, 每个long 7个, 256个值共37个long
+    assert all(len(longs) == 37 for longs in decoded.values())
+
+    # 之后紧接着区块数据
+    size, offset = read_varint(data, offset)
+    assert data[offset:offset + size] == chunk.to_bytes()
+
+
+def test_empty_heightmaps():
+    data = ServerChunkDataPacket(1, 2).to_bytes
+    assert data[8] == 0
+
+
+def test_unknown_heightmap_type():
+    packet = ServerChunkDataPacket(0, 0, heightmaps=Compound("", LongArray("UNKNOWN", [0])))
+    with pytest.raises(ValueError):
+        packet.to_bytes
+
+
+def read_frame(data: bytes, compressed: bool) -> tuple[int, bytes]:
+    """解析一个帧, 返回 (包ID, 包ID之后的内容); 与 MinecraftServer._frame 相同, 只有压缩的帧带有数据长度"""
+    length, offset = read_varint(data, 0)
+    assert offset + length == len(data)
+    if compressed:
+        size, offset = read_varint(data, offset)
+        body = zlib.decompress(data[offset:])
+        assert size == len(body)
+    else:
+        body = data[offset:]
+    packet_id, offset = read_varint(body, 0)
+    return packet_id, body[offset:]
+
+
+def test_template_frame_matches_server_frame():
+    server = MinecraftServer()
+    template = ChunkTemplate.layered([(1, 4), (9, 1)], min_y=-64, height=384)
+    chunk = Chunk(0, 0, -64, 384)
+    chunk.fill(1, y0=-64, y1=-60)
+    chunk.fill(9, y0=-60, y1=-59)
+    Heightmaps(chunk)
+    LightEngine(lambda chunk_x, chunk_z: None).light_chunk(chunk)
+
+    # 未压缩时包ID、数据包长度与数据包的总长度
+    size, _ = read_varint(server._frame(0x22, ServerChunkDataPacket.from_chunk(chunk)), 0)
+    for threshold in (-1, 0, 256, size - 1, size, size + 1):
+        server._threshold = threshold
+        for chunk_x, chunk_z in ((0, 0), (-7, 123456)):
+            chunk.chunk_x, chunk.chunk_z = chunk_x, chunk_z
+            expected = server._frame(0x22, ServerChunkDataPacket.from_chunk(chunk))
+            frame = template.frame(chunk_x, chunk_z, threshold)
+            compressed = 0 < threshold <= size
+            assert read_frame(frame, compressed) == read_frame(expected, compressed)
+            if not compressed:
+                # 不压缩时逐字节相同
+                assert frame == expected
+    # 服务器默认的虚空模板
+    server._threshold = -1
+    assert server.template.frame(3, 4) == server._frame(0x22, ServerChunkDataPacket.from_chunk(uniform(3, 4)))
+
+
+def uniform(chunk_x: int, chunk_z: int) -> Chunk:
+    chunk = Chunk(chunk_x, chunk_z, -64, 384)
+    Heightmaps(chunk)
+    LightEngine(lambda chunk_x, chunk_z: None).light_chunk(chunk)
+    return chunk
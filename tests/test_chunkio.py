@@ -0,0 +1,47 @@
+import pytest
+
+from pystom.MinecraftType import nbt
+from pystom.world.chunkio import ChunkIO
+
+
+class FailingPool:
+    """前fail次写入抛出OSError的区域文件池"""
+
+    def __init__(self, fail: int = 1):
+        self.fail = fail
+        self.written = {}
+
+    def read_chunk_payload(self, chunk_x, chunk_z):
+        return None
+
+    def write_chunk(self, chunk_x, chunk_z, data, **options):
+        if self.fail:
+            self.fail -= 1
+            raise OSError("disk full")
+        self.written[chunk_x, chunk_z] = data
+
+
+def test_failed_write_can_be_retried():
+    pool = FailingPool()
+    with ChunkIO(pool) as io:
+        data = nbt.Compound("", nbt.Int("x", 1))
+        first = io.save(0, 0, data)
+        with pytest.raises(OSError):
+            first.result()
+        # 写入失败后数据仍在内存中, 读取得到的是待写入的数据
+        assert io.load(0, 0).result() is data
+
+        newer = nbt.Compound("", nbt.Int("x", 2))
+        second = io.save(0, 0, newer)
+        assert second is not first
+        assert second.result() is None
+    assert pool.written == {(0, 0): newer}
+
+
+def test_saves_are_coalesced():
+    pool = FailingPool(fail=0)
+    with ChunkIO(pool) as io:
+        futures = [io.save(1, 1, nbt.Compound("", nbt.Int("x", i))) for i in range(5)]
+        for future in futures:
+            future.result()
+    assert pool.written[1, 1].value["x"].value == 4
@@ -0,0 +1,124 @@
+import random
+
+from pystom.MinecraftType.chunk import AIR, Chunk, air_states
+from pystom.MinecraftType.heightmap import Heightmaps
+from pystom.world.blockupdate import BlockUpdateBatcher
+from pystom.world.edit import Box, Schematic, WorldEditor
+
+STATES = (AIR, AIR, 1, 2, 9, 10)
+COORDS = [(chunk_x, chunk_z) for chunk_x in (0, 1) for chunk_z in (0, 1)]
+# 跨越区块X/Z边界与 y = 0, 16 两个区块段边界
+BOX = Box(10, -5, 12, 21, 20, 19)
+
+
+class World:
+    """四个 -16..32 高的区块, 方块随机, 挂有高度图; updates收集方块变化 (不发送)"""
+
+    def __init__(self, seed: int = 1):
+        rng = random.Random(seed)
+        self.chunks = {}
+        for chunk_x, chunk_z in COORDS:
+            chunk = self.chunks[chunk_x, chunk_z] = Chunk(chunk_x, chunk_z, -16, 48)
+            for section in chunk.sections:
+                section.blocks.load([rng.choice(STATES) for _ in range(4096)])
+                section.block_count = section.blocks.count(air_states())
+            Heightmaps(chunk)
+        self.updates = BlockUpdateBatcher(None)
+        self.editor = WorldEditor(lambda chunk_x, chunk_z: self.chunks.get((chunk_x, chunk_z)),
+                                  updates=self.updates)
+
+    def get_block(self, x, y, z):
+        chunk = self.chunks.get((x >> 4, z >> 4))
+        return AIR if chunk is None else chunk.get_block(x, y, z)
+
+    def set_block(self, x, y, z, state) -> bool:
+        """逐个方块修改的参照实现"""
+        if self.chunks[x >> 4, z >> 4].set_block(x, y, z, state) == state:
+            return False
+        self.updates.record(x, y, z, state)
+        return True
+
+
+def positions(box):
+    for y in range(box.y0, box.y1):
+        for z in range(box.z0, box.z1):
+            for x in range(box.x0, box.x1):
+                if (x >> 4, z >> 4) in COORDS:
+                    yield x, y, z
+
+
+def assert_same(edited, reference):
+    for key, chunk in edited.chunks.items():
+        other = reference.chunks[key]
+        # 调色板的顺序可能不同, 比较方块本身
+        assert [list(s.blocks.values()) for s in chunk.sections] == [list(s.blocks.values()) for s in other.sections]
+        assert [s.block_count for s in chunk.sections] == [s.block_count for s in other.sections]
+        assert [s.block_count for s in chunk.sections] == [s.blocks.count(air_states()) for s in chunk.sections]
+        assert ({name: bytes(values) for name, values in chunk.heightmaps.heights.items()}
+                == {name: bytes(values) for name, values in other.heightmaps.heights.items()})
+    assert edited.updates._sections == reference.updates._sections
+
+
+def test_fill_matches_per_block_edits():
+    edited, reference = World(), World()
+    changed = edited.editor.fill(BOX, 1)
+    assert changed == sum(reference.set_block(x, y, z, 1) for x, y, z in positions(BOX))
+    assert changed > 0
+    assert_same(edited, reference)
+    # 再次填充没有变化
+    assert edited.editor.fill(BOX, 1) == 0
+
+    # 清空到世界顶部, 高度图随之降低
+    top = Box(0, 0, 0, 32, 32, 32)
+    assert edited.editor.fill(top, AIR) == sum(reference.set_block(x, y, z, AIR) for x, y, z in positions(top))
+    assert_same(edited, reference)
+
+
+def test_replace_matches_per_block_edits():
+    edited, reference = World(), World()
+    changed = edited.editor.replace(BOX, 2, 10)
+    expected = sum(reference.set_block(x, y, z, 10) for x, y, z in positions(BOX)
+                   if reference.get_block(x, y, z) == 2)
+    assert changed == expected > 0
+    assert_same(edited, reference)
+
+
+def test_copy_matches_get_block():
+    world = World()
+    # 包括未载入的区块 (x < 0) 与世界范围之外的高度
+    box = Box(-3, -20, 5, 18, 35, 20)
+    schematic = world.editor.copy(box)
+    assert (schematic.width, schematic.height, schematic.length) == (21, 55, 15)
+    for y in range(box.y0, box.y1):
+        for z in range(box.z0, box.z1):
+            for x in range(box.x0, box.x1):
+                expected = world.get_block(x, y, z) if -16 <= y < 32 else AIR
+                assert schematic.get(x - box.x0, y - box.y0, z - box.z0) == expected
+
+
+def test_paste_matches_per_block_edits():
+    source = World(seed=2).editor.copy(Box(0, 0, 0, 11, 25, 7))
+    for skip_air in (False, True):
+        edited, reference = World(), World()
+        origin = (BOX.x0, BOX.y0, BOX.z0)
+        changed = edited.editor.paste(source, origin, skip_air=skip_air)
+        expected = 0
+        for y in range(source.height):
+            for z in range(source.length):
+                for x in range(source.width):
+                    state = source.get(x, y, z)
+                    if not (skip_air and state == AIR):
+                        expected += reference.set_block(origin[0] + x, origin[1] + y, origin[2] + z, state)
+        assert changed == expected > 0
+        assert_same(edited, reference)
+
+
+def test_schematic_round_trip():
+    world = World()
+    schematic = world.editor.copy(BOX)
+    empty = Schematic(schematic.width, schematic.height, schematic.length)
+    world.editor.paste(empty, (BOX.x0, BOX.y0, BOX.z0))
+    assert all(world.get_block(x, y, z) == AIR for x, y, z in positions(BOX))
+    world.editor.paste(schematic, (BOX.x0, BOX.y0, BOX.z0))
+    assert all(world.get_block(x, y, z) == schematic.get(x - BOX.x0, y - BOX.y0, z - BOX.z0)
+               for x, y, z in positions(BOX))
@@ -0,0 +1,72 @@
+import pytest
+
+from pystom.MinecraftType.block import registry
+from pystom.MinecraftType.chunk import Chunk, air_states
+from pystom.MinecraftType.heightmap import column_heights
+from pystom.world import generator as generator_module
+from pystom.world.generator import FlatGenerator, NoiseGenerator, VoidGenerator, WorldGenerator, fill_columns
+
+COORDS = [(0, 0), (1, -1), (-3, 2), (7, 5)]
+
+
+def sections(chunk: Chunk):
+    return [(list(section.blocks.values()), list(section.biomes.values()), section.block_count)
+            for section in chunk.sections]
+
+
+def test_process_pool_chunks_match_in_process_generation():
+    noise = NoiseGenerator(seed=5, min_y=-16, height=128, amplitude=30)
+    expected = {coord: sections(noise.generate(*coord)) for coord in COORDS}
+    with WorldGenerator(noise, workers=2, batch_size=3) as world:
+        chunks = {(chunk.chunk_x, chunk.chunk_z): chunk for chunk in world.generate(COORDS)}
+        assert {coord: sections(chunk) for coord, chunk in chunks.items()} == expected
+        assert all((chunk.min_y, chunk.height) == (-16, 128) for chunk in chunks.values())
+
+        # 在工作进程中编码时返回编码结果本身
+        encoded = {(x, z): data for x, z, data in world.generate(COORDS, encode=Chunk.to_bytes)}
+        assert encoded == {coord: noise.generate(*coord).to_bytes() for coord in COORDS}
+
+        chunk = world.submit(3, 4).result(timeout=60)
+        assert sections(chunk) == sections(noise.generate(3, 4))
+
+
+def test_noise_surface_layers():
+    noise = NoiseGenerator(seed=1, min_y=0, height=128)
+    chunk = noise.generate(2, 3)
+    heights = list(noise.heights(2, 3))
+    blocks = registry()
+    stone, dirt, grass = (blocks.default_state(f"minecraft:{name}") for name in ("stone", "dirt", "grass_block"))
+    assert list(column_heights(chunk, air_states())) == heights
+    for column in (0, 17, 255):
+        x, z, top = column & 15, column >> 4, heights[column]
+        assert chunk.get_block(x, top - 1, z) == grass
+        assert chunk.get_block(x, top - 2, z) == dirt
+        assert chunk.get_block(x, top - 5, z) == stone
+        assert chunk.get_block(x, top, z) == 0
+
+
+def test_noise_heights_match_without_numpy(monkeypatch):
+    pytest.importorskip("numpy")
+    noise = NoiseGenerator(seed=9, min_y=-64, height=384)
+    vectorized = [int(height) for height in noise.heights(-5, 11)]
+    monkeypatch.setattr(generator_module, "numpy", None)
+    assert noise.heights(-5, 11) == vectorized
+
+
+def test_flat_and_void_generators():
+    flat = FlatGenerator([(1, 3), (10, 2)], min_y=-16, height=32).generate(0, 0)
+    assert [flat.get_block(5, y, 5) for y in range(-16, -10)] == [1, 1, 1, 10, 10, 0]
+    assert flat.sections[0].block_count == 5 * 256
+    void = VoidGenerator(min_y=0, height=32).generate(4, 4)
+    assert all(section.block_count == 0 for section in void.sections)
+
+
+def test_fill_columns_matches_per_block():
+    chunk, reference = Chunk(0, 0, 0, 64), Chunk(0, 0, 0, 64)
+    bottom = [column % 7 for column in range(256)]
+    top = [(column * 13) % 50 for column in range(256)]
+    fill_columns(chunk, bottom, top, 2)
+    for column in range(256):
+        for y in range(bottom[column], top[column]):
+            reference.set_block(column & 15, y, column >> 4, 2)
+    assert sections(chunk) == sections(reference)
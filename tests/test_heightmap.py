@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from pystom.MinecraftType import heightmap
+from pystom.MinecraftType.block import registry
+from pystom.MinecraftType.chunk import AIR, Chunk
+from pystom.MinecraftType.heightmap import Heightmaps, column_heights
+
+
+@pytest.fixture(params=["numpy", "python"])
+def path(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(heightmap, "numpy", None)
+    return request.param
+
+
+def fresh(chunk: Chunk) -> dict[str, list[int]]:
+    return {name: list(column_heights(chunk, transparent)) for name, transparent in chunk.heightmaps.types.items()}
+
+
+def current(chunk: Chunk) -> dict[str, list[int]]:
+    return {name: list(heights) for name, heights in chunk.heightmaps.heights.items()}
+
+
+def test_update_matches_compute_when_placing_and_removing_the_top_block(path):
+    torch = registry().parse("minecraft:torch")
+    chunk = Chunk(0, 0, -64, 384)
+    chunk.fill(1, y0=-64, y1=-40)
+    Heightmaps(chunk)
+    assert current(chunk) == fresh(chunk)
+    assert chunk.heightmaps.get("WORLD_SURFACE", 3, 4) == 24
+
+    # 在地面之上放置再移除: 中间隔着全是空气的区块段
+    chunk.set_block(3, 100, 4, 1)
+    assert chunk.heightmaps.get("WORLD_SURFACE", 3, 4) == 165
+    assert current(chunk) == fresh(chunk)
+    chunk.set_block(3, 100, 4, AIR)
+    assert chunk.heightmaps.get("WORLD_SURFACE", 3, 4) == 24
+    assert current(chunk) == fresh(chunk)
+
+    # 不阻挡移动的方块只计入WORLD_SURFACE
+    chunk.set_block(5, -40, 5, torch)
+    assert chunk.heightmaps.get("WORLD_SURFACE", 5, 5) == 25
+    assert chunk.heightmaps.get("MOTION_BLOCKING", 5, 5) == 24
+    assert current(chunk) == fresh(chunk)
+    chunk.set_block(5, -41, 5, AIR)
+    assert current(chunk) == fresh(chunk)
+    chunk.set_block(5, -40, 5, AIR)
+    assert chunk.heightmaps.get("WORLD_SURFACE", 5, 5) == 23
+    assert current(chunk) == fresh(chunk)
+
+    # 移除整列
+    for y in range(-64, -40):
+        chunk.set_block(0, y, 0, AIR)
+        assert current(chunk) == fresh(chunk)
+    assert chunk.heightmaps.get("WORLD_SURFACE", 0, 0) == 0
+
+
+def test_random_edits_match_compute(path):
+    torch, glass = registry().parse("minecraft:torch"), registry().parse("minecraft:glass")
+    rng = random.Random(3)
+    chunk = Chunk(1, 2, -64, 384)
+    for x, z in ((1, 1), (2, 7), (15, 15)):
+        for y in range(-64, 0, 3):
+            chunk.set_block(x, y, z, rng.choice((1, torch, glass)))
+    Heightmaps(chunk)
+    for _ in range(200):
+        x, z = rng.choice(((1, 1), (2, 7), (15, 15)))
+        top = chunk.heightmaps.get("WORLD_SURFACE", x, z) + chunk.min_y
+        # 多数操作放置或移除最高的方块
+        y = rng.choice((top, top - 1, top - 1, rng.randrange(-64, 32)))
+        chunk.set_block(x, max(y, -64), z, rng.choice((AIR, AIR, 1, torch, glass)))
+        assert current(chunk) == fresh(chunk)
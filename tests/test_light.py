@@ -0,0 +1,170 @@
+import struct
+
+from pystom.MinecraftType.block import registry
+from pystom.MinecraftType.chunk import Chunk
+from pystom.Packet.Server import ServerChunkDataPacket, ServerUpdateLightPacket, encode_varint
+from pystom.world.light import BLOCK, EMPTY, FULL, SKY, LightEngine
+
+STONE = 1
+
+
+def states():
+    blocks = registry()
+    return blocks.parse("minecraft:glowstone"), blocks.parse("minecraft:glass")
+
+
+class World:
+    """若干个0..32高的区块, y < 4 为石头"""
+
+    def __init__(self, *coords):
+        self.chunks = {}
+        for chunk_x, chunk_z in coords:
+            chunk = self.chunks[chunk_x, chunk_z] = Chunk(chunk_x, chunk_z, 0, 32)
+            chunk.fill(STONE, y0=0, y1=4)
+        self.engine = LightEngine(lambda chunk_x, chunk_z: self.chunks.get((chunk_x, chunk_z)))
+
+    def light(self):
+        for chunk in self.chunks.values():
+            self.engine.light_chunk(chunk)
+
+    def set_block(self, x, y, z, state):
+        old = self.chunks[x >> 4, z >> 4].set_block(x, y, z, state)
+        self.engine.block_changed(x, y, z, old, state)
+
+    def get(self, kind, x, y, z):
+        return self.engine._get(kind, x, y, z)
+
+
+def snapshot(world):
+    """各区块的光照等级, 增量更新后全为0的段可能是全0的数组而不是EMPTY"""
+    return {key: ([bytes(2048) if data is EMPTY else bytes(data) for data in chunk.light.sky],
+                  [bytes(2048) if data is EMPTY else bytes(data) for data in chunk.light.block])
+            for key, chunk in world.chunks.items()}
+
+
+def relit(world):
+    """对相同的方块重新做初始光照"""
+    fresh = World()
+    fresh.chunks = {key: Chunk.from_bytes(chunk.chunk_x, chunk.chunk_z, chunk.to_bytes(), 0, 32)
+                    for key, chunk in world.chunks.items()}
+    fresh.light()
+    return snapshot(fresh)
+
+
+def test_sky_light_under_an_overhang():
+    world = World((0, 0))
+    world.chunks[0, 0].fill(STONE, x0=0, y0=10, x1=8, y1=11)
+    world.light()
+    for x in range(16):
+        assert world.get(SKY, x, 20, 8) == 15
+        assert world.get(SKY, x, 3, 8) == 0
+        for y in range(4, 10):
+            # 从露天的 x = 8 横向衰减
+            assert world.get(SKY, x, y, 8) == (15 if x >= 8 else 15 - (8 - x))
+
+    world.set_block(2, 10, 8, 0)
+    changed = world.engine.tick()
+    assert all(world.get(SKY, 2, y, 8) == 15 for y in range(4, 11))
+    assert world.get(SKY, 2, 5, 9) == 14
+    assert (0, 0, 1) in changed
+    assert snapshot(world) == relit(world)
+
+    world.set_block(2, 10, 8, STONE)
+    world.engine.tick()
+    assert world.get(SKY, 2, 5, 8) == 9
+    assert snapshot(world) == relit(world)
+
+
+def test_placing_and_removing_an_emitter():
+    glowstone, _ = states()
+    world = World((0, 0))
+    world.light()
+    assert world.get(BLOCK, 8, 8, 8) == 0
+
+    world.set_block(8, 8, 8, glowstone)
+    changed = world.engine.tick()
+    assert world.get(BLOCK, 8, 8, 8) == 15
+    for distance in range(1, 8):
+        assert world.get(BLOCK, 8 + distance, 8, 8) == 15 - distance
+        assert world.get(BLOCK, 8, 8 + distance, 8) == 15 - distance
+    assert world.get(BLOCK, 10, 10, 9) == 10
+    # 石头挡住光照
+    assert world.get(BLOCK, 8, 3, 8) == 0
+    assert {(0, 0, 1), (0, 0, 2)} <= changed
+    assert snapshot(world) == relit(world)
+
+    world.set_block(8, 8, 8, 0)
+    world.engine.tick()
+    assert not any(world.get(BLOCK, x, y, 8) for x in range(16) for y in range(32))
+    assert snapshot(world) == relit(world)
+
+
+def test_light_propagates_across_chunk_borders():
+    glowstone, _ = states()
+    world = World((0, 0), (1, 0))
+    world.chunks[0, 0].set_block(15, 8, 8, glowstone)
+    # 初始光照时, 后计算的区块与已有光照的相邻区块互相传播
+    world.light()
+    for distance in range(1, 10):
+        assert world.get(BLOCK, 15 + distance, 8, 8) == 15 - distance
+    assert snapshot(world) == relit(world)
+
+    world.set_block(15, 8, 8, 0)
+    world.set_block(16, 20, 3, glowstone)
+    changed = world.engine.tick()
+    assert world.get(BLOCK, 16, 8, 8) == 0
+    assert world.get(BLOCK, 15, 20, 3) == 14
+    assert world.get(BLOCK, 10, 20, 3) == 9
+    assert {(0, 0, 1), (0, 0, 2), (1, 0, 2)} <= changed
+    assert snapshot(world) == relit(world)
+
+    # 盖住区块1的露天处, 天空光照从区块0横向照进来
+    world.chunks[1, 0].fill(STONE, y0=10, y1=11)
+    for z in range(16):
+        for x in range(16, 32):
+            world.engine.block_changed(x, 10, z, 0, STONE)
+    world.engine.tick()
+    assert world.get(SKY, 16, 5, 8) == 14
+    assert world.get(SKY, 20, 5, 8) == 10
+    assert snapshot(world) == relit(world)
+
+
+def test_packet_fields_masks_and_array_layout():
+    glowstone, _ = states()
+    world = World((0, 0))
+    world.chunks[0, 0].set_block(3, 5, 7, glowstone)
+    world.light()
+    light = world.chunks[0, 0].light
+    # 世界之下、两个区块段、世界之上
+    assert len(light.sky) == len(light.block) == 4
+    assert light.sky[3] is FULL
+
+    fields = light.packet_fields()
+    sky_mask = sum(1 << index for index, data in enumerate(light.sky) if data is not EMPTY)
+    block_mask = sum(1 << index for index, data in enumerate(light.block) if data is not EMPTY)
+    assert fields["sky_light_mask"] == [sky_mask] and fields["empty_sky_light_mask"] == [0b1111 ^ sky_mask]
+    assert fields["block_light_mask"] == [block_mask] and fields["empty_block_light_mask"] == [0b1111 ^ block_mask]
+    # 光照在 y = 16 处还剩4级
+    assert block_mask == 0b0110
+    assert fields["light_arrays"] == [bytes(data) for data in light.sky if data is not EMPTY]
+    assert all(len(data) == 2048 for data in fields["light_arrays"] + fields["block_light_arrays"])
+
+    # 索引为 (y * 16 + z) * 16 + x, 偶数索引在低4位
+    array = fields["block_light_arrays"][0]
+    index = (5 << 8) | (7 << 4) | 3
+    assert array[index >> 1] >> 4 == 15
+    assert array[(index - 1) >> 1] & 15 == 14
+
+    # 区块数据包与光照更新包的光照部分编码相同
+    update = ServerUpdateLightPacket(0, 0, **fields).to_bytes
+    tail = update[len(encode_varint(0)) * 2:]
+    assert ServerChunkDataPacket.from_chunk(world.chunks[0, 0]).to_bytes.endswith(tail)
+    assert tail[:1 + 8] == encode_varint(1) + struct.pack(">q", sky_mask)
+
+    # 只包含改变过的段
+    world.set_block(3, 20, 7, glowstone)
+    changed = world.engine.tick()
+    partial = light.packet_fields(section for chunk_x, chunk_z, section in changed)
+    assert {section for _, _, section in changed} == {1, 2}
+    assert partial["block_light_mask"] == [0b0110] and partial["empty_block_light_mask"] == []
+    assert partial["block_light_arrays"] == [bytes(light.block[1]), bytes(light.block[2])]
@@ -0,0 +1,290 @@
+import gzip
+import os
+import zlib
+
+import pytest
+
+from pystom.MinecraftType import nbt
+
+
+def roundtrip(tag: nbt.NBTObject, **options) -> nbt.NBTObject:
+    return nbt.deserialize(nbt.serialize(tag, compress=False), compress=False, **options)
+
+
+def sample() -> nbt.Compound:
+    return nbt.Compound("", nbt.Int("xPos", 3), nbt.String("Status", "minecraft:full"),
+                        nbt.Compound("sub", nbt.List("palette", [nbt.String("", "minecraft:air")]),
+                                     nbt.LongArray("data", [1, 2, 3]),
+                                     nbt.Compound("deep", nbt.Byte("flag", 1))),
+                        nbt.List("Pos", [nbt.Double("", 1.0), nbt.Double("", 2.0)]))
+
+
+def test_lazy_compound_decodes_children_on_first_access():
+    raw = bytes(nbt.serialize(sample(), compress=False))
+    lazy = nbt.deserialize(raw, compress=False, lazy=True)
+    assert type(lazy) is nbt.LazyCompound
+    assert all(type(tag) is tuple for tag in lazy._value.values())
+    assert bytes(nbt.serialize(lazy, compress=False)) == raw
+
+    sub = lazy["sub"]
+    assert type(sub) is nbt.LazyCompound
+    assert type(lazy._value["sub"]) is nbt.LazyCompound
+    assert type(lazy._value["xPos"]) is tuple and type(sub._value["data"]) is tuple
+    # 嵌套的LazyCompound与根共享同一块原始数据
+    assert sub._view.obj is lazy._view.obj
+    assert list(sub["data"].value) == [1, 2, 3]
+    assert sub["deep"]["flag"].value == 1
+    assert bytes(nbt.serialize(lazy, compress=False)) == raw
+
+    # value 解码全部子标签
+    assert set(lazy.value) == {"xPos", "Status", "sub", "Pos"}
+    assert not any(type(tag) is tuple for tag in lazy._value.values())
+    assert bytes(nbt.serialize(lazy, compress=False)) == raw
+
+
+def test_lazy_compound_modifications_round_trip():
+    raw = bytes(nbt.serialize(sample(), compress=False))
+    lazy = nbt.deserialize(raw, compress=False, lazy=True)
+    lazy["sub"]["deep"].value = (nbt.Int("extra", 7),)
+    lazy["sub"].pop_tag("palette")
+    lazy.value = (nbt.String("Status", "minecraft:empty"),)
+    # 未访问的兄弟节点仍是字节区间
+    assert type(lazy._value["Pos"]) is tuple and type(lazy["sub"]._value["data"]) is tuple
+
+    expected = sample()
+    expected["sub"]["deep"].value = (nbt.Int("extra", 7),)
+    expected["sub"].pop_tag("palette")
+    expected.value = (nbt.String("Status", "minecraft:empty"),)
+    data = bytes(nbt.serialize(lazy, compress=False))
+    assert data == bytes(nbt.serialize(expected, compress=False))
+    assert bytes(nbt.serialize(roundtrip(lazy), compress=False)) == data
+    assert bytes(nbt.serialize(roundtrip(lazy, lazy=True), compress=False)) == data
+
+    combined = lazy + nbt.Int("yPos", -4)
+    assert combined["yPos"].value == -4 and [tag.value for tag in combined["Pos"].value] == [1.0, 2.0]
+    assert "yPos" not in lazy
+
+
+def test_arrays_decoded_from_mutable_buffers_do_not_alias_them():
+    raw = bytes(nbt.serialize(nbt.Compound("", nbt.IntArray("ia", [1, 2, 3]), nbt.LongArray("la", [4, 5])),
+                              compress=False))
+    buffer = bytearray(raw)
+    first = nbt.deserialize(buffer, compress=False)
+    second = nbt.deserialize(buffer, compress=False)
+    first["ia"].value[0] = 10
+    assert bytes(buffer) == raw
+    assert list(second["ia"].value) == [1, 2, 3]
+    buffer[-9] ^= 0xFF  # 修改缓冲区不影响已解码的标签
+    assert list(first["la"].value) == [4, 5]
+
+    # 从不可变的bytes解码时有NumPy则零拷贝, 视图只读
+    tag = nbt.deserialize(raw, compress=False)["ia"]
+    if nbt.numpy is not None:
+        with pytest.raises(ValueError):
+            tag.value[0] = 10
+    assert list(tag.value) == [1, 2, 3]
+
+
+def test_numeric_list_decodes_to_typed_list():
+    tag = roundtrip(nbt.Compound("", nbt.List("Pos", [nbt.Double("", 1.5), nbt.Double("", 2.0), nbt.Double("", -3.0)])))
+    pos = tag["Pos"]
+    assert isinstance(pos, nbt.TypedList)
+    assert pos.array.typecode == "d"
+    assert list(pos) == [1.5, 2.0, -3.0]
+
+
+def test_typed_list_value_is_compatible_with_list():
+    pos = roundtrip(nbt.Compound("", nbt.List("Pos", [nbt.Double("", 1.5), nbt.Double("", 2.0)])))["Pos"]
+    assert [item.value for item in pos.value] == [1.5, 2.0]
+    assert isinstance(pos.value[0], nbt.Double)
+    with pytest.raises(TypeError):
+        pos.value[0].value = 7.0
+    pos.append(4.0)
+    assert pos.value[2].value == 4.0
+
+
+def test_typed_list_roundtrip_bytes():
+    tag = nbt.Compound("", nbt.TypedList("Motion", nbt.Float, [0.5, nbt.Float("", 1.0)]),
+                       nbt.List("names", [nbt.String("", "a")]))
+    raw = nbt.serialize(tag, compress=False)
+    assert nbt.serialize(roundtrip(tag), compress=False) == raw
+
+
+def test_typed_list_rejects_mismatched_elements():
+    motion = nbt.TypedList("Motion", nbt.Double)
+    with pytest.raises(TypeError):
+        motion.append(nbt.Int("", 1))
+    with pytest.raises(ValueError):
+        nbt.TypedList("b", nbt.Byte).append(300)
+
+
+def test_list_subclass_deserialize_returns_subclass():
+    class Tagged(nbt.List):
+        pass
+
+    raw = nbt.serialize(nbt.List("names", [nbt.String("", "a")]), compress=False)
+    assert type(Tagged.deserialize(raw)) is Tagged
+
+
+def test_only_roots_memoized_and_large_nodes_cache_bytes():
+    leaf = nbt.Int("a", 1)
+    shared = nbt.Compound("shared", nbt.String("id", "x")).memoize()
+    inner = nbt.Compound("inner", leaf)
+    root = nbt.Compound("", inner, shared)
+    first = root.serialize()
+    assert root.serialize() is first
+    assert not inner.cached and not leaf.cached and shared.cached
+    assert not (root.dirty or inner.dirty or leaf.dirty or shared.dirty)
+
+    leaf.value = 2
+    assert leaf.dirty and inner.dirty and root.dirty and not shared.dirty
+    assert shared.cached
+    assert root.serialize() == nbt.Compound("", nbt.Compound("inner", nbt.Int("a", 2)),
+                                            nbt.Compound("shared", nbt.String("id", "x"))).serialize()
+
+
+def test_large_sibling_keeps_its_cache_when_a_leaf_changes():
+    big = nbt.Compound("big", nbt.ByteArray("data", bytes(nbt.MEMOIZE_THRESHOLD)))
+    small = nbt.Compound("small", nbt.Int("a", 1))
+    root = nbt.Compound("", big, small)
+    before = root.serialize()
+    assert big.cached and not small.cached
+    cached = big.serialize()
+
+    small["a"].value = 2
+    assert small.dirty and root.dirty and not big.dirty
+    after = root.serialize()
+    assert big.serialize() is cached
+    assert after == nbt.Compound("", nbt.Compound("big", nbt.ByteArray("data", bytes(nbt.MEMOIZE_THRESHOLD))),
+                                 nbt.Compound("small", nbt.Int("a", 2))).serialize()
+    assert after != before and not root.dirty
+
+    big["data"].mark_dirty()
+    assert not big.cached and big.dirty and root.dirty
+
+
+def test_container_value_is_read_only():
+    root = nbt.Compound("", nbt.Int("a", 1), nbt.List("l", [nbt.Int("", 1)]))
+    before = root.serialize()
+    with pytest.raises(TypeError):
+        root.value["b"] = nbt.Int("b", 2)
+    with pytest.raises(AttributeError):
+        root["l"].value.append(nbt.Int("", 2))
+    assert root.serialize() is before
+
+    root["l"].append(nbt.Int("", 2))
+    root.put(nbt.Int("b", 2))
+    assert nbt.deserialize(nbt.serialize(root, compress=False), compress=False)["b"].value == 2
+    assert len(root["l"].value) == 2
+
+
+def test_registry_packet_bytes_are_cached_until_modified():
+    from pystom.Packet.Server import ServerConfigurationRegistryDataPack
+
+    registry = nbt.Compound("", nbt.Compound("minecraft:test", nbt.String("type", "a")))
+    packet = ServerConfigurationRegistryDataPack(registry)
+    first = packet.to_bytes
+    assert ServerConfigurationRegistryDataPack(registry).to_bytes is first
+    assert nbt.deserialize(first)["minecraft:test"]["type"].value == "a"
+
+    registry["minecraft:test"]["type"].value = "b"
+    second = packet.to_bytes
+    assert second is not first
+    assert nbt.deserialize(second)["minecraft:test"]["type"].value == "b"
+
+
+def palette_entry(name: str) -> nbt.Compound:
+    return nbt.Compound("", nbt.String("Name", name), nbt.Compound("Properties", nbt.String("axis", "y")))
+
+
+def test_pooled_nodes_are_shared_without_parent():
+    pool = nbt.SubtreePool()
+    first = nbt.Compound("", nbt.List("palette", [palette_entry("minecraft:log")]))
+    second = nbt.Compound("", nbt.List("palette", [palette_entry("minecraft:log")]))
+    pool.share(first)
+    pool.share(second)
+    shared = first["palette"].value[0]
+    assert second["palette"].value[0] is shared
+    assert shared.frozen and shared._parent is None
+
+    other = nbt.List("palette", [])
+    other.append(shared)
+    assert shared._parent is None
+    # 修改其中一个容器不影响另一个容器的缓存
+    before = second.serialize()
+    first["palette"].append(palette_entry("minecraft:stone"))
+    assert second.serialize() is before
+
+
+def test_frozen_nodes_cannot_be_modified():
+    entry = palette_entry("minecraft:log").freeze()
+    with pytest.raises(TypeError):
+        entry["Name"].value = "minecraft:stone"
+    with pytest.raises(TypeError):
+        entry.value["Name"] = nbt.String("Name", "minecraft:stone")
+    with pytest.raises(TypeError):
+        entry.put(nbt.Int("x", 1))
+
+    motion = nbt.TypedList("Motion", nbt.Double, [1.0]).freeze()
+    with pytest.raises(TypeError):
+        motion.array[0] = 2.0
+    heights = nbt.LongArray("h", [1, 2]).freeze()
+    with pytest.raises((TypeError, ValueError)):
+        heights.value[0] = 3
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zlib", None])
+def test_save_and_load_detect_the_format(tmp_path, compression):
+    path = tmp_path / "level.dat"
+    nbt.save(path, sample(), compression=compression)
+    data = path.read_bytes()
+    raw = bytes(nbt.serialize(sample(), compress=False))
+    if compression == "gzip":
+        assert data[:2] == b"\x1f\x8b" and gzip.decompress(data) == raw
+    elif compression == "zlib":
+        assert zlib.decompress(data) == raw
+    else:
+        assert data == raw
+    assert bytes(nbt.serialize(nbt.load(path), compress=False)) == raw
+    with open(path, "rb") as file:
+        lazy = nbt.load(file, lazy=True)
+    assert type(lazy) is nbt.LazyCompound and lazy["sub"]["deep"]["flag"].value == 1
+    assert os.listdir(tmp_path) == ["level.dat"]
+
+
+def test_load_concatenated_gzip_members_and_truncated_data(tmp_path):
+    raw = bytes(nbt.serialize(sample(), compress=False))
+    path = tmp_path / "members.dat"
+    path.write_bytes(gzip.compress(raw[:10]) + gzip.compress(raw[10:]))
+    assert bytes(nbt.serialize(nbt.load(path), compress=False)) == raw
+    path.write_bytes(zlib.compress(raw)[:-8])
+    with pytest.raises(ValueError):
+        nbt.load(path)
+
+
+def test_save_leaves_no_temporary_file_on_failure(tmp_path, monkeypatch):
+    path = tmp_path / "level.dat"
+    nbt.save(path, sample())
+    before = path.read_bytes()
+    with pytest.raises(ValueError):
+        nbt.save(path, sample(), compression="lzma")
+
+    closed = []
+    real_close = os.close
+
+    def close(fd):
+        closed.append(fd)
+        real_close(fd)
+
+    def fdopen(fd, mode):
+        raise OSError("fdopen failed")
+
+    monkeypatch.setattr(os, "close", close)
+    monkeypatch.setattr(os, "fdopen", fdopen)
+    with pytest.raises(OSError):
+        nbt.save(path, nbt.Compound("", nbt.Int("a", 1)))
+    monkeypatch.undo()
+    assert len(closed) == 1
+    with pytest.raises(OSError):
+        os.fstat(closed[0])
+    assert os.listdir(tmp_path) == ["level.dat"] and path.read_bytes() == before
@@ -0,0 +1,88 @@
+import os
+import zlib
+
+from pystom.MinecraftType import nbt
+from pystom.MinecraftType.block import registry
+from pystom.MinecraftType.heightmap import Heightmaps, pack_heightmap
+from pystom.MinecraftType.region import Region
+from pystom.world.generator import FlatGenerator
+from pystom.world.pregen import DATA_VERSION, biome_names, encode_anvil, pregenerate, to_anvil
+
+
+def flat():
+    return FlatGenerator(min_y=-16, height=80)
+
+
+def area(center_x, center_z, radius):
+    return {(x, z) for x in range(center_x - radius, center_x + radius + 1)
+            for z in range(center_z - radius, center_z + radius + 1)}
+
+
+def read_all(directory):
+    """{(区块X, 区块Z): (时间戳, 解压后的NBT)}"""
+    chunks = {}
+    for name in os.listdir(directory):
+        _, region_x, region_z, _ = name.split(".")
+        with Region.open(os.path.join(directory, name)) as region:
+            for x, z in region.present_chunks():
+                key = (int(region_x) << 5 | x, int(region_z) << 5 | z)
+                chunks[key] = (region.raw_timestamps[z << 5 | x], region.read_chunk(x, z))
+    return chunks
+
+
+def test_to_anvil_layout():
+    generator = flat()
+    chunk = generator.generate(3, -2)
+    tag = to_anvil(chunk)
+    assert tag["DataVersion"].value == DATA_VERSION
+    assert (tag["xPos"].value, tag["yPos"].value, tag["zPos"].value) == (3, -1, -2)
+    sections = tag["sections"].value
+    assert [section["Y"].value for section in sections] == list(range(-1, 4))
+
+    blocks = registry()
+    # 最下面的段全是石头: 只有调色板, 没有数据
+    bottom = sections[0]["block_states"]
+    assert [entry["Name"].value for entry in bottom["palette"].value] == ["minecraft:stone"]
+    assert "data" not in bottom.value
+    # 石头、泥土与草方块 (带方块属性) 的分界所在的段
+    top = sections[3]["block_states"]
+    assert {entry["Name"].value for entry in top["palette"].value} == \
+           {"minecraft:stone", "minecraft:dirt", "minecraft:grass_block"}
+    grass = next(entry for entry in top["palette"].value if entry["Name"].value == "minecraft:grass_block")
+    default = blocks.default_state("minecraft:grass_block")
+    assert {key: value.value for key, value in grass["Properties"].value.items()} == blocks.properties(default)
+    assert len(top["data"].value) == 4096 * 4 // 64
+    assert sections[0]["biomes"]["palette"].value[0].value == biome_names()[0]
+
+    heightmaps = Heightmaps(generator.generate(3, -2))
+    assert {name: list(value.value) for name, value in tag["Heightmaps"].value.items()} == \
+           {name: list(pack_heightmap(heights, 80)) for name, heights in heightmaps.heights.items()}
+    assert zlib.decompress(encode_anvil(chunk)) == bytes(nbt.serialize(tag, compress=False))
+
+
+def test_pregenerate_round_trip_and_resume(tmp_path):
+    directory = str(tmp_path)
+    generator = flat()
+    # 跨越区域 0 与 1 的边界
+    assert pregenerate(directory, generator, 1, 31, 5, workers=2, interval=1e9) == 9
+    assert sorted(os.listdir(directory)) == ["r.0.0.mca", "r.1.0.mca"]
+    first = read_all(directory)
+    assert set(first) == area(31, 5, 1)
+    for (x, z), (timestamp, data) in first.items():
+        assert timestamp
+        assert data == bytes(nbt.serialize(to_anvil(generator.generate(x, z)), compress=False))
+        tag = nbt.deserialize(data, compress=False)
+        assert (tag["xPos"].value, tag["zPos"].value) == (x, z)
+
+    # 再次运行时跳过时间戳非零的区块, 不重写任何内容
+    before = {name: (tmp_path / name).read_bytes() for name in os.listdir(directory)}
+    assert pregenerate(directory, generator, 1, 31, 5, workers=2, interval=1e9) == 0
+    assert {name: (tmp_path / name).read_bytes() for name in os.listdir(directory)} == before
+
+    # 扩大半径只生成新增的区块, 已有区块的时间戳与数据不变
+    assert pregenerate(directory, generator, 2, 31, 5, workers=2, interval=1e9) == 16
+    second = read_all(directory)
+    assert set(second) == area(31, 5, 2)
+    assert {key: second[key] for key in first} == first
+
+    assert pregenerate(directory, generator, 1, 31, 5, workers=2, force=True, interval=1e9) == 9
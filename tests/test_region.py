@@ -0,0 +1,16 @@
+from pystom.MinecraftType.region import Region, RegionWriter
+
+
+def test_write_batch_keeps_last_duplicate_without_leaking_sectors(tmp_path):
+    path = tmp_path / "r.0.0.mca"
+    with RegionWriter.open(path) as region:
+        zlib = Region.COMPRESSION_ZLIB
+        payloads = {name: RegionWriter._compress(zlib, name * 3000) for name in (b"a", b"b", b"c")}
+        region.write_batch([(0, 0, payloads[b"a"], zlib), (1, 0, payloads[b"b"], zlib),
+                            (0, 0, payloads[b"c"], zlib)])
+        assert region.read_chunk(0, 0) == b"c" * 3000
+        assert region.read_chunk(1, 0) == b"b" * 3000
+        # 两个区块各占一个扇区, 没有遗留的已占用扇区
+        used = len(region._sectors) - region.free_sectors()
+        assert used == 2 + 2
+        assert len(region._sectors.rstrip(b"\x00")) == 4
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from pystom.world.regionpool import RegionPool
+
+
+def test_acquire_keeps_new_entry_when_others_are_pinned(tmp_path):
+    pool = RegionPool(str(tmp_path), max_open=1, writable=True)
+    pool.write_chunk(0, 0, b"a")
+    pinned = pool.acquire(0, 0)
+    try:
+        region = pool.acquire(1, 0, create=True)
+        assert not region.data.closed
+        pool.release(region)
+        pool.write_chunk(40, 0, b"b")
+        assert pool.read_chunk(40, 0) == b"b"
+    finally:
+        pool.release(pinned)
+    assert pool.read_chunk(0, 0) == b"a"
+    pool.close()
+
+
+def test_idle_entries_are_evicted_in_lru_order(tmp_path):
+    pool = RegionPool(str(tmp_path), max_open=2, writable=True)
+    for region_x in range(3):
+        pool.write_chunk(region_x * 32, 0, bytes([region_x]))
+    assert pool.stats["open"] == 2
+    assert pool.evictions == 1
+    assert pool.read_chunk(0, 0) == b"\x00"
+    pool.close()
+
+
+def test_read_miss_does_not_create_region_file(tmp_path):
+    pool = RegionPool(str(tmp_path), writable=True)
+    assert pool.read_chunk(5, 5) is None
+    assert pool.acquire(3, 3) is None
+    with pool.region(3, 3) as region:
+        assert region is None
+    assert os.listdir(tmp_path) == []
+    pool.close()
+
+
+def test_read_only_pool(tmp_path):
+    writer = RegionPool(str(tmp_path), writable=True)
+    writer.write_chunk(1, 2, b"chunk")
+    writer.close()
+
+    pool = RegionPool(str(tmp_path))
+    assert pool.read_chunk(1, 2) == b"chunk"
+    assert pool.read_chunk(100, 100) is None
+    with pytest.raises(PermissionError):
+        pool.write_chunk(1, 2, b"other")
+    assert sorted(os.listdir(tmp_path)) == ["r.0.0.mca"]
+    pool.close()
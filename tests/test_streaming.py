@@ -0,0 +1,151 @@
+import struct
+
+from pystom.Packet.Server import ServerUnloadChunkPacket
+from pystom.world.streaming import ChunkStreamer
+from pystom.world.util import spiral
+
+CHUNK_SIZE = 100  # 每个区块帧的字节数
+
+
+def frame(packet_id, packet):
+    """测试用的帧: 视距中心为 V + 坐标, 卸载包为 U + 坐标"""
+    if packet_id == 0x49:
+        return b"V" + struct.pack(">ii", packet.chunk.chunk_x, packet.chunk.chunk_z)
+    return b"U" + struct.pack(">ii", packet.chunk_x, packet.chunk_z)
+
+
+def source(chunk_x, chunk_z):
+    return (b"C" + struct.pack(">ii", chunk_x, chunk_z)).ljust(CHUNK_SIZE, b"\0")
+
+
+def parse(data):
+    """拆分为 (类型, (x, z)) 列表"""
+    items, offset = [], 0
+    while offset < len(data):
+        kind = data[offset:offset + 1].decode()
+        items.append((kind, struct.unpack_from(">ii", data, offset + 1)))
+        offset += CHUNK_SIZE if kind == "C" else 9
+    return items
+
+
+class Client:
+    def __init__(self):
+        self.received = []
+
+    def send(self, player, data):
+        assert player is self
+        self.received.extend(parse(data))
+
+    def take(self, kind):
+        items = [key for item_kind, key in self.received if item_kind == kind]
+        self.received = [item for item in self.received if item[0] != kind]
+        return items
+
+
+def streamer(**kwargs):
+    return ChunkStreamer(source, lambda player, data: player.send(player, data), frame, **kwargs)
+
+
+def area(center_x, center_z, radius):
+    return {(x, z) for x in range(center_x - radius, center_x + radius + 1)
+            for z in range(center_z - radius, center_z + radius + 1)}
+
+
+def test_spiral_orders_by_ring():
+    coords = list(spiral(2, 5, -3))
+    assert len(coords) == len(set(coords)) == 25
+    assert set(coords) == area(5, -3, 2)
+    rings = [max(abs(x - 5), abs(z + 3)) for x, z in coords]
+    assert rings == sorted(rings)
+
+
+def test_crossing_a_border_sends_the_set_difference():
+    chunks, client = streamer(budget=1 << 30), Client()
+    chunks.add(client, 0, 0, 2)
+    chunks.tick()
+    assert client.take("V") == [(0, 0)]
+    sent = client.take("C")
+    # 由近到远
+    assert sent == list(spiral(2))
+    assert chunks.move(client, 0, 0) is False
+
+    assert chunks.move(client, 1, 0) is True
+    chunks.tick()
+    assert client.take("V") == [(1, 0)]
+    assert set(client.take("U")) == area(0, 0, 2) - area(1, 0, 2)
+    assert set(client.take("C")) == area(1, 0, 2) - area(0, 0, 2)
+    assert chunks.view(client).loaded == area(1, 0, 2)
+
+    # 斜向移动, 同时跨越X与Z方向的边界
+    chunks.move(client, 2, 1)
+    chunks.tick()
+    assert set(client.take("U")) == area(1, 0, 2) - area(2, 1, 2)
+    assert set(client.take("C")) == area(2, 1, 2) - area(1, 0, 2)
+    assert chunks.viewers(4, 3) == [client] and chunks.viewers(-1, 0) == []
+
+
+def test_byte_budget_limits_each_tick():
+    chunks, client = streamer(budget=CHUNK_SIZE * 3), Client()
+    chunks.add(client, 0, 0, 1)
+    counts = []
+    while chunks.view(client).queue:
+        chunks.tick()
+        counts.append(len(client.take("C")))
+    assert counts == [3, 3, 3]
+
+    # 预算小于一个区块时每刻仍发送一个区块
+    chunks, client = streamer(budget=1), Client()
+    chunks.add(client, 0, 0, 1)
+    chunks.tick()
+    assert len(client.take("C")) == 1
+
+
+def test_chunks_that_are_not_ready_keep_their_order():
+    ready = set()
+    chunks = ChunkStreamer(lambda x, z: source(x, z) if (x, z) in ready else None,
+                           lambda player, data: player.send(player, data), frame)
+    client = Client()
+    chunks.add(client, 0, 0, 1)
+    chunks.tick()
+    assert client.take("C") == []
+    ready.update(area(0, 0, 1))
+    chunks.tick()
+    assert client.take("C") == list(spiral(1))
+
+
+def test_view_distance_changes_and_unload_packets():
+    chunks, client = streamer(budget=1 << 30, max_view_distance=3), Client()
+    view = chunks.add(client, 0, 0, 10)
+    assert view.view_distance == 3
+    chunks.tick()
+    client.received.clear()
+
+    chunks.set_view_distance(client, 1)
+    chunks.tick()
+    assert set(client.take("U")) == area(0, 0, 3) - area(0, 0, 1)
+    assert client.received == []
+    chunks.set_view_distance(client, 2)
+    chunks.tick()
+    assert set(client.take("C")) == area(0, 0, 2) - area(0, 0, 1)
+    assert client.received == []
+
+    # 卸载包的坐标按Z、X的顺序编码
+    assert ServerUnloadChunkPacket(1, 2).to_bytes == struct.pack(">ii", 2, 1)
+
+
+def test_resend_and_removal_on_send_failure():
+    chunks, client = streamer(budget=1 << 30), Client()
+    chunks.add(client, 0, 0, 1)
+    chunks.tick()
+    client.received.clear()
+    chunks.resend(1, 1)
+    chunks.resend(5, 5)
+    chunks.tick()
+    assert client.take("C") == [(1, 1)]
+
+    def broken(player, data):
+        raise OSError
+
+    chunks.send = broken
+    assert chunks.broadcast(0, 0, b"x") == 1
+    assert chunks.view(client) is None
@@ -0,0 +1,136 @@
+import random
+
+from pystom.world.tracker import EntityTracker, SpatialGrid
+
+
+def expected(tracker: EntityTracker, viewer) -> set:
+    """逐个检查所有实体的参照实现"""
+    cell_x, cell_z = tracker.grid.cell_of(viewer)
+    distance = tracker._viewers[viewer]
+    return {entity for entity in tracker.grid._positions if entity is not viewer
+            and abs(tracker.grid.cell_of(entity)[0] - cell_x) <= distance
+            and abs(tracker.grid.cell_of(entity)[1] - cell_z) <= distance}
+
+
+def diff(tracker: EntityTracker) -> dict:
+    return {viewer: (set(spawn), set(destroy)) for viewer, (spawn, destroy) in tracker.flush().items()}
+
+
+def test_crossing_cells_spawns_and_destroys():
+    tracker = EntityTracker(cell_size=16, view_distance=1)
+    tracker.add("player", 8, 64, 8, viewer=True)
+    tracker.add("near", 20, 64, 8)
+    tracker.add("far", 40, 64, 8)
+    assert diff(tracker) == {"player": ({"near"}, set())}
+
+    # 在格子内移动不改变可见性
+    assert tracker.move("near", 30, 64, 8) is False
+    assert diff(tracker) == {}
+
+    # 实体走出可见范围, 另一个实体走进来
+    assert tracker.move("near", 50, 64, 8) is True
+    assert tracker.move("far", 31, 64, 8) is True
+    assert diff(tracker) == {"player": ({"far"}, {"near"})}
+
+    # 观察者移动时只检查新旧范围的差集
+    tracker.move("player", 40, 64, 8)
+    assert diff(tracker) == {"player": ({"near"}, set())}
+    tracker.move("player", -40, 64, 8)
+    assert diff(tracker) == {"player": (set(), {"near", "far"})}
+
+
+def test_viewers_see_each_other():
+    tracker = EntityTracker(view_distance=2)
+    tracker.add("a", 0, 0, 0, viewer=True)
+    tracker.add("b", 17, 0, 17, viewer=True)
+    assert diff(tracker) == {"a": ({"b"}, set()), "b": ({"a"}, set())}
+    tracker.move("b", 100, 0, 0)
+    assert diff(tracker) == {"a": (set(), {"b"}), "b": (set(), {"a"})}
+
+
+def test_same_tick_changes_cancel_out():
+    tracker = EntityTracker(view_distance=1)
+    tracker.add("player", 0, 0, 0, viewer=True)
+    tracker.add("visible", 1, 0, 1)
+    diff(tracker)
+
+    # 进入后又离开
+    tracker.add("passing", 100, 0, 0)
+    tracker.move("passing", 5, 0, 0)
+    tracker.move("passing", 100, 0, 0)
+    # 离开后又回来
+    tracker.move("visible", 100, 0, 100)
+    tracker.move("visible", 2, 0, 2)
+    # 生成后立即移除
+    tracker.add("short-lived", 3, 0, 3)
+    tracker.remove("short-lived")
+    assert diff(tracker) == {}
+
+    tracker.remove("visible")
+    assert diff(tracker) == {"player": (set(), {"visible"})}
+
+
+def test_set_view_distance():
+    tracker = EntityTracker(view_distance=3)
+    tracker.add("player", 0, 0, 0, viewer=True)
+    for distance in range(1, 4):
+        tracker.add(distance, distance * 16 + 1, 0, 0)
+    assert diff(tracker) == {"player": ({1, 2, 3}, set())}
+
+    tracker.set_view_distance("player", 1)
+    assert diff(tracker) == {"player": (set(), {2, 3})}
+    tracker.set_view_distance("player", 1)
+    assert diff(tracker) == {}
+    tracker.set_view_distance("player", 2)
+    assert diff(tracker) == {"player": ({2}, set())}
+
+    # 缩小后其他实体的移动按新的距离判断, 同一刻内被隐藏又走进范围的实体互相抵消
+    tracker.set_view_distance("player", 0)
+    tracker.move(1, 2, 0, 2)
+    assert diff(tracker) == {"player": (set(), {2})}
+    tracker.move(1, 17, 0, 2)
+    assert diff(tracker) == {"player": (set(), {1})}
+    tracker.move(1, 2, 0, 2)
+    assert diff(tracker) == {"player": ({1}, set())}
+    assert tracker.visible["player"] == expected(tracker, "player") == {1}
+
+
+def test_random_walk_matches_brute_force():
+    rng = random.Random(7)
+    tracker = EntityTracker(cell_size=8, view_distance=2)
+    known = {}  # 客户端按差异维护的可见实体
+    for index in range(40):
+        viewer = index < 6
+        tracker.add(index, rng.uniform(-100, 100), 0, rng.uniform(-100, 100), viewer=viewer,
+                    view_distance=rng.randint(1, 4) if viewer else None)
+        if viewer:
+            known[index] = set()
+    for tick in range(100):
+        for _ in range(10):
+            entity = rng.randrange(40)
+            x, _, z = tracker.grid.position(entity)
+            tracker.move(entity, x + rng.uniform(-12, 12), 0, z + rng.uniform(-12, 12))
+        if tick % 10 == 0:
+            tracker.set_view_distance(rng.randrange(6), rng.randint(0, 4))
+        for viewer, (spawn, destroy) in diff(tracker).items():
+            assert not spawn & known[viewer] and destroy <= known[viewer]
+            known[viewer] = (known[viewer] | spawn) - destroy
+        for viewer in known:
+            assert tracker.visible[viewer] == known[viewer] == expected(tracker, viewer)
+
+
+def test_grid_queries():
+    grid = SpatialGrid(cell_size=4)
+    points = {name: (x, y, z) for name, x, y, z in
+              (("a", 0.5, 0, 0.5), ("b", -3.5, 10, 2), ("c", 7.9, 0, -8), ("d", 100, 0, 100))}
+    for name, (x, y, z) in points.items():
+        grid.insert(name, x, y, z)
+    assert grid.cell(-3.5, 2) == (-1, 0)
+    assert sorted(grid.query_box(-4, -8, 8, 4)) == ["a", "b", "c"]
+    assert sorted(grid.query_box(-4, -8, 8, 4, y0=5)) == ["b"]
+    assert sorted(grid.query_radius(0, 0, 0, 5)) == ["a"]
+    assert sorted(grid.query_radius(0, 0, 0, 5, vertical=False)) == ["a", "b"]
+    assert grid.move("a", 1, 0, 1) == ((0, 0), (0, 0))
+    assert grid.move("a", -1, 0, 1) == ((0, 0), (-1, 0))
+    assert grid.remove("d") == (25, 25)
+    assert "d" not in grid and len(grid) == 3 and grid.in_cell((25, 25)) == set()